@@ -4,8 +4,27 @@ Common functions shared by all platforms (Qiskit, QNE-ADK, ...)
 
 import datetime
 import json
+import math
 import os
 import sys
+import numpy
+
+JSON_EXTENSION = ".json"
+NPY_EXTENSION = ".npy"
+METADATA_EXTENSION = ".meta.json"
+RESULT_FILE_EXTENSIONS = {"json": JSON_EXTENSION, "npy": NPY_EXTENSION}
+DEFAULT_MAX_DELTA = 0.001
+COMPARISON_BLOCK_SIZE = 256
+NR_WORST_INDEXES = 5
+DENSE_REPRESENTATION = "dense"
+STATEVECTOR_REPRESENTATION = "statevector"
+PRODUCT_REPRESENTATION = "product"
+REPRESENTATION_JSON_KEYS = {
+    DENSE_REPRESENTATION: "density_matrix",
+    STATEVECTOR_REPRESENTATION: "statevector",
+    PRODUCT_REPRESENTATION: "qubit_states",
+}
+REPRESENTATION_MAX_DELTA = 1e-10
 
 
 def fatal_error(message):
@@ -43,7 +62,8 @@ def read_json_file(file_name, description):
 
 def write_json_file(data, file_name, description):
     """
-    Write data to a JSON file.
+    Write data to a JSON file. The data is first written to a temporary file which is then renamed,
+    so that a partially written file is never left behind under file_name.
 
     Parameters
     ----------
@@ -51,9 +71,11 @@ def write_json_file(data, file_name, description):
     file_name: The file name of the experiment JSON file.
     description: A human-readable description of what is in the JSON file.
     """
+    temp_file_name = f"{file_name}.tmp"
     try:
-        with open(file_name, "w", encoding="utf-8") as file:
+        with open(temp_file_name, "w", encoding="utf-8") as file:
             json.dump(data, file, indent=2)
+        os.replace(temp_file_name, file_name)
     except (OSError, IOError) as exception:
         fatal_error(f"Could not open {description} file {file_name}: {exception}")
 
@@ -82,8 +104,230 @@ def write_density_matrix_to_log(app_logger, density_matrix):
         app_logger.log(log_msg)
 
 
+def result_file_name(
+    platform, flavor, input_size, input_value, results_dir=None, variant=None, file_format=None
+):
+    """
+    Determine the name of the file that the results of an experiment are written to.
+
+    Parameters
+    ----------
+    platform: The platform on which the experiment was run (qiskit or qne)
+    flavor: The flavor of quantum fourier transformation (distributed or monolithic)
+    input_size: The number of qubits in the input value for the QFT.
+    input_value: The input value for the QFT.
+    results_dir: The results directory. If None, use the directory in environment variable
+        QIH_RESULTS_DIR, or the current directory if that variable is not set either.
+    variant: An optional string that distinguishes experiments that differ in other respects than
+        the platform, flavor, input size, and input value (e.g. the number of processors).
+    file_format: The format of the results file: "json" or "npy" (see
+        write_density_matrix_to_file). If None, use the format in environment variable
+        QIH_RESULTS_FORMAT, or "json" if that variable is not set either.
+
+    Returns
+    -------
+    The name of the results file.
+    """
+    if file_format is None:
+        file_format = os.getenv("QIH_RESULTS_FORMAT", "json")
+    assert file_format in RESULT_FILE_EXTENSIONS, f"Unknown results file format {file_format}"
+    file_name = f"dm_{platform}_{flavor}_size_{input_size}_value_{input_value}"
+    if variant is not None:
+        file_name += f"_{variant}"
+    file_name += RESULT_FILE_EXTENSIONS[file_format]
+    if results_dir is not None:
+        dir_name = results_dir
+    else:
+        dir_name = os.getenv("QIH_RESULTS_DIR")
+    if dir_name:
+        file_name = f"{dir_name}/{file_name}"
+    return file_name
+
+
+def experiment_variant(
+    flavor,
+    nr_processors,
+    method_name,
+    min_angle=0.0,
+    placement_name=None,
+    nr_communication_qubits=1,
+    reset_method_name=None,
+    defer_measurements=False,
+):
+    """
+    Determine the variant that distinguishes the result files of experiments with the same
+    platform, flavor, input size, and input value.
+
+    Parameters
+    ----------
+    flavor: The flavor of quantum fourier transformation (distributed or monolithic)
+    nr_processors: The number of processors (distributed flavor only).
+    method_name: The lower case name of the method for distributed controlled gates (distributed
+        flavor only).
+    min_angle: The smallest angle of the controlled phase rotations in an approximate quantum
+        Fourier transformation, or zero for an exact quantum Fourier transformation.
+    placement_name: The lower case name of the placement of qubits on processors (distributed
+        flavor only). None or "block" for the default block placement.
+    nr_communication_qubits: The number of communication qubits per processor (distributed flavor
+        only).
+    reset_method_name: The lower case name of the method for resetting ancillary qubits
+        (distributed flavor only). None or "reset" for the default reset method.
+    defer_measurements: Whether the measurements were deferred to the end of the circuit
+        (distributed flavor only).
+
+    Returns
+    -------
+    The variant string, or None if the experiment has no variants.
+    """
+    variant_parts = []
+    if flavor == "distributed":
+        variant_parts.append(f"{method_name}_{nr_processors}_processors")
+        if placement_name not in [None, "block"]:
+            variant_parts.append(f"{placement_name}_placement")
+        if nr_communication_qubits != 1:
+            variant_parts.append(f"{nr_communication_qubits}_communication_qubits")
+        if reset_method_name not in [None, "reset"]:
+            variant_parts.append(f"{reset_method_name}_reset")
+        if defer_measurements:
+            variant_parts.append("deferred_measurements")
+    if min_angle:
+        variant_parts.append(f"min_angle_{min_angle:g}")
+    if not variant_parts:
+        return None
+    return "_".join(variant_parts)
+
+
+def approximate_qft_fidelity(total_nr_qubits, min_angle, input_number=None):
+    """
+    Compute the fidelity of the output state of an approximate quantum Fourier transformation
+    relative to the output state of the exact quantum Fourier transformation, for a computational
+    basis state input.
+
+    For a basis state input, the output of the (approximate) QFT is a product state, where each
+    output qubit misses the phase of the dropped rotations that were controlled by a one bit. Each
+    output qubit with a missing phase d contributes a factor cos(d/2)^2 to the fidelity.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the approximate
+        quantum Fourier transform circuit. Smaller rotations are dropped.
+    input_number: The input value for the quantum Fourier transformation. If None, return the
+        worst-case fidelity over all input values (which is the fidelity for the input value with
+        all bits set to one).
+
+    Returns
+    -------
+    The fidelity.
+    """
+    if input_number is None:
+        input_number = 2**total_nr_qubits - 1
+    qft_fidelity = 1.0
+    for target_qubit in range(total_nr_qubits):
+        missing_phase = 0.0
+        for control_qubit in range(target_qubit):
+            angle = math.ldexp(math.pi, control_qubit - target_qubit)
+            if angle < min_angle and (input_number >> control_qubit) & 1:
+                missing_phase += angle
+        qft_fidelity *= math.cos(missing_phase / 2.0) ** 2
+    return qft_fidelity
+
+
+def expected_qft_statevector(total_nr_qubits, input_number, min_angle=0.0):
+    """
+    Compute the output statevector of an (approximate) quantum Fourier transformation for a
+    computational basis state input analytically, without simulating a circuit.
+
+    For a basis state input the output is a product state: output qubit j (after the final swaps)
+    is (|0> + e^{i phase_j} |1>) / sqrt(2), where phase_j is pi for the input bit n-1-j plus the
+    angles of the controlled phase rotations (that were not dropped) that are controlled by one
+    bits of the input value. For an exact QFT, phase_j is 2 pi input_number 2^j / 2^n. The
+    statevector is the Kronecker product of the qubit states, which takes O(2^n) time.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    input_number: The input value for the quantum Fourier transformation.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the approximate
+        quantum Fourier transform circuit. Zero means an exact quantum Fourier transformation.
+
+    Returns
+    -------
+    The statevector as a numpy array of 2^n complex numbers, in Qiskit (little endian) order.
+    """
+    statevector = numpy.ones(1, dtype=complex)
+    for target_qubit in range(total_nr_qubits):
+        phase = math.pi * ((input_number >> target_qubit) & 1)
+        for control_qubit in range(target_qubit):
+            angle = math.ldexp(math.pi, control_qubit - target_qubit)
+            if angle >= min_angle and (input_number >> control_qubit) & 1:
+                phase += angle
+        # Target qubit t ends up as output qubit n-1-t after the swaps. The most significant qubit
+        # comes first in the Kronecker product, so the qubit states are added from most
+        # significant (output qubit n-1, i.e. target qubit 0) to least significant.
+        qubit_state = numpy.array([1.0, numpy.exp(1j * phase)]) / math.sqrt(2.0)
+        statevector = numpy.kron(statevector, qubit_state)
+    return statevector
+
+
+def expected_qft_statevectors(total_nr_qubits, input_numbers=None):
+    """
+    Compute the output statevectors of an exact quantum Fourier transformation for many
+    computational basis state inputs at once, using a batched fast Fourier transform.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    input_numbers: An iterable of input values. None means all 2^n input values.
+
+    Returns
+    -------
+    A numpy array with the statevector (see expected_qft_statevector) for input_numbers[i] in row i.
+    """
+    size = 2**total_nr_qubits
+    if input_numbers is None:
+        input_numbers = range(size)
+    input_numbers = numpy.fromiter(input_numbers, dtype=numpy.int64)
+    basis_states = numpy.zeros((len(input_numbers), size), dtype=complex)
+    basis_states[numpy.arange(len(input_numbers)), input_numbers] = 1.0
+    # The QFT is the inverse discrete Fourier transform with a 1/sqrt(2^n) normalization
+    return numpy.fft.ifft(basis_states, axis=1, norm="ortho")
+
+
+def expected_qft_density_matrix(total_nr_qubits, input_number, min_angle=0.0):
+    """
+    Compute the output density matrix of an (approximate) quantum Fourier transformation for a
+    computational basis state input analytically (see expected_qft_statevector).
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    input_number: The input value for the quantum Fourier transformation.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the approximate
+        quantum Fourier transform circuit. Zero means an exact quantum Fourier transformation.
+
+    Returns
+    -------
+    The density matrix as a 2^n by 2^n numpy array of complex numbers, in Qiskit (little endian)
+    order.
+    """
+    statevector = expected_qft_statevector(total_nr_qubits, input_number, min_angle)
+    return numpy.outer(statevector, statevector.conj())
+
+
 def write_density_matrix_to_file(
-    platform, flavor, input_size, input_value, density_matrix, results_dir=None
+    platform,
+    flavor,
+    input_size,
+    input_value,
+    density_matrix,
+    results_dir=None,
+    variant=None,
+    file_format=None,
+    min_angle=0.0,
+    nr_communication_qubits=1,
+    reset_method_name=None,
+    defer_measurements=False,
 ):
     """
     Write the density matrix for the qubits to a file, including some metadata.
@@ -96,6 +340,21 @@ def write_density_matrix_to_file(
     input_value: The input value for the QFT.
     density_matrix: The density matrix to write to a file.
     results_dir: The results directory.
+    variant: An optional string that distinguishes experiments with the same platform, flavor,
+        input size, and input value (see result_file_name).
+    file_format: The format of the file (see result_file_name). Format "json" writes the metadata
+        and the density matrix to a single JSON file. Format "npy" writes the density matrix as a
+        binary numpy array of complex numbers, and the metadata to a JSON sidecar file.
+    min_angle: The smallest angle of the controlled phase rotations in an approximate quantum
+        Fourier transformation, or zero for an exact quantum Fourier transformation. Only results
+        with the same min_angle are expected to be consistent with each other.
+    nr_communication_qubits: The number of communication qubits per processor (distributed flavor
+        only). Only recorded in the metadata if it is not the default of one.
+    reset_method_name: The lower case name of the method for resetting ancillary qubits
+        (distributed flavor only). Only recorded in the metadata if it is not the default reset
+        method (None or "reset").
+    defer_measurements: Whether the measurements were deferred to the end of the circuit
+        (distributed flavor only). Only recorded in the metadata if they were.
 
     Returns
     -------
@@ -104,27 +363,466 @@ def write_density_matrix_to_file(
     assert platform in ["qiskit", "qne"]
     assert flavor in ["distributed", "monolithic"]
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    serializable_matrix = []
-    for row in density_matrix:
-        serializable_matrix_row = []
-        for value in row:
-            serializable_value = {"real": value.real, "imag": value.imag}
-            serializable_matrix_row.append(serializable_value)
-        serializable_matrix.append(serializable_matrix_row)
-    file_name = f"dm_{platform}_{flavor}_size_{input_size}_value_{input_value}.json"
-    if results_dir is not None:
-        dir_name = results_dir
-    else:
-        dir_name = os.getenv("QIH_RESULTS_DIR")
-    if dir_name:
-        file_name = f"{dir_name}/{file_name}"
-    data = {
+    file_name = result_file_name(
+        platform, flavor, input_size, input_value, results_dir, variant, file_format
+    )
+    metadata = {
         "platform": platform,
         "flavor": flavor,
         "datetime": now,
         "input_size": input_size,
         "input_value": input_value,
-        "density_matrix": serializable_matrix,
     }
-    write_json_file(data, file_name, "density_matrix")
+    if variant is not None:
+        metadata["variant"] = variant
+    if min_angle:
+        metadata["min_angle"] = min_angle
+    if flavor == "distributed" and nr_communication_qubits != 1:
+        metadata["nr_communication_qubits"] = nr_communication_qubits
+    if flavor == "distributed" and reset_method_name not in [None, "reset"]:
+        metadata["reset_method"] = reset_method_name
+    if flavor == "distributed" and defer_measurements:
+        metadata["defer_measurements"] = True
+    write_density_matrix_file(file_name, metadata, density_matrix)
     return file_name
+
+
+def metadata_file_name(file_name):
+    """
+    Determine the name of the metadata sidecar file for a binary results file.
+
+    Parameters
+    ----------
+    file_name: The name of the binary results file.
+
+    Returns
+    -------
+    The name of the metadata sidecar file.
+    """
+    assert file_name.endswith(NPY_EXTENSION)
+    return file_name[: -len(NPY_EXTENSION)] + METADATA_EXTENSION
+
+
+def is_result_file_name(file_name):
+    """
+    Determine whether a file is a results file (as opposed to a metadata sidecar file or some other
+    file).
+
+    Parameters
+    ----------
+    file_name: The name of the file.
+
+    Returns
+    -------
+    True if the file is a results file, False if not.
+    """
+    if file_name.endswith(METADATA_EXTENSION):
+        return False
+    return file_name.endswith(JSON_EXTENSION) or file_name.endswith(NPY_EXTENSION)
+
+
+class PureDensityMatrix:
+    """
+    The density matrix of a pure state, which is stored as its statevector (2^n numbers instead of
+    4^n numbers). Rows are only expanded when they are indexed, so the density matrix can be
+    compared block by block (see compare_density_matrices) without ever expanding all of it.
+    Converting it to a numpy array (e.g. with numpy.asarray) expands the whole density matrix.
+    """
+
+    def __init__(self, statevector):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        statevector: The statevector of the pure state.
+        """
+        self.statevector = statevector
+        self.shape = (len(statevector), len(statevector))
+        self.ndim = 2
+        self.dtype = numpy.dtype(numpy.complex128)
+
+    def __len__(self):
+        return len(self.statevector)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return numpy.asarray(self)[key]
+        return numpy.multiply.outer(
+            numpy.asarray(self.statevector[key]), numpy.conj(self.statevector)
+        )
+
+    def __array__(self, dtype=None, copy=None):  # pylint: disable=unused-argument
+        # The expanded density matrix is always a new array, whatever copy is
+        return numpy.outer(self.statevector, numpy.conj(self.statevector)).astype(
+            dtype or self.dtype, copy=False
+        )
+
+
+def density_matrix_representation(density_matrix, max_delta=REPRESENTATION_MAX_DELTA):
+    """
+    Determine the most compact representation of a density matrix.
+
+    Parameters
+    ----------
+    density_matrix: The density matrix: a (possibly memory-mapped) numpy array, a
+        PureDensityMatrix, or a one-dimensional numpy array that contains the statevector of a pure
+        state.
+    max_delta: The maximum difference in each element of the density matrix between the density
+        matrix and the compact representation.
+
+    Returns
+    -------
+    A tuple with the representation and the numpy array to store for it:
+    DENSE_REPRESENTATION: The density matrix itself (the state is mixed).
+    STATEVECTOR_REPRESENTATION: The statevector (the state is pure, but entangled).
+    PRODUCT_REPRESENTATION: An n by 2 array, with the state of qubit i (in Qiskit qubit order) in
+        row i (the state is a product of single-qubit states).
+    """
+    if isinstance(density_matrix, PureDensityMatrix):
+        statevector = numpy.asarray(density_matrix.statevector, dtype=numpy.complex128)
+    elif numpy.ndim(density_matrix) == 1:
+        statevector = numpy.asarray(density_matrix, dtype=numpy.complex128)
+    else:
+        density_matrix = numpy.asarray(density_matrix)
+        statevector = _pure_state_statevector(density_matrix, max_delta)
+        if statevector is None:
+            return (DENSE_REPRESENTATION, numpy.asarray(density_matrix, dtype=numpy.complex128))
+    qubit_states = _product_state_factors(statevector, max_delta)
+    if qubit_states is None:
+        return (STATEVECTOR_REPRESENTATION, statevector)
+    return (PRODUCT_REPRESENTATION, qubit_states)
+
+
+def _pure_state_statevector(density_matrix, max_delta):
+    # If the density matrix is (within max_delta) the density matrix of a pure state, return the
+    # statevector of that state, otherwise return None. The statevector is the column with the
+    # largest diagonal element, normalized by the square root of that element.
+    column = int(numpy.argmax(numpy.real(numpy.diagonal(density_matrix))))
+    diagonal_element = numpy.real(density_matrix[column, column])
+    if diagonal_element <= 0.0:
+        return None
+    statevector = numpy.array(density_matrix[:, column], dtype=numpy.complex128)
+    statevector /= numpy.sqrt(diagonal_element)
+    pure_density_matrix = PureDensityMatrix(statevector)
+    for start_row in range(0, len(statevector), COMPARISON_BLOCK_SIZE):
+        difference = (
+            density_matrix[start_row : start_row + COMPARISON_BLOCK_SIZE]
+            - pure_density_matrix[start_row : start_row + COMPARISON_BLOCK_SIZE]
+        )
+        if numpy.any(numpy.abs(difference) > max_delta):
+            return None
+    return statevector
+
+
+def _product_state_factors(statevector, max_delta):
+    # If the statevector is (within max_delta) a product of single-qubit states, return an n by 2
+    # array with the state of qubit i in row i, otherwise return None. The state of each qubit is
+    # read from the two amplitudes that differ from the largest amplitude only in that qubit.
+    nr_qubits = number_of_qubits(len(statevector))
+    largest_index = int(numpy.argmax(numpy.abs(statevector)))
+    qubit_states = numpy.zeros((nr_qubits, 2), dtype=numpy.complex128)
+    for qubit in range(nr_qubits):
+        mask = 1 << qubit
+        qubit_state = statevector[[largest_index & ~mask, largest_index | mask]]
+        qubit_states[qubit] = qubit_state / numpy.linalg.norm(qubit_state)
+    # Give the product state the same global phase as the statevector
+    product = product_state_statevector(qubit_states)
+    qubit_states[0] *= statevector[largest_index] / product[largest_index]
+    product *= statevector[largest_index] / product[largest_index]
+    if numpy.max(numpy.abs(product - statevector)) > max_delta:
+        return None
+    return qubit_states
+
+
+def product_state_statevector(qubit_states):
+    """
+    Expand the single-qubit states of a product state into the statevector of the product state.
+
+    Parameters
+    ----------
+    qubit_states: An n by 2 array, with the state of qubit i (in Qiskit qubit order) in row i.
+
+    Returns
+    -------
+    The statevector, in Qiskit (little endian) order.
+    """
+    statevector = numpy.ones(1, dtype=numpy.complex128)
+    for qubit_state in reversed(numpy.asarray(qubit_states)):
+        statevector = numpy.kron(statevector, qubit_state)
+    return statevector
+
+
+def number_of_qubits(size):
+    """
+    Determine the number of qubits of a statevector or density matrix.
+
+    Parameters
+    ----------
+    size: The length of the statevector, or the number of rows of the density matrix. Must be a
+        power of two.
+
+    Returns
+    -------
+    The number of qubits.
+    """
+    nr_qubits = size.bit_length() - 1
+    assert 2**nr_qubits == size, f"Size {size} is not a power of two"
+    return nr_qubits
+
+
+def write_density_matrix_file(file_name, metadata, density_matrix, representation=None):
+    """
+    Write a density matrix and its metadata to a results file. The format of the file is determined
+    by the extension of the file name.
+
+    The density matrix is stored in the most compact representation (see
+    density_matrix_representation), which is recorded under key "representation" in the metadata.
+    For format "npy" the binary file contains the numpy array of the representation. For format
+    "json" the array is stored under key "density_matrix", "statevector", or "qubit_states".
+
+    Parameters
+    ----------
+    file_name: The name of the results file.
+    metadata: A dictionary with the metadata of the experiment.
+    density_matrix: The density matrix (see density_matrix_representation).
+    representation: If DENSE_REPRESENTATION, always store the full density matrix. If None, choose
+        the representation automatically.
+    """
+    if representation == DENSE_REPRESENTATION:
+        array = numpy.asarray(density_matrix, dtype=numpy.complex128)
+    else:
+        (representation, array) = density_matrix_representation(density_matrix)
+    data = dict(metadata)
+    data["representation"] = representation
+    if file_name.endswith(NPY_EXTENSION):
+        write_json_file(data, metadata_file_name(file_name), "density matrix metadata")
+        temp_file_name = f"{file_name}.tmp"
+        try:
+            with open(temp_file_name, "wb") as file:
+                numpy.save(file, array)
+            os.replace(temp_file_name, file_name)
+        except (OSError, IOError) as exception:
+            fatal_error(f"Could not open density matrix file {file_name}: {exception}")
+    elif file_name.endswith(JSON_EXTENSION):
+        data[REPRESENTATION_JSON_KEYS[representation]] = _serializable_array(array)
+        write_json_file(data, file_name, "density_matrix")
+    else:
+        fatal_error(f"Unknown format for density matrix file {file_name}")
+
+
+def _serializable_array(array):
+    if array.ndim == 1:
+        return [{"real": value.real, "imag": value.imag} for value in array]
+    return [_serializable_array(row) for row in array]
+
+
+def _deserialized_array(serializable_array):
+    return numpy.array(
+        [
+            complex(value["real"], value["imag"])
+            if isinstance(value, dict)
+            else _deserialized_array(value)
+            for value in serializable_array
+        ]
+    )
+
+
+def _expanded_density_matrix(representation, array):
+    # Wrap the stored array of a representation as a density matrix, without expanding it into the
+    # full density matrix
+    if representation == PRODUCT_REPRESENTATION:
+        return PureDensityMatrix(product_state_statevector(array))
+    if representation == STATEVECTOR_REPRESENTATION:
+        return PureDensityMatrix(array)
+    return array
+
+
+def read_density_matrix_from_file(file_name, mmap_mode=None):
+    """
+    Read a density matrix and its metadata from a results file. The format of the file is determined
+    by the extension of the file name.
+
+    Parameters
+    ----------
+    file_name: The name of the results file.
+    mmap_mode: For binary results files, the memory-map mode that is passed to numpy.load (e.g.
+        "r" to memory-map the density matrix read-only instead of reading it into memory). Not used
+        for JSON results files.
+
+    Returns
+    -------
+    A dictionary with the metadata of the experiment, and the density matrix under key
+    "density_matrix". The density matrix is a numpy array of complex numbers if it was stored in
+    the dense representation, or a PureDensityMatrix (which is expanded lazily) if it was stored in
+    the statevector or product representation (see write_density_matrix_file).
+    """
+    if file_name.endswith(NPY_EXTENSION):
+        data = read_json_file(metadata_file_name(file_name), "density matrix metadata")
+        try:
+            array = numpy.load(file_name, mmap_mode=mmap_mode)
+        except (OSError, IOError, ValueError) as exception:
+            fatal_error(f"Could not open density matrix file {file_name}: {exception}")
+    elif file_name.endswith(JSON_EXTENSION):
+        data = read_json_file(file_name, "density matrix")
+        representation = data.get("representation", DENSE_REPRESENTATION)
+        array = _deserialized_array(data.pop(REPRESENTATION_JSON_KEYS[representation]))
+    else:
+        fatal_error(f"Unknown format for density matrix file {file_name}")
+        return None
+    data["density_matrix"] = _expanded_density_matrix(
+        data.get("representation", DENSE_REPRESENTATION), array
+    )
+    return data
+
+
+def read_result_metadata(file_name):
+    """
+    Read only the metadata of an experiment from a results file. For binary results files, only the
+    small metadata sidecar file is read. For JSON results files, the whole file has to be parsed,
+    but the density matrix is discarded immediately.
+
+    Parameters
+    ----------
+    file_name: The name of the results file.
+
+    Returns
+    -------
+    A dictionary with the metadata of the experiment.
+    """
+    if file_name.endswith(NPY_EXTENSION):
+        return read_json_file(metadata_file_name(file_name), "density matrix metadata")
+    if file_name.endswith(JSON_EXTENSION):
+        data = read_json_file(file_name, "density matrix")
+        del data[REPRESENTATION_JSON_KEYS[data.get("representation", DENSE_REPRESENTATION)]]
+        return data
+    fatal_error(f"Unknown format for density matrix file {file_name}")
+    return None
+
+
+def compare_density_matrices(
+    density_matrix_1,
+    density_matrix_2,
+    max_delta=DEFAULT_MAX_DELTA,
+    early_exit=False,
+    block_size=COMPARISON_BLOCK_SIZE,
+):
+    """
+    Compare two density matrices. The matrices are compared in blocks of rows, so that memory-mapped
+    density matrices do not have to be read into memory all at once.
+
+    Parameters
+    ----------
+    density_matrix_1: The first density matrix to be compared.
+    density_matrix_2: The second density matrix to be compared.
+    max_delta: The maximum difference in the real part and in the imaginary part of each element
+        for the density matrices to be considered consistent.
+    early_exit: If True, stop at the first block of rows that is not consistent, and do not compute
+        the trace distance and fidelity. This is much cheaper when the density matrices are
+        expected to be different.
+    block_size: The number of rows in each block.
+
+    Returns
+    -------
+    A dictionary with the following keys:
+    consistent: True if the density matrices are the same (allowing for rounding errors), False
+        otherwise.
+    max_abs_error: The maximum absolute difference between two elements (in the compared rows).
+    worst_indexes: A list of up to NR_WORST_INDEXES (row, column) tuples of the elements with the
+        largest non-zero absolute difference (in the compared rows), worst first.
+    frobenius_distance: The Frobenius norm of the difference, or None if not all rows were
+        compared.
+    trace_distance: The trace distance, or None in early exit mode.
+    fidelity: The fidelity, or None in early exit mode.
+    """
+    if not isinstance(density_matrix_1, PureDensityMatrix):
+        density_matrix_1 = numpy.asarray(density_matrix_1)
+    if not isinstance(density_matrix_2, PureDensityMatrix):
+        density_matrix_2 = numpy.asarray(density_matrix_2)
+    assert density_matrix_1.shape == density_matrix_2.shape
+    consistent = True
+    sum_squares = 0.0
+    worst = []
+    size = len(density_matrix_1)
+    for start_row in range(0, size, block_size):
+        difference = (
+            density_matrix_1[start_row : start_row + block_size]
+            - density_matrix_2[start_row : start_row + block_size]
+        )
+        if numpy.any(numpy.abs(difference.real) > max_delta) or numpy.any(
+            numpy.abs(difference.imag) > max_delta
+        ):
+            consistent = False
+        abs_difference = numpy.abs(difference)
+        sum_squares += float(numpy.sum(abs_difference**2))
+        worst = sorted(worst + _worst_elements(abs_difference, start_row), reverse=True)
+        worst = worst[:NR_WORST_INDEXES]
+        if early_exit and not consistent:
+            break
+    all_rows_compared = consistent or not early_exit
+    return {
+        "consistent": consistent,
+        "max_abs_error": worst[0][0] if worst else 0.0,
+        "worst_indexes": [(row, column) for (_, row, column) in worst],
+        "frobenius_distance": float(numpy.sqrt(sum_squares)) if all_rows_compared else None,
+        "trace_distance": (
+            None if early_exit else trace_distance(density_matrix_1, density_matrix_2)
+        ),
+        "fidelity": None if early_exit else fidelity(density_matrix_1, density_matrix_2),
+    }
+
+
+def _worst_elements(abs_difference, start_row):
+    flat_abs_difference = abs_difference.ravel()
+    nr_worst = min(NR_WORST_INDEXES, len(flat_abs_difference))
+    flat_indexes = numpy.argpartition(flat_abs_difference, -nr_worst)[-nr_worst:]
+    worst = []
+    nr_columns = abs_difference.shape[1]
+    for flat_index in flat_indexes:
+        if flat_abs_difference[flat_index] == 0.0:
+            continue
+        (row, column) = divmod(int(flat_index), nr_columns)
+        worst.append((float(flat_abs_difference[flat_index]), start_row + row, column))
+    return worst
+
+
+def trace_distance(density_matrix_1, density_matrix_2):
+    """
+    Compute the trace distance between two density matrices.
+
+    Parameters
+    ----------
+    density_matrix_1: The first density matrix.
+    density_matrix_2: The second density matrix.
+
+    Returns
+    -------
+    The trace distance, which is half the sum of the absolute eigenvalues of the difference.
+    """
+    difference = numpy.asarray(density_matrix_1) - numpy.asarray(density_matrix_2)
+    return 0.5 * float(numpy.sum(numpy.abs(numpy.linalg.eigvalsh(difference))))
+
+
+def fidelity(density_matrix_1, density_matrix_2):
+    """
+    Compute the (Uhlmann) fidelity between two density matrices.
+
+    Parameters
+    ----------
+    density_matrix_1: The first density matrix.
+    density_matrix_2: The second density matrix.
+
+    Returns
+    -------
+    The fidelity, which is (Tr sqrt(sqrt(rho_1) rho_2 sqrt(rho_1)))^2.
+    """
+    sqrt_density_matrix_1 = _hermitian_sqrt(numpy.asarray(density_matrix_1))
+    product = sqrt_density_matrix_1 @ numpy.asarray(density_matrix_2) @ sqrt_density_matrix_1
+    eigenvalues = numpy.clip(numpy.linalg.eigvalsh(product), 0.0, None)
+    return float(numpy.sum(numpy.sqrt(eigenvalues)) ** 2)
+
+
+def _hermitian_sqrt(matrix):
+    eigenvalues, eigenvectors = numpy.linalg.eigh(matrix)
+    sqrt_eigenvalues = numpy.sqrt(numpy.clip(eigenvalues, 0.0, None))
+    return (eigenvectors * sqrt_eigenvalues) @ eigenvectors.conj().T
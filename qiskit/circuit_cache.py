@@ -0,0 +1,248 @@
+"""
+Caches for built and transpiled circuits that are shared by all quantum computers in a process,
+with an optional on-disk cache that is shared between processes.
+
+Circuits are cached under the key returned by QuantumComputer.circuit_cache_key, which identifies
+everything that determines the circuit (class, number of qubits, number of processors, method,
+...). Transpiled circuits are cached under (key, backend name, optimization level).
+
+The on-disk cache is enabled by setting the environment variable QIH_CIRCUIT_CACHE_DIR to a
+directory (or by calling set_disk_cache_dir). Circuits are stored in QPY format. The on-disk cache
+is not invalidated automatically when the code that builds the circuits changes; bump
+CIRCUIT_CACHE_VERSION (or remove the cache directory) when that happens.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import qiskit
+from qiskit import qpy
+from qiskit.qpy.exceptions import QpyError
+
+CIRCUIT_CACHE_VERSION = 5
+DEFAULT_MAX_SIZE = 64
+DISK_CACHE_DIR_ENV_VAR = "QIH_CIRCUIT_CACHE_DIR"
+BUILT_CIRCUIT_NAME = "built"
+
+
+class CircuitCache:
+    """
+    A least-recently-used cache of circuits, with a bound on the number of cached circuits. Each
+    entry is a dictionary with the circuit under key "circuit" and a dictionary with any additional
+    state that is needed to reuse the circuit under key "state".
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        max_size: The maximum number of cached entries. When a new entry is added to a full cache,
+            the least recently used entry is evicted.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Get a cached entry.
+
+        Parameters
+        ----------
+        key: The key of the entry.
+
+        Returns
+        -------
+        The cached entry, or None if there is no entry for key.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        """
+        Add an entry to the cache (replacing any existing entry for the same key).
+
+        Parameters
+        ----------
+        key: The key of the entry.
+        entry: The entry.
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, predicate):
+        """
+        Remove all entries whose key satisfies a predicate.
+
+        Parameters
+        ----------
+        predicate: A function that takes a key and returns True if the entry must be removed.
+        """
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self._entries.clear()
+
+
+BUILT_CIRCUITS = CircuitCache()
+TRANSPILED_CIRCUITS = CircuitCache()
+# The settings of the on-disk cache, which are changed in place by set_disk_cache_dir
+_DISK_CACHE = {"dir": os.environ.get(DISK_CACHE_DIR_ENV_VAR)}
+
+
+def set_disk_cache_dir(cache_dir):
+    """
+    Set the directory for the on-disk circuit cache.
+
+    Parameters
+    ----------
+    cache_dir: The directory, or None to disable the on-disk cache.
+    """
+    _DISK_CACHE["dir"] = cache_dir
+
+
+def transpiled_circuit_key(key, backend, optimization_level):
+    """
+    Determine the key for a transpiled circuit.
+
+    Parameters
+    ----------
+    key: The key of the circuit before transpilation.
+    backend: The name of the backend that the circuit is transpiled for.
+    optimization_level: The transpiler optimization level.
+
+    Returns
+    -------
+    The key for the transpiled circuit.
+    """
+    return (key, backend, optimization_level)
+
+
+def get_circuit(cache, key, name):
+    """
+    Get a circuit from a cache in memory, or from the on-disk cache if it is not cached in memory.
+
+    Parameters
+    ----------
+    cache: The in-memory cache (BUILT_CIRCUITS or TRANSPILED_CIRCUITS).
+    key: The key of the circuit.
+    name: The name of the circuit in the on-disk cache directory for the circuit.
+
+    Returns
+    -------
+    The cache entry, or None if the circuit is not cached.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        entry = _load_from_disk(key, name)
+        if entry is not None:
+            cache.put(key, entry)
+    return entry
+
+
+def put_circuit(cache, key, name, circuit, state=None):
+    """
+    Add a circuit to a cache in memory, and to the on-disk cache if it is enabled.
+
+    Parameters
+    ----------
+    cache: The in-memory cache (BUILT_CIRCUITS or TRANSPILED_CIRCUITS).
+    key: The key of the circuit.
+    name: The name of the circuit in the on-disk cache directory for the circuit.
+    circuit: The circuit.
+    state: A dictionary with any additional state that is needed to reuse the circuit. Must be
+        serializable to JSON.
+    """
+    entry = {"circuit": circuit, "state": state or {}}
+    cache.put(key, entry)
+    _save_to_disk(key, name, entry)
+
+
+def invalidate_circuit(key):
+    """
+    Remove a built circuit and all transpiled versions of it from the caches (both in memory and on
+    disk).
+
+    Parameters
+    ----------
+    key: The key of the built circuit.
+    """
+    BUILT_CIRCUITS.invalidate(lambda cached_key: cached_key == key)
+    TRANSPILED_CIRCUITS.invalidate(lambda cached_key: cached_key[0] == key)
+    key_dir = _disk_cache_key_dir(key)
+    if key_dir is not None and os.path.isdir(key_dir):
+        shutil.rmtree(key_dir, ignore_errors=True)
+
+
+def clear_circuit_caches():
+    """
+    Remove all circuits from the in-memory caches. The on-disk cache is not affected.
+    """
+    BUILT_CIRCUITS.clear()
+    TRANSPILED_CIRCUITS.clear()
+
+
+def _disk_cache_key_dir(key):
+    if _DISK_CACHE["dir"] is None:
+        return None
+    if isinstance(key[0], tuple):
+        key = key[0]
+    digest_input = repr((CIRCUIT_CACHE_VERSION, qiskit.__version__, key))
+    digest = hashlib.sha256(digest_input.encode("utf-8")).hexdigest()
+    return os.path.join(_DISK_CACHE["dir"], digest)
+
+
+def _disk_cache_file_names(key, name):
+    key_dir = _disk_cache_key_dir(key)
+    if isinstance(key[0], tuple):
+        (_, backend, optimization_level) = key
+        name = f"{name}_{backend}_{optimization_level}"
+    return (os.path.join(key_dir, f"{name}.qpy"), os.path.join(key_dir, f"{name}.json"))
+
+
+def _load_from_disk(key, name):
+    if _DISK_CACHE["dir"] is None:
+        return None
+    (circuit_file_name, state_file_name) = _disk_cache_file_names(key, name)
+    try:
+        with open(state_file_name, "r", encoding="utf-8") as file:
+            state = json.load(file)["state"]
+        with open(circuit_file_name, "rb") as file:
+            circuit = qpy.load(file)[0]
+    except (OSError, ValueError, KeyError, QpyError):
+        return None
+    return {"circuit": circuit, "state": state}
+
+
+def _save_to_disk(key, name, entry):
+    if _DISK_CACHE["dir"] is None:
+        return
+    (circuit_file_name, state_file_name) = _disk_cache_file_names(key, name)
+    try:
+        os.makedirs(os.path.dirname(circuit_file_name), exist_ok=True)
+        # Write the circuit before the state, because the state file marks the entry as complete
+        temp_file_name = f"{circuit_file_name}.{os.getpid()}.tmp"
+        with open(temp_file_name, "wb") as file:
+            qpy.dump(entry["circuit"], file)
+        os.replace(temp_file_name, circuit_file_name)
+        temp_file_name = f"{state_file_name}.{os.getpid()}.tmp"
+        with open(temp_file_name, "w", encoding="utf-8") as file:
+            json.dump({"key": repr(key), "state": entry["state"]}, file)
+        os.replace(temp_file_name, state_file_name)
+    except (OSError, QpyError):
+        # The on-disk cache is only an optimization; failing to write it is not an error
+        pass
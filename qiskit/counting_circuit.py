@@ -0,0 +1,238 @@
+"""
+A stand-in for a Qiskit QuantumCircuit that only counts the instructions that are added to it, for
+estimating the resources that a circuit needs without building it.
+
+Building a large Qiskit circuit is slow, because every instruction creates several Qiskit objects.
+A CountingCircuit supports the subset of the QuantumCircuit interface that the quantum computers in
+this package use to build their main circuit (registers, the gates, measurements, resets, and
+c_if), but it only counts the instructions of each kind and keeps track of the depth of each wire.
+The depth is computed in the same way as QuantumCircuit.depth: each instruction is placed one
+layer after the deepest of its qubits, classical bits, and condition bits.
+
+A run of controlled phase gates that share one qubit can also be added at once (see cp_run), which
+takes much less time than adding the gates one at a time.
+"""
+
+from collections import Counter
+import numpy
+from qiskit import ClassicalRegister, QuantumRegister
+
+
+class CountingCircuit:
+    """
+    A circuit that counts instructions instead of storing them.
+    """
+
+    # The gate methods have the same (short) names as in QuantumCircuit
+    # pylint: disable=invalid-name
+
+    def __init__(self):
+        self.qubits = []
+        self.clbits = []
+        self.op_counts = Counter()
+        self.nr_classically_controlled_ops = 0
+        # The index of each wire (qubit or classical bit), the index of the first wire of each
+        # register, and the depth of each wire by index
+        self._wire_indexes = {}
+        self._register_offsets = {}
+        self._wire_depths = []
+        self._depth = 0
+
+    @property
+    def num_qubits(self):
+        """
+        The number of qubits in the circuit.
+        """
+        return len(self.qubits)
+
+    @property
+    def num_clbits(self):
+        """
+        The number of classical bits in the circuit.
+        """
+        return len(self.clbits)
+
+    def add_register(self, register):
+        """
+        Add a quantum or classical register to the circuit.
+
+        Parameters
+        ----------
+        register: The register.
+        """
+        bits = list(register)
+        if isinstance(register, QuantumRegister):
+            self.qubits.extend(bits)
+        else:
+            self.clbits.extend(bits)
+        self._register_offsets[register] = len(self._wire_depths)
+        for bit in bits:
+            self._wire_indexes[bit] = len(self._wire_depths)
+            self._wire_depths.append(0)
+
+    def count_ops(self):
+        """
+        Returns
+        -------
+        A dictionary with the number of instructions of each kind (by Qiskit instruction name),
+        most frequent first.
+        """
+        return dict(self.op_counts.most_common())
+
+    def size(self):
+        """
+        Returns
+        -------
+        The total number of instructions.
+        """
+        return sum(self.op_counts.values())
+
+    def depth(self):
+        """
+        Returns
+        -------
+        The depth of the circuit.
+        """
+        return self._depth
+
+    def h(self, qubit):
+        """
+        Add a Hadamard gate.
+        """
+        return self._append("h", (qubit,))
+
+    def x(self, qubit):
+        """
+        Add a Pauli X gate.
+        """
+        return self._append("x", (qubit,))
+
+    def z(self, qubit):
+        """
+        Add a Pauli Z gate.
+        """
+        return self._append("z", (qubit,))
+
+    def cx(self, control_qubit, target_qubit):
+        """
+        Add a controlled-X gate.
+        """
+        return self._append("cx", (control_qubit, target_qubit))
+
+    cnot = cx
+
+    def cz(self, control_qubit, target_qubit):
+        """
+        Add a controlled-Z gate.
+        """
+        return self._append("cz", (control_qubit, target_qubit))
+
+    def cp(self, _theta, control_qubit, target_qubit):
+        """
+        Add a controlled phase gate (the angle does not affect the resources).
+        """
+        return self._append("cp", (control_qubit, target_qubit))
+
+    def cp_run(self, qubit, register, indexes):
+        """
+        Add a controlled phase gate between a qubit and each qubit in a range of qubits of a
+        register, in order (the angles do not affect the resources). This is the same as adding the
+        gates one at a time, but much faster for long runs.
+
+        Parameters
+        ----------
+        qubit: The qubit that all gates share.
+        register: The quantum register that contains the other qubits of the gates.
+        indexes: The range of indexes of the other qubits within register (with step one).
+        """
+        nr_gates = len(indexes)
+        if nr_gates == 0:
+            return
+        self.op_counts["cp"] += nr_gates
+        wire_index = self._wire_indexes[qubit]
+        start = self._register_offsets[register] + indexes.start
+        stop = start + nr_gates
+        # Gate i (counting from zero) is placed at depth max(depth of gate i-1, depth of wire i) + 1
+        # (where gate -1 stands for the shared qubit), which is i + 1 plus the running maximum of
+        # the depth of the shared qubit and of the depth of wire j minus j, for j <= i
+        offsets = numpy.arange(nr_gates)
+        running_maxima = numpy.maximum.accumulate(
+            numpy.array(self._wire_depths[start:stop]) - offsets
+        )
+        depths = numpy.maximum(running_maxima, self._wire_depths[wire_index]) + offsets + 1
+        self._wire_depths[start:stop] = depths.tolist()
+        self._set_depth([wire_index], int(depths[-1]))
+
+    def swap(self, qubit_1, qubit_2):
+        """
+        Add a swap gate.
+        """
+        return self._append("swap", (qubit_1, qubit_2))
+
+    def measure(self, qubit, clbit):
+        """
+        Add a measurement of a qubit into a classical bit.
+        """
+        return self._append("measure", (qubit, clbit))
+
+    def reset(self, qubit):
+        """
+        Add a reset of a qubit.
+        """
+        return self._append("reset", (qubit,))
+
+    def add_condition(self, wires, depth, clbits):
+        """
+        Make the most recently added instruction classically controlled, which moves it after the
+        instructions on its condition bits.
+
+        Parameters
+        ----------
+        wires: The qubits and classical bits of the instruction.
+        depth: The depth of the instruction before it was made classically controlled.
+        clbits: The classical bits of the condition.
+        """
+        self.nr_classically_controlled_ops += 1
+        clbit_indexes = [self._wire_indexes[clbit] for clbit in clbits]
+        depth = max([depth] + [self._wire_depths[clbit_index] + 1 for clbit_index in clbit_indexes])
+        self._set_depth([self._wire_indexes[wire] for wire in wires] + clbit_indexes, depth)
+
+    def _append(self, name, wires):
+        self.op_counts[name] += 1
+        wire_indexes = [self._wire_indexes[wire] for wire in wires]
+        depth = max(self._wire_depths[wire_index] for wire_index in wire_indexes) + 1
+        self._set_depth(wire_indexes, depth)
+        return _CountedInstruction(self, wires, depth)
+
+    def _set_depth(self, wire_indexes, depth):
+        for wire_index in wire_indexes:
+            self._wire_depths[wire_index] = depth
+        self._depth = max(self._depth, depth)
+
+
+class _CountedInstruction:
+    """
+    The result of adding an instruction to a CountingCircuit, which supports c_if.
+    """
+
+    def __init__(self, circuit, wires, depth):
+        self.circuit = circuit
+        self.wires = wires
+        self.depth = depth
+
+    def c_if(self, classical, _value):
+        """
+        Make the instruction classically controlled.
+
+        Parameters
+        ----------
+        classical: The classical bit or classical register that the instruction is conditioned on.
+        _value: The value of the condition (which does not affect the resources).
+
+        Returns
+        -------
+        The instruction.
+        """
+        clbits = list(classical) if isinstance(classical, ClassicalRegister) else [classical]
+        self.circuit.add_condition(self.wires, self.depth, clbits)
+        return self
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Estimate the resources that a distributed QFT needs (gates, EPR pairs, measurements, classical bits,
+and circuit depth) for a grid of cluster configurations, without building or simulating the
+circuits, and print them as a table.
+
+The grid is the cartesian product of the sizes, numbers of processors, and methods given on the
+command line. The resources are counted exactly by scheduling the circuit on a CountingCircuit (see
+counting_circuit) instead of a Qiskit circuit, one run of controlled phase gates at a time (see
+count_qft_circuit).
+"""
+
+import argparse
+from collections import Counter, namedtuple
+import csv
+import itertools
+import sys
+import time
+from placement import Placement, block_placement, place_qubits
+from qft import qft_gate_ops, qft_max_distance, qft_nr_gates
+from quantum_computer import (
+    ClusteredQuantumComputer,
+    Gate,
+    GateOp,
+    LazyTeleportScheduler,
+    Method,
+    ResetMethod,
+)
+
+METHOD_NAMES = [method.name.lower() for method in Method]
+PLACEMENT_NAMES = [placement.name.lower() for placement in Placement]
+RESET_METHOD_NAMES = [reset_method.name.lower() for reset_method in ResetMethod]
+TABLE_FORMATS = ["text", "csv"]
+TABLE_COLUMNS = [
+    ("total_nr_qubits", "qubits"),
+    ("nr_processors", "processors"),
+    ("method", "method"),
+    ("nr_local_gates", "local gates"),
+    ("nr_remote_gates", "remote gates"),
+    ("nr_epr_pairs", "EPR pairs"),
+    ("nr_measurements", "measurements"),
+    ("nr_classical_bits", "classical bits"),
+    ("nr_physical_qubits", "physical qubits"),
+    ("nr_instructions", "instructions"),
+    ("depth", "depth"),
+    ("estimate_time", "time (s)"),
+]
+
+
+def parse_command_line_arguments():
+    """
+    Parse the command line arguments.
+
+    Returns
+    -------
+    The parsed arguments in the form of a dictionary.
+    """
+    parser = argparse.ArgumentParser(
+        description="Estimate the resources that a distributed QFT needs"
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, required=True, help="Numbers of input qubits"
+    )
+    parser.add_argument(
+        "--nr-processors", nargs="+", type=int, default=[2], help="Numbers of processors"
+    )
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=METHOD_NAMES,
+        default=METHOD_NAMES,
+        help="Methods for distributed controlled gates",
+    )
+    parser.add_argument(
+        "--placement",
+        choices=PLACEMENT_NAMES,
+        default=Placement.BLOCK.name.lower(),
+        help="Placement of qubits on processors",
+    )
+    parser.add_argument(
+        "--nr-communication-qubits",
+        type=int,
+        default=1,
+        help="Number of communication qubits per processor",
+    )
+    parser.add_argument(
+        "--reset-method",
+        choices=RESET_METHOD_NAMES,
+        default=ResetMethod.RESET.name.lower(),
+        help="Method for resetting ancillary qubits",
+    )
+    parser.add_argument(
+        "--defer-measurements",
+        action="store_true",
+        help="Use controlled gates instead of mid-circuit measurements and classically controlled "
+        "gates",
+    )
+    parser.add_argument(
+        "--min-angle",
+        type=float,
+        default=0.0,
+        help=(
+            "Drop controlled phase rotations with a smaller angle (in radians) for an approximate "
+            "QFT (default: 0, exact QFT)"
+        ),
+    )
+    parser.add_argument(
+        "--format", choices=TABLE_FORMATS, default="text", help="Format of the table"
+    )
+    args = parser.parse_args()
+    return args
+
+
+def estimate_dqft_resources(
+    total_nr_qubits,
+    nr_processors,
+    method,
+    min_angle=0.0,
+    placement=Placement.BLOCK,
+    nr_communication_qubits=1,
+    reset_method=ResetMethod.RESET,
+    defer_measurements=False,
+):
+    """
+    Estimate the resources that a distributed QFT needs, without building the circuit.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    nr_processors: The number of quantum processors in the cluster.
+    method: The method that is used to implement distributed controlled-unitary gates.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the circuit.
+    placement: The placement of the qubits on the processors (see placement).
+    nr_communication_qubits: The number of communication qubits per processor.
+    reset_method: The method that is used to reset ancillary qubits before they are reused.
+    defer_measurements: If True, use controlled gates instead of mid-circuit measurements and
+        classically controlled gates.
+
+    Returns
+    -------
+    A dictionary with the parameters under keys total_nr_qubits, nr_processors, and method (the
+    lower case method name), and with the following resources:
+    nr_local_gates: The number of gates of the algorithm that act on qubits of a single processor.
+    nr_remote_gates: The number of two-qubit gates of the algorithm between qubits on different
+        processors.
+    nr_epr_pairs: The number of EPR pairs that are consumed.
+    nr_measurements: The number of measurements in the circuit.
+    nr_classical_bits: The number of classical bits in the circuit.
+    nr_physical_qubits: The number of qubits in the circuit (main and ancillary qubits).
+    nr_instructions: The number of instructions in the circuit.
+    depth: The depth of the circuit.
+    estimate_time: The time (in seconds) that it took to compute the estimate.
+    """
+    start_time = time.perf_counter()
+    if placement == Placement.BLOCK:
+        placement_report = qft_block_placement_report(total_nr_qubits, nr_processors, min_angle)
+    else:
+        placement_report = place_qubits(
+            qft_gate_ops(total_nr_qubits, min_angle), total_nr_qubits, nr_processors, placement
+        )
+    cluster = ClusteredQuantumComputer(
+        nr_processors,
+        total_nr_qubits,
+        method,
+        placement_report["qubit_processors"],
+        nr_communication_qubits,
+        reset_method,
+        defer_measurements,
+        estimate_resources=True,
+    )
+    count_qft_circuit(cluster, min_angle)
+    nr_gates = qft_nr_gates(total_nr_qubits, min_angle)
+    nr_remote_gates = placement_report["nr_remote_gates"]
+    op_counts = cluster.qc.count_ops()
+    return {
+        "total_nr_qubits": total_nr_qubits,
+        "nr_processors": nr_processors,
+        "method": method.name.lower(),
+        "nr_local_gates": nr_gates - nr_remote_gates,
+        "nr_remote_gates": nr_remote_gates,
+        "nr_epr_pairs": cluster.nr_epr_pairs,
+        "nr_measurements": op_counts.get("measure", 0),
+        "nr_classical_bits": cluster.qc.num_clbits,
+        "nr_physical_qubits": cluster.qc.num_qubits,
+        "nr_instructions": cluster.qc.size(),
+        "depth": cluster.qc.depth(),
+        "estimate_time": time.perf_counter() - start_time,
+    }
+
+
+ControlledPhaseRun = namedtuple("ControlledPhaseRun", ["qubit", "partners"])
+"""
+A run of controlled phase gates that share a qubit: a gate between each qubit in the range partners
+(with step one) and qubit, in order, with qubit as the target qubit. Runs are only counted, so the
+gates have no angles.
+"""
+
+
+class QFTGateRuns:
+    """
+    The gates of a quantum Fourier transformation (the same as qft.qft_gate_ops), with the
+    controlled phase gates of each target qubit as a single run (see ControlledPhaseRun), which
+    can look ahead at the following two-qubit gates of a qubit using the structure of the quantum
+    Fourier transformation.
+    """
+
+    def __init__(self, total_nr_qubits, min_angle=0.0):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+        min_angle: The smallest angle (in radians) of the controlled phase rotations (see
+            qft.qft_gate_ops).
+        """
+        self.total_nr_qubits = total_nr_qubits
+        self.max_distance = qft_max_distance(total_nr_qubits, min_angle)
+        self.items = []
+        for target_qubit in reversed(range(total_nr_qubits)):
+            self.items.append(GateOp(Gate.HADAMARD, (target_qubit,), None))
+            control_qubits = range(max(0, target_qubit - self.max_distance), target_qubit)
+            self.items.append(ControlledPhaseRun(target_qubit, control_qubits))
+        for qubit in range(total_nr_qubits // 2):
+            self.items.append(GateOp(Gate.SWAP, (qubit, total_nr_qubits - qubit - 1), None))
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def following_partners(self, qubit, position, offset):
+        """
+        Generate the other qubits of the two-qubit gates of a qubit, in order, starting at a gate.
+
+        Parameters
+        ----------
+        qubit: The (global) index of the qubit.
+        position: The position in items of the gate operation or run of the gate.
+        offset: The number of gates in the run at position that come before the gate (zero for a
+            gate operation).
+
+        Returns
+        -------
+        A generator of ranges of qubits (with step one or minus one).
+        """
+        # Positions 2 * i and 2 * i + 1 are the Hadamard gate and the run of target qubit
+        # total_nr_qubits - 1 - i, and they are followed by the swap gates
+        total_nr_qubits = self.total_nr_qubits
+        swap_index = max(0, position - 2 * total_nr_qubits)
+        if position < 2 * total_nr_qubits:
+            target_qubit = total_nr_qubits - 1 - position // 2
+            control_qubit = max(0, target_qubit - self.max_distance) + offset
+            if qubit == target_qubit:
+                # The remaining control qubits of the current target qubit
+                yield range(control_qubit, target_qubit)
+            elif qubit < target_qubit:
+                if qubit >= control_qubit:
+                    # The current target qubit
+                    yield range(target_qubit, target_qubit + 1)
+                # The following target qubits that qubit is a control qubit of, and then the
+                # control qubits of qubit itself
+                last_target_qubit = min(target_qubit - 1, qubit + self.max_distance)
+                yield range(last_target_qubit, qubit, -1)
+                yield range(max(0, qubit - self.max_distance), qubit)
+        swap_partner = total_nr_qubits - qubit - 1
+        if swap_partner != qubit and min(qubit, swap_partner) >= swap_index:
+            yield range(swap_partner, swap_partner + 1)
+
+
+def qft_block_placement_report(total_nr_qubits, nr_processors, min_angle=0.0):
+    """
+    Determine the block placement of the qubits of a quantum Fourier transformation, without
+    computing its interaction graph.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    nr_processors: The number of processors.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations (see
+        qft.qft_gate_ops).
+
+    Returns
+    -------
+    The same dictionary as place_qubits for Placement.BLOCK.
+    """
+    qubit_processors = block_placement(total_nr_qubits, nr_processors)
+    nr_qubits_per_processor = total_nr_qubits // nr_processors
+    max_distance = qft_max_distance(total_nr_qubits, min_angle)
+    nr_remote_gates = 0
+    for target_qubit in range(total_nr_qubits):
+        # The control qubits before the block of the target qubit are on other processors
+        block_start = target_qubit - target_qubit % nr_qubits_per_processor
+        nr_remote_gates += max(0, block_start - max(0, target_qubit - max_distance))
+    for qubit in range(total_nr_qubits // 2):
+        if qubit_processors[qubit] != qubit_processors[total_nr_qubits - qubit - 1]:
+            nr_remote_gates += 1
+    return {
+        "qubit_processors": qubit_processors,
+        "nr_remote_gates": nr_remote_gates,
+        "nr_block_remote_gates": nr_remote_gates,
+    }
+
+
+def count_qft_circuit(cluster, min_angle=0.0):
+    """
+    Count the resources of a quantum Fourier transformation on a clustered quantum computer whose
+    main circuit is a CountingCircuit.
+
+    The counts and the depth are the same as for qft.create_qft_circuit, but the controlled phase
+    gates of each target qubit are scheduled one run at a time (see QFTGateRuns): the gates with
+    consecutive qubits on the same processor are added together (see CountingCircuit.cp_run), which
+    is much faster for large numbers of qubits.
+
+    Parameters
+    ----------
+    cluster: The ClusteredQuantumComputer to count the resources on.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the circuit
+        (see qft.qft_gate_ops).
+    """
+    gate_runs = QFTGateRuns(cluster.total_nr_qubits, min_angle)
+    home_segments = _home_segments(cluster.qubit_processors)
+    if cluster.method == Method.TELEPORT:
+        _RunTeleportScheduler(cluster, home_segments).run(gate_runs)
+        return
+    for item in gate_runs:
+        if isinstance(item, ControlledPhaseRun):
+            _count_controlled_phase_run(cluster, item, home_segments)
+        else:
+            cluster.apply_gates([item])
+
+
+def _home_segments(qubit_processors):
+    # For each qubit, the first qubit and one past the last qubit of the longest range of
+    # consecutive qubits around it that are placed on the same processor
+    total_nr_qubits = len(qubit_processors)
+    segment_starts = [0] * total_nr_qubits
+    segment_stops = [total_nr_qubits] * total_nr_qubits
+    for qubit in range(1, total_nr_qubits):
+        if qubit_processors[qubit] == qubit_processors[qubit - 1]:
+            segment_starts[qubit] = segment_starts[qubit - 1]
+        else:
+            segment_starts[qubit] = qubit
+    for qubit in reversed(range(total_nr_qubits - 1)):
+        if qubit_processors[qubit] == qubit_processors[qubit + 1]:
+            segment_stops[qubit] = segment_stops[qubit + 1]
+        else:
+            segment_stops[qubit] = qubit + 1
+    return (segment_starts, segment_stops)
+
+
+def _count_controlled_phase_run(cluster, run, home_segments):
+    # Schedule the gates of a run in the same way as the cluster schedules a run of consecutive
+    # controlled phase gates with the cat state method, but add the gates with the partners in each
+    # home segment together. Each partner has a single gate (with run.qubit), so the same fan-out is
+    # chosen for all partners in a segment.
+    segments = _home_segment_ranges(run.partners, home_segments)
+    fan_outs = _controlled_phase_run_fan_outs(cluster, run, segments)
+    for (control_qubit, target_processor_index), target_ranges in fan_outs.items():
+        _count_fan_out(cluster, control_qubit, target_processor_index, target_ranges)
+
+
+def _controlled_phase_run_fan_outs(cluster, run, segments):
+    # Add the gates of a run with the partners on the same processor as run.qubit, and return the
+    # fan-outs for the other gates (see _count_fan_out), in the same way as
+    # ClusteredQuantumComputer._apply_controlled_phases
+    (processor_index, local_qubit_index) = cluster.global_to_local_index(run.qubit)
+    candidate_counts = Counter()
+    for segment in segments:
+        candidate_counts[(run.qubit, cluster.qubit_processors[segment.start])] += len(segment)
+        candidate_counts[(segment.start, processor_index)] += 1
+    fan_outs = {}
+    for segment in segments:
+        (partner_processor_index, local_partner_index) = cluster.global_to_local_index(
+            segment.start
+        )
+        local_partner_indexes = range(local_partner_index, local_partner_index + len(segment))
+        if partner_processor_index == processor_index:
+            main_reg = cluster.processors[processor_index].main_reg
+            cluster.qc.cp_run(main_reg[local_qubit_index], main_reg, local_partner_indexes)
+        elif cluster.choose_fan_out(segment.start, run.qubit, candidate_counts)[0] == run.qubit:
+            fan_outs.setdefault((run.qubit, partner_processor_index), []).append(
+                local_partner_indexes
+            )
+        else:
+            for partner in segment:
+                fan_outs.setdefault((partner, processor_index), []).append(
+                    range(local_qubit_index, local_qubit_index + 1)
+                )
+    return fan_outs
+
+
+def _home_segment_ranges(qubits, home_segments):
+    # Split a range of qubits (with step one) into ranges of qubits in the same home segment
+    segment_stops = home_segments[1]
+    segments = []
+    qubit = qubits.start
+    while qubit < qubits.stop:
+        segments.append(range(qubit, min(qubits.stop, segment_stops[qubit])))
+        qubit = segments[-1].stop
+    return segments
+
+
+def _count_fan_out(cluster, control_qubit, target_processor_index, target_ranges):
+    # The same as ClusteredQuantumComputer.distributed_controlled_phase_fan_out, for ranges of
+    # local target qubit indexes
+    (control_processor_index, local_control_qubit_index) = cluster.global_to_local_index(
+        control_qubit
+    )
+    control_processor = cluster.processors[control_processor_index]
+    target_processor = cluster.processors[target_processor_index]
+    entanglement_qubit_index = control_processor.cat_entangle(
+        target_processor, local_control_qubit_index
+    )
+    for target_range in target_ranges:
+        cluster.qc.cp_run(
+            target_processor.entanglement_reg[entanglement_qubit_index],
+            target_processor.main_reg,
+            target_range,
+        )
+    control_processor.cat_disentangle(
+        target_processor, local_control_qubit_index, entanglement_qubit_index
+    )
+    nr_gates = sum(len(target_range) for target_range in target_ranges)
+    cluster.nr_epr_pairs_saved += nr_gates - 1
+
+
+class _RunTeleportScheduler(LazyTeleportScheduler):
+    """
+    Schedules the gates of a quantum Fourier transformation with the teleport method in the same
+    way as LazyTeleportScheduler, but the gates of a run of controlled phase gates with consecutive
+    qubits that are at home on the processor where the shared qubit is located are added together,
+    and the following gates of a qubit are determined from the structure of the quantum Fourier
+    transformation (see QFTGateRuns).
+    """
+
+    def __init__(self, cluster, home_segments):
+        LazyTeleportScheduler.__init__(self, cluster)
+        self.home_segments = home_segments
+        self.gate_runs = None
+        # The number of gates of the run at the current position that have already been applied
+        self.offset = 0
+
+    def run(self, gate_ops):
+        self.gate_runs = gate_ops
+        for self.position, item in enumerate(self.gate_runs):
+            self.offset = 0
+            if isinstance(item, ControlledPhaseRun):
+                self._apply_controlled_phase_run(item)
+            else:
+                self.apply_gate(item)
+        self.finish()
+
+    def _apply_controlled_phase_run(self, run):
+        # Apply the gates with the partners from the current one up to the end of its home segment
+        # or up to the first one that is not at home together, if the shared qubit is located on
+        # the same processor. Otherwise apply only the gate with the current partner, which may
+        # move one of its qubits.
+        segment_stops = self.home_segments[1]
+        while self.offset < len(run.partners):
+            partner = run.partners[self.offset]
+            stop = min(
+                [run.partners.stop, segment_stops[partner]]
+                + [visitor for visitor in self._visitors() if visitor >= partner]
+            )
+            processor_index = self.cluster.qubit_processors[partner]
+            if stop == partner or self.qubit_locations[run.qubit] != processor_index:
+                self.apply_gate(GateOp(Gate.CONTROLLED_PHASE, (partner, run.qubit), None))
+                self.offset += 1
+                continue
+            if processor_index != self.cluster.qubit_processors[run.qubit]:
+                self.nr_remote_gates += stop - partner
+            (_, local_qubit_index) = self.cluster.global_to_local_index(partner)
+            self.cluster.qc.cp_run(
+                self.slot(run.qubit),
+                self.cluster.processors[processor_index].main_reg,
+                range(local_qubit_index, local_qubit_index + stop - partner),
+            )
+            self.offset += stop - partner
+
+    def nr_gates_served(self, qubit, processor_index):
+        nr_gates = 0
+        for partners in self.gate_runs.following_partners(qubit, self.position, self.offset):
+            nr_located = self._nr_located_on(partners, processor_index)
+            nr_gates += nr_located
+            if nr_located < len(partners):
+                break
+        return nr_gates
+
+    def _nr_located_on(self, qubits, processor_index):
+        # The number of qubits at the start of a range of qubits that are currently located on
+        # processor_index. Qubits that are not visitors are on their own processor, so the range
+        # is walked one home segment at a time.
+        (segment_starts, segment_stops) = self.home_segments
+        visitor_locations = {visitor: self.qubit_locations[visitor] for visitor in self._visitors()}
+        position = 0
+        while position < len(qubits):
+            qubit = qubits[position]
+            if qubits.step > 0:
+                segment_length = segment_stops[qubit] - qubit
+            else:
+                segment_length = qubit - segment_starts[qubit] + 1
+            segment = qubits[position : position + segment_length]
+            if self.cluster.qubit_processors[qubit] == processor_index:
+                # Only the visitors from this segment are not located on processor_index
+                away_positions = [
+                    segment.index(visitor)
+                    for visitor, location in visitor_locations.items()
+                    if visitor in segment and location != processor_index
+                ]
+                if away_positions:
+                    return position + min(away_positions)
+            else:
+                # Only the visitors on processor_index from this segment are located there
+                offset = 0
+                while (
+                    offset < len(segment)
+                    and visitor_locations.get(segment[offset]) == processor_index
+                ):
+                    offset += 1
+                if offset < len(segment):
+                    return position + offset
+            position += len(segment)
+        return len(qubits)
+
+    def _visitors(self):
+        # The qubits that are not on their own processor
+        return [
+            visitor
+            for processor_visitors in self.visitors
+            for visitor in processor_visitors
+            if visitor is not None
+        ]
+
+
+def print_table(estimates, table_format="text", file=sys.stdout):
+    """
+    Print resource estimates as a table, with one row for each estimate.
+
+    Parameters
+    ----------
+    estimates: The resource estimates (see estimate_dqft_resources).
+    table_format: "text" for a table with aligned columns, or "csv" for comma separated values.
+    file: The file to print the table to.
+    """
+    headers = [header for (_key, header) in TABLE_COLUMNS]
+    rows = [
+        [
+            f"{estimate[key]:.3f}" if key == "estimate_time" else str(estimate[key])
+            for (key, _header) in TABLE_COLUMNS
+        ]
+        for estimate in estimates
+    ]
+    if table_format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return
+    widths = [max(len(cell) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)), file=file)
+
+
+def main():
+    """
+    The main function.
+    """
+    args = parse_command_line_arguments()
+    estimates = [
+        estimate_dqft_resources(
+            total_nr_qubits,
+            nr_processors,
+            Method[method_name.upper()],
+            args.min_angle,
+            Placement[args.placement.upper()],
+            args.nr_communication_qubits,
+            ResetMethod[args.reset_method.upper()],
+            args.defer_measurements,
+        )
+        for total_nr_qubits, nr_processors, method_name in itertools.product(
+            args.sizes, args.nr_processors, args.methods
+        )
+        if total_nr_qubits % nr_processors == 0
+    ]
+    print_table(estimates, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+A simple in-process statevector simulator, implemented in NumPy, for the gates that are used by the
+quantum computers in this package.
+
+For small circuits, the fixed overhead of transpiling a circuit and running a job on the Aer
+simulator is much larger than the cost of the simulation itself. This simulator runs the
+instructions of a circuit directly on a complex128 statevector, without transpilation. It is
+selected by passing backend="numpy" to QuantumComputer.run or QuantumComputer.run_batch.
+
+The statevector is stored as a tensor with one axis of size two for each qubit, with the axis for
+qubit index i at position num_qubits - 1 - i (so that flattening the tensor gives the statevector
+in Qiskit's little-endian order). Gates are applied by indexing, flipping, or contracting the axes
+of the qubits that they act on. Mid-circuit measurements and resets are simulated by sampling the
+outcome and collapsing the statevector (like the Aer simulator does for each shot).
+"""
+
+import numpy
+from qiskit.circuit import Clbit
+from qiskit.quantum_info import Statevector
+
+BACKEND_NAME = "numpy"
+IGNORED_INSTRUCTIONS = ["barrier", "delay"]
+
+
+class NumpySimulator:
+    """
+    A statevector simulator with the same run interface as the Aer simulator backends (as far as it
+    is used in this package).
+    """
+
+    name = BACKEND_NAME
+
+    def __init__(self, seed=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        seed: The seed for sampling the outcomes of measurements and resets (None means random).
+        """
+        self.rng = numpy.random.default_rng(seed)
+
+    def run(self, circuits, shots=1):
+        """
+        Run one or more circuits.
+
+        Parameters
+        ----------
+        circuits: A circuit or a list of circuits.
+        shots: How many times each circuit must be executed to collect statistics.
+
+        Returns
+        -------
+        A NumpySimulatorJob, whose result contains the final statevector (of the last shot) and the
+        measurement counts of each circuit.
+        """
+        if not isinstance(circuits, list):
+            circuits = [circuits]
+        experiments = []
+        for circuit in circuits:
+            counts = {}
+            for _shot in range(shots):
+                (statevector, memory) = _StatevectorRun(circuit, self.rng).run()
+                counts[memory] = counts.get(memory, 0) + 1
+            experiments.append({"statevector": statevector, "counts": counts})
+        return NumpySimulatorJob(NumpySimulatorResult(experiments))
+
+
+class NumpySimulatorJob:
+    """
+    A job that has already finished (the simulation runs synchronously).
+    """
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        """
+        Returns
+        -------
+        The NumpySimulatorResult of the job.
+        """
+        return self._result
+
+
+class NumpySimulatorResult:
+    """
+    The results of running one or more circuits on the NumpySimulator.
+    """
+
+    def __init__(self, experiments):
+        self._experiments = experiments
+
+    def get_statevector(self, experiment=0):
+        """
+        Parameters
+        ----------
+        experiment: The index of the circuit.
+
+        Returns
+        -------
+        The final statevector of the circuit (of the last shot), as a Statevector.
+        """
+        return Statevector(self._experiments[experiment]["statevector"])
+
+    def get_counts(self, experiment=0):
+        """
+        Parameters
+        ----------
+        experiment: The index of the circuit.
+
+        Returns
+        -------
+        A dictionary with, for each value of the classical bits at the end of the circuit (as a bit
+        string, most significant bit first), the number of shots that ended with that value.
+        """
+        return self._experiments[experiment]["counts"]
+
+
+class _StatevectorRun:
+    """
+    A single shot of a circuit.
+    """
+
+    def __init__(self, circuit, rng):
+        self.circuit = circuit
+        self.rng = rng
+        self.nr_qubits = circuit.num_qubits
+        self.qubit_axes = {
+            qubit: self.nr_qubits - 1 - index for (index, qubit) in enumerate(circuit.qubits)
+        }
+        self.clbit_indexes = {clbit: index for (index, clbit) in enumerate(circuit.clbits)}
+        self.clbit_values = [0] * circuit.num_clbits
+        self.state = numpy.zeros((2,) * self.nr_qubits, dtype=numpy.complex128)
+        self.state[(0,) * self.nr_qubits] = 1.0
+        self.apply_functions = {
+            "h": self._apply_h,
+            "x": self._apply_x,
+            "z": self._apply_z,
+            "cx": self._apply_cx,
+            "cz": self._apply_cz,
+            "cp": self._apply_cp,
+            "swap": self._apply_swap,
+            "measure": self._apply_measure,
+            "reset": self._apply_reset,
+            "initialize": self._apply_initialize,
+            "save_statevector": lambda _operation, _axes, _clbits: None,
+        }
+
+    def run(self):
+        """
+        Run the circuit.
+
+        Returns
+        -------
+        A tuple with the final statevector (as a numpy array) and the final value of the classical
+        bits (as a bit string, most significant bit first).
+        """
+        for instruction in self.circuit.data:
+            operation = instruction.operation
+            if operation.name in IGNORED_INSTRUCTIONS:
+                continue
+            if operation.condition is not None and not self._condition_holds(operation.condition):
+                continue
+            axes = [self.qubit_axes[qubit] for qubit in instruction.qubits]
+            clbits = [self.clbit_indexes[clbit] for clbit in instruction.clbits]
+            apply_function = self.apply_functions.get(operation.name, self._apply_matrix)
+            apply_function(operation, axes, clbits)
+        memory = "".join(str(value) for value in reversed(self.clbit_values))
+        return (self.state.reshape(-1), memory)
+
+    def _condition_holds(self, condition):
+        (target, value) = condition
+        if isinstance(target, Clbit):
+            return self.clbit_values[self.clbit_indexes[target]] == int(value)
+        register_value = sum(
+            self.clbit_values[self.clbit_indexes[clbit]] << index
+            for (index, clbit) in enumerate(target)
+        )
+        return register_value == value
+
+    def _index(self, axis_values):
+        # An index into the state tensor that selects the given value for each given axis
+        index = [slice(None)] * self.nr_qubits
+        for axis, value in axis_values.items():
+            index[axis] = value
+        return tuple(index)
+
+    def _apply_h(self, _operation, axes, _clbits):
+        (axis,) = axes
+        zero = self.state[self._index({axis: 0})]
+        one = self.state[self._index({axis: 1})]
+        self.state = numpy.stack([zero + one, zero - one], axis=axis) * numpy.sqrt(0.5)
+
+    def _apply_x(self, _operation, axes, _clbits):
+        (axis,) = axes
+        self.state = numpy.flip(self.state, axis=axis)
+
+    def _apply_z(self, _operation, axes, _clbits):
+        (axis,) = axes
+        self.state[self._index({axis: 1})] *= -1.0
+
+    def _apply_cx(self, _operation, axes, _clbits):
+        (control_axis, target_axis) = axes
+        index = self._index({control_axis: 1})
+        # The target axis in the sub-tensor, which lacks the control axis
+        sub_target_axis = target_axis - 1 if target_axis > control_axis else target_axis
+        self.state[index] = numpy.flip(self.state[index], axis=sub_target_axis).copy()
+
+    def _apply_cz(self, _operation, axes, _clbits):
+        (control_axis, target_axis) = axes
+        self.state[self._index({control_axis: 1, target_axis: 1})] *= -1.0
+
+    def _apply_cp(self, operation, axes, _clbits):
+        (control_axis, target_axis) = axes
+        phase = numpy.exp(1j * float(operation.params[0]))
+        self.state[self._index({control_axis: 1, target_axis: 1})] *= phase
+
+    def _apply_swap(self, _operation, axes, _clbits):
+        (axis_1, axis_2) = axes
+        self.state = numpy.swapaxes(self.state, axis_1, axis_2)
+
+    def _apply_matrix(self, operation, axes, _clbits):
+        # Any other unitary gate: contract its matrix with the axes of its qubits. The row index of
+        # the matrix has the first qubit as least significant bit, so the matrix tensor has the
+        # axes of the qubits in reverse order.
+        nr_gate_qubits = len(axes)
+        matrix = numpy.asarray(operation.to_matrix(), dtype=numpy.complex128)
+        tensor = matrix.reshape((2,) * (2 * nr_gate_qubits))
+        state_axes = list(reversed(axes))
+        self.state = numpy.moveaxis(
+            numpy.tensordot(
+                tensor, self.state, axes=(range(nr_gate_qubits, 2 * nr_gate_qubits), state_axes)
+            ),
+            range(nr_gate_qubits),
+            state_axes,
+        )
+
+    def _measure_axis(self, axis):
+        # Sample the outcome of measuring the qubit with the given axis, and collapse the state
+        probability_one = numpy.sum(numpy.abs(self.state[self._index({axis: 1})]) ** 2)
+        outcome = int(self.rng.random() < probability_one)
+        self.state = numpy.array(self.state)
+        self.state[self._index({axis: 1 - outcome})] = 0.0
+        probability = probability_one if outcome else 1.0 - probability_one
+        self.state /= numpy.sqrt(probability)
+        return outcome
+
+    def _apply_measure(self, _operation, axes, clbits):
+        (axis,) = axes
+        (clbit,) = clbits
+        self.clbit_values[clbit] = self._measure_axis(axis)
+
+    def _apply_reset(self, operation, axes, clbits):
+        for axis in axes:
+            if self._measure_axis(axis) == 1:
+                self._apply_x(operation, [axis], clbits)
+
+    def _apply_initialize(self, operation, axes, clbits):
+        self._apply_reset(operation, axes, clbits)
+        params = operation.params
+        if all(isinstance(param, str) for param in params):
+            # A label with one character for each qubit, most significant qubit first
+            for axis, label in zip(reversed(axes), params):
+                assert label in "01", "Only computational basis labels are supported"
+                if label == "1":
+                    self._apply_x(operation, [axis], clbits)
+            return
+        # The amplitudes of the state of the qubits, in little-endian order
+        amplitudes = numpy.asarray(params, dtype=numpy.complex128)
+        rest = self.state[self._index({axis: 0 for axis in axes})]
+        tensor = numpy.tensordot(amplitudes.reshape((2,) * len(axes)), rest, axes=0)
+        self.state = numpy.moveaxis(tensor, range(len(axes)), list(reversed(axes)))
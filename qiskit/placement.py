@@ -0,0 +1,259 @@
+"""
+Placement of qubits on the processors of a clustered quantum computer.
+
+A placement assigns each (global) qubit of an algorithm to a processor. Each processor gets the same
+number of qubits. A two-qubit gate on qubits that are placed on different processors is a remote
+gate, which is implemented using teleportation or cat states and which consumes entanglement.
+Different placements are computed from the two-qubit interaction graph of the algorithm, with the
+goal of minimizing the number of remote gates.
+"""
+
+from enum import Enum
+import numpy
+from quantum_computer import Gate
+
+
+class Placement(Enum):
+    """
+    The method that is used to place qubits on processors.
+    """
+
+    BLOCK = 1
+    """
+    Place consecutive blocks of qubits on each processor: qubits 0 through k-1 on processor 0,
+    qubits k through 2k-1 on processor 1, etc.
+    """
+
+    GREEDY = 2
+    """
+    Place the qubits one at a time (most connected qubits first) on the processor that contains the
+    qubits that it interacts with most.
+    """
+
+    KERNIGHAN_LIN = 3
+    """
+    Start with the block placement and with the greedy placement, improve both by repeatedly
+    swapping qubits between pairs of processors as long as that reduces the number of remote gates
+    (Kernighan-Lin), and keep the best result.
+    """
+
+
+TWO_QUBIT_GATES = [Gate.CONTROLLED_PHASE, Gate.SWAP]
+
+
+def interaction_graph(gate_ops, total_nr_qubits):
+    """
+    Determine the two-qubit interaction graph of an algorithm.
+
+    Parameters
+    ----------
+    gate_ops: An iterable of gate operations (see quantum_computer.GateOp).
+    total_nr_qubits: The number of qubits in the algorithm.
+
+    Returns
+    -------
+    A symmetric numpy matrix, where the element at [qubit_1, qubit_2] is the number of two-qubit
+    gates between qubit_1 and qubit_2.
+    """
+    weights = numpy.zeros((total_nr_qubits, total_nr_qubits))
+    for gate_op in gate_ops:
+        if gate_op.gate in TWO_QUBIT_GATES:
+            (qubit_1, qubit_2) = gate_op.qubit_indexes
+            weights[qubit_1, qubit_2] += 1
+            weights[qubit_2, qubit_1] += 1
+    return weights
+
+
+def nr_remote_gates(weights, qubit_processors):
+    """
+    Count the remote two-qubit gates for a placement.
+
+    Parameters
+    ----------
+    weights: The interaction graph (see interaction_graph).
+    qubit_processors: The placement, as a list that contains the processor index for each qubit.
+
+    Returns
+    -------
+    The number of two-qubit gates between qubits on different processors.
+    """
+    qubit_processors = numpy.asarray(qubit_processors)
+    remote = qubit_processors[:, None] != qubit_processors[None, :]
+    return int(round(numpy.sum(weights[remote]) / 2))
+
+
+def block_placement(total_nr_qubits, nr_processors):
+    """
+    Compute the block placement (see Placement.BLOCK).
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits. Must be a multiple of nr_processors.
+    nr_processors: The number of processors.
+
+    Returns
+    -------
+    The placement, as a list that contains the processor index for each qubit.
+    """
+    nr_qubits_per_processor = total_nr_qubits // nr_processors
+    return [qubit // nr_qubits_per_processor for qubit in range(total_nr_qubits)]
+
+
+def greedy_placement(weights, nr_processors):
+    """
+    Compute the greedy placement (see Placement.GREEDY).
+
+    Parameters
+    ----------
+    weights: The interaction graph (see interaction_graph).
+    nr_processors: The number of processors. The number of qubits must be a multiple of this.
+
+    Returns
+    -------
+    The placement, as a list that contains the processor index for each qubit.
+    """
+    total_nr_qubits = len(weights)
+    capacity = total_nr_qubits // nr_processors
+    qubit_processors = [None] * total_nr_qubits
+    processor_loads = [0] * nr_processors
+    # Connection weight between each qubit and the qubits already placed on each processor
+    connections = numpy.zeros((total_nr_qubits, nr_processors))
+    degrees = numpy.sum(weights, axis=1)
+    for qubit in sorted(range(total_nr_qubits), key=lambda qubit: -degrees[qubit]):
+        # Prefer the processor with the strongest connection, and then the least loaded one
+        processor_index = None
+        for index in range(nr_processors):
+            if processor_loads[index] >= capacity:
+                continue
+            if processor_index is None or (
+                connections[qubit, index],
+                -processor_loads[index],
+            ) > (connections[qubit, processor_index], -processor_loads[processor_index]):
+                processor_index = index
+        qubit_processors[qubit] = processor_index
+        processor_loads[processor_index] += 1
+        connections[:, processor_index] += weights[:, qubit]
+    return qubit_processors
+
+
+def kernighan_lin_placement(weights, nr_processors, initial_qubit_processors=None):
+    """
+    Compute the Kernighan-Lin placement (see Placement.KERNIGHAN_LIN).
+
+    Parameters
+    ----------
+    weights: The interaction graph (see interaction_graph).
+    nr_processors: The number of processors. The number of qubits must be a multiple of this.
+    initial_qubit_processors: The placement to start from. If None, start from both the block
+        placement and the greedy placement, and return the best result.
+
+    Returns
+    -------
+    The placement, as a list that contains the processor index for each qubit.
+    """
+    if initial_qubit_processors is None:
+        candidates = [
+            kernighan_lin_placement(weights, nr_processors, initial_qubit_processors)
+            for initial_qubit_processors in [
+                block_placement(len(weights), nr_processors),
+                greedy_placement(weights, nr_processors),
+            ]
+        ]
+        return min(candidates, key=lambda candidate: nr_remote_gates(weights, candidate))
+    qubit_processors = numpy.array(initial_qubit_processors)
+    improved = True
+    while improved:
+        improved = False
+        for processor_a in range(nr_processors):
+            for processor_b in range(processor_a + 1, nr_processors):
+                if _kernighan_lin_pass(weights, qubit_processors, processor_a, processor_b):
+                    improved = True
+    return [int(processor_index) for processor_index in qubit_processors]
+
+
+def _kernighan_lin_pass(weights, qubit_processors, processor_a, processor_b):
+    # One Kernighan-Lin pass between two processors: tentatively swap the best pairs of unlocked
+    # qubits one at a time, and then keep the prefix of swaps with the largest total gain.
+    in_a = qubit_processors == processor_a
+    in_b = qubit_processors == processor_b
+    # Reduction of the number of remote gates for moving each qubit to the other processor
+    # (connections to the other processor minus connections to its own processor)
+    to_a = weights @ in_a.astype(float)
+    to_b = weights @ in_b.astype(float)
+    move_gains = numpy.where(in_a, to_b - to_a, to_a - to_b)
+    (swaps, total_gains) = _kernighan_lin_swaps(
+        weights, move_gains, list(numpy.flatnonzero(in_a)), list(numpy.flatnonzero(in_b))
+    )
+    if not total_gains or max(total_gains) < 0.5:
+        return False
+    nr_swaps = int(numpy.argmax(total_gains)) + 1
+    for qubit_a, qubit_b in swaps[:nr_swaps]:
+        qubit_processors[qubit_a] = processor_b
+        qubit_processors[qubit_b] = processor_a
+    return True
+
+
+def _kernighan_lin_swaps(weights, move_gains, unlocked_a, unlocked_b):
+    swaps = []
+    total_gains = []
+    total_gain = 0.0
+    while unlocked_a and unlocked_b:
+        pair_gains = (
+            move_gains[unlocked_a][:, None]
+            + move_gains[unlocked_b][None, :]
+            - 2.0 * weights[numpy.ix_(unlocked_a, unlocked_b)]
+        )
+        (index_a, index_b) = divmod(int(numpy.argmax(pair_gains)), len(unlocked_b))
+        total_gain += pair_gains[index_a, index_b]
+        qubit_a = unlocked_a.pop(index_a)
+        qubit_b = unlocked_b.pop(index_b)
+        swaps.append((qubit_a, qubit_b))
+        total_gains.append(total_gain)
+        for qubit in unlocked_a:
+            move_gains[qubit] += 2.0 * weights[qubit, qubit_a] - 2.0 * weights[qubit, qubit_b]
+        for qubit in unlocked_b:
+            move_gains[qubit] += 2.0 * weights[qubit, qubit_b] - 2.0 * weights[qubit, qubit_a]
+    return (swaps, total_gains)
+
+
+def place_qubits(gate_ops, total_nr_qubits, nr_processors, placement=Placement.BLOCK):
+    """
+    Place the qubits of an algorithm on processors.
+
+    Parameters
+    ----------
+    gate_ops: An iterable of gate operations (see quantum_computer.GateOp) of the algorithm.
+    total_nr_qubits: The number of qubits in the algorithm. Must be a multiple of nr_processors.
+    nr_processors: The number of processors.
+    placement: Either a Placement, or an explicit placement in the form of a list that contains
+        the processor index for each qubit.
+
+    Returns
+    -------
+    A dictionary with the following keys:
+    qubit_processors: The placement, as a list that contains the processor index for each qubit.
+    nr_remote_gates: The number of remote two-qubit gates for this placement.
+    nr_block_remote_gates: The number of remote two-qubit gates for the block placement, for
+        comparison.
+    """
+    weights = interaction_graph(gate_ops, total_nr_qubits)
+    if placement == Placement.BLOCK:
+        qubit_processors = block_placement(total_nr_qubits, nr_processors)
+    elif placement == Placement.GREEDY:
+        qubit_processors = greedy_placement(weights, nr_processors)
+    elif placement == Placement.KERNIGHAN_LIN:
+        qubit_processors = kernighan_lin_placement(weights, nr_processors)
+    else:
+        qubit_processors = list(placement)
+        assert len(qubit_processors) == total_nr_qubits, "Placement must place every qubit"
+        for processor_index in range(nr_processors):
+            assert (
+                qubit_processors.count(processor_index) == total_nr_qubits // nr_processors
+            ), "Placement must place the same number of qubits on each processor"
+    return {
+        "qubit_processors": qubit_processors,
+        "nr_remote_gates": nr_remote_gates(weights, qubit_processors),
+        "nr_block_remote_gates": nr_remote_gates(
+            weights, block_placement(total_nr_qubits, nr_processors)
+        ),
+    }
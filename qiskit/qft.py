@@ -2,11 +2,20 @@
 A non-distributed implementation of the Quantum Fourier Transformation (QFT).
 """
 
+from math import ldexp, log2
 from numpy import pi
-from quantum_computer import ClusteredQuantumComputer, MonolithicQuantumComputer
+from quantum_computer import (
+    ClusteredQuantumComputer,
+    Gate,
+    GateOp,
+    MonolithicQuantumComputer,
+    ResetMethod,
+)
+from placement import Placement, place_qubits
+from counting_circuit import CountingCircuit
 
 
-def create_qft_circuit(computer):
+def create_qft_circuit(computer, min_angle=0.0):
     """
     Create the circuit for a quantum Fourier transformation on the given quantum computer.
 
@@ -14,26 +23,86 @@ def create_qft_circuit(computer):
     ----------
     computer: Create the quantum circuit on this computer. Must be an instance of either
         MonolithicQuantumComputer or ClusteredQuantumComputer.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations in the circuit
+        (see qft_gate_ops).
     """
-    _create_qft_circuit_rotations(computer, computer.total_nr_qubits)
-    _create_qft_circuit_final_swaps(computer)
+    computer.apply_gates(qft_gate_ops(computer.total_nr_qubits, min_angle))
 
 
-def _create_qft_circuit_rotations(computer, remaining_nr_qubits):
-    if remaining_nr_qubits == 0:
-        return
-    remaining_nr_qubits -= 1
-    computer.hadamard(remaining_nr_qubits)
-    for qubit in range(remaining_nr_qubits):
-        computer.controlled_phase(
-            pi / 2 ** (remaining_nr_qubits - qubit), qubit, remaining_nr_qubits
-        )
-    _create_qft_circuit_rotations(computer, remaining_nr_qubits)
+def qft_gate_ops(total_nr_qubits, min_angle=0.0):
+    """
+    Generate the gates for a quantum Fourier transformation, without recursion.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations that are
+        generated. Controlled phase rotations with smaller angles are dropped, which results in an
+        approximate quantum Fourier transformation. Zero means all rotations are generated (exact
+        quantum Fourier transformation).
+
+    Returns
+    -------
+    A generator of gate operations (see GateOp).
+    """
+    max_distance = qft_max_distance(total_nr_qubits, min_angle)
+    for target_qubit in reversed(range(total_nr_qubits)):
+        yield GateOp(Gate.HADAMARD, (target_qubit,), None)
+        for control_qubit in range(max(0, target_qubit - max_distance), target_qubit):
+            # Same as pi / 2 ** (target_qubit - control_qubit), but without overflow for large
+            # numbers of qubits
+            angle = ldexp(pi, control_qubit - target_qubit)
+            yield GateOp(Gate.CONTROLLED_PHASE, (control_qubit, target_qubit), angle)
+    for qubit in range(total_nr_qubits // 2):
+        yield GateOp(Gate.SWAP, (qubit, total_nr_qubits - qubit - 1), None)
+
+
+def qft_max_distance(total_nr_qubits, min_angle=0.0):
+    """
+    Determine the largest distance between the control qubit and the target qubit of the controlled
+    phase rotations of a quantum Fourier transformation.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations (see
+        qft_gate_ops).
+
+    Returns
+    -------
+    The largest distance. Target qubit t has control qubits max(0, t - max_distance) through t - 1.
+    """
+    max_distance = total_nr_qubits
+    if min_angle > 0.0:
+        # Rotations between qubits that are further apart than this have an angle smaller than
+        # min_angle (up to rounding, which is corrected for by checking the angle). There are no
+        # rotations at all if min_angle is larger than pi / 2, the angle for distance one.
+        max_distance = min(max_distance, max(0, int(log2(pi / min_angle)) + 1))
+        while max_distance > 0 and ldexp(pi, -max_distance) < min_angle:
+            max_distance -= 1
+    return max_distance
+
 
+def qft_nr_gates(total_nr_qubits, min_angle=0.0):
+    """
+    Count the gates of a quantum Fourier transformation without generating them.
+
+    Parameters
+    ----------
+    total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+    min_angle: The smallest angle (in radians) of the controlled phase rotations (see
+        qft_gate_ops).
 
-def _create_qft_circuit_final_swaps(computer):
-    for qubit in range(computer.total_nr_qubits // 2):
-        computer.swap(qubit, computer.total_nr_qubits - qubit - 1)
+    Returns
+    -------
+    The number of gate operations that qft_gate_ops generates.
+    """
+    max_distance = min(qft_max_distance(total_nr_qubits, min_angle), total_nr_qubits)
+    # Target qubit t has min(t, max_distance) control qubits
+    nr_controlled_phases = (
+        max_distance * (max_distance - 1) // 2 + (total_nr_qubits - max_distance) * max_distance
+    )
+    return total_nr_qubits + nr_controlled_phases + total_nr_qubits // 2
 
 
 class QFT(MonolithicQuantumComputer):
@@ -41,16 +110,22 @@ class QFT(MonolithicQuantumComputer):
     A non-distributed implementation of the Quantum Fourier Transformation (QFT).
     """
 
-    def __init__(self, total_nr_qubits):
+    def __init__(self, total_nr_qubits, min_angle=0.0):
         """
         Constructor.
 
         Parameters
         ----------
         nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+        min_angle: The smallest angle (in radians) of the controlled phase rotations in the
+            circuit. Zero means an exact quantum Fourier transformation (see qft_gate_ops).
         """
         MonolithicQuantumComputer.__init__(self, total_nr_qubits)
-        create_qft_circuit(self)
+        self.min_angle = min_angle
+        self.build_circuit(lambda computer: create_qft_circuit(computer, min_angle))
+
+    def circuit_cache_key(self):
+        return ("QFT", self.total_nr_qubits, self.min_angle)
 
 
 class DistributedQFT(ClusteredQuantumComputer):
@@ -58,6 +133,66 @@ class DistributedQFT(ClusteredQuantumComputer):
     A distributed implementation of the Quantum Fourier Transformation (QFT).
     """
 
-    def __init__(self, nr_processors, total_nr_qubits, method):
-        ClusteredQuantumComputer.__init__(self, nr_processors, total_nr_qubits, method)
-        create_qft_circuit(self)
+    def __init__(
+        self,
+        nr_processors,
+        total_nr_qubits,
+        method,
+        min_angle=0.0,
+        placement=Placement.BLOCK,
+        nr_communication_qubits=1,
+        reset_method=ResetMethod.RESET,
+        defer_measurements=False,
+        estimate_resources=False,
+    ):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        nr_processors: The number of quantum processors in the cluster.
+        total_nr_qubits: The number of qubits in the quantum Fourier transform circuit.
+        method: The method that is used to implement distributed controlled-unitary gates.
+        min_angle: The smallest angle (in radians) of the controlled phase rotations in the
+            circuit. Zero means an exact quantum Fourier transformation (see qft_gate_ops).
+        placement: The placement of the qubits on the processors: either a Placement, or an
+            explicit list that contains the processor index for each qubit (see placement).
+        nr_communication_qubits: The number of qubits in the entanglement register and in the
+            teleport register of each processor.
+        reset_method: The method that is used to reset ancillary qubits before they are reused.
+        defer_measurements: If True, use controlled gates instead of mid-circuit measurements and
+            classically controlled gates (see ClusteredQuantumComputer).
+        estimate_resources: If True, only count the resources that the circuit needs instead of
+            building it (see ClusteredQuantumComputer).
+        """
+        self.placement_report = place_qubits(
+            qft_gate_ops(total_nr_qubits, min_angle), total_nr_qubits, nr_processors, placement
+        )
+        ClusteredQuantumComputer.__init__(
+            self,
+            nr_processors,
+            total_nr_qubits,
+            method,
+            self.placement_report["qubit_processors"],
+            nr_communication_qubits,
+            reset_method,
+            defer_measurements,
+            estimate_resources,
+        )
+        self.min_angle = min_angle
+        self.build_circuit(lambda computer: create_qft_circuit(computer, min_angle))
+
+    def circuit_cache_key(self):
+        if isinstance(self.qc, CountingCircuit):
+            return None
+        return (
+            "DistributedQFT",
+            self.total_nr_qubits,
+            self.nr_processors,
+            self.method.name,
+            self.min_angle,
+            tuple(self.qubit_processors),
+            self.nr_communication_qubits,
+            self.processors[0].reset_method.name,
+            self.defer_measurements,
+        )
@@ -2,14 +2,55 @@
 Monolithic and clustered quantum computers.
 """
 
+# pylint: disable=too-many-lines
+
 from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter, namedtuple
 from enum import Enum
+from functools import lru_cache
+import time
+import numpy
 from qiskit_aer import Aer
 from qiskit_textbook.tools import array_to_latex
+import circuit_cache
+from counting_circuit import CountingCircuit
+import numpy_simulator
 from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister, transpile
-from qiskit.quantum_info import DensityMatrix, partial_trace
+from qiskit.quantum_info import DensityMatrix, Statevector
 from qiskit.visualization import plot_bloch_multivector, plot_state_city
 
+ANCILLARY_BASIS_STATE_TOLERANCE = 1e-6
+"""
+The maximum deviation from one of the probability of the most likely basis state of the ancillary
+qubits for the ancillary qubits to be considered to be in that basis state.
+"""
+
+
+class Gate(Enum):
+    """
+    The gates that are supported by all quantum computers.
+    """
+
+    HADAMARD = 1
+    CONTROLLED_PHASE = 2
+    SWAP = 3
+
+
+GateOp = namedtuple("GateOp", ["gate", "qubit_indexes", "angle"])
+"""
+A gate operation: a gate, the tuple of the (global) indexes of the qubits that the gate is applied
+to (for a controlled phase gate: the control qubit and then the target qubit), and the angle (in
+radians) of the gate (None for gates without an angle).
+"""
+
+
+@lru_cache(maxsize=None)
+def _get_backend(backend_name):
+    if backend_name == numpy_simulator.BACKEND_NAME:
+        return numpy_simulator.NumpySimulator()
+    return Aer.get_backend(backend_name)
+
 
 class QuantumComputer(ABC):
     """
@@ -31,6 +72,74 @@ class QuantumComputer(ABC):
         self.qc_with_input = None
         self.simulator = None
         self.result = None
+        self.transpile_time = None
+        self.simulate_time = None
+        self._transpiled_qc_cache = {}
+        self._built_circuit_size = None
+        self._main_state_result = None
+        self._main_state_cache = {}
+
+    def circuit_cache_key(self):
+        """
+        Determine the key under which the main circuit is cached in the process-wide (and on-disk)
+        circuit caches (see circuit_cache). Subclasses that build a circuit that is completely
+        determined by their constructor parameters override this.
+
+        Returns
+        -------
+        A hashable tuple of strings and numbers that identifies the main circuit, or None if the
+        main circuit must not be cached.
+        """
+        return None
+
+    def build_circuit(self, create_circuit):
+        """
+        Build the main circuit, or reuse a copy of a cached main circuit with the same cache key.
+
+        Parameters
+        ----------
+        create_circuit: A function that takes this quantum computer as its only argument, and that
+            adds the gates for the main circuit to it.
+        """
+        key = self.circuit_cache_key()  # pylint: disable=assignment-from-none
+        if key is None:
+            create_circuit(self)
+            return
+        entry = circuit_cache.get_circuit(
+            circuit_cache.BUILT_CIRCUITS, key, circuit_cache.BUILT_CIRCUIT_NAME
+        )
+        if entry is not None:
+            self.qc = entry["circuit"].copy()
+            self._restore_circuit_state(entry["state"])
+        else:
+            create_circuit(self)
+            circuit_cache.put_circuit(
+                circuit_cache.BUILT_CIRCUITS,
+                key,
+                circuit_cache.BUILT_CIRCUIT_NAME,
+                self.qc.copy(),
+                self._circuit_state(),
+            )
+        self._built_circuit_size = len(self.qc.data)
+
+    def _circuit_state(self):
+        """
+        Returns
+        -------
+        A dictionary with any state (other than the main circuit itself) that was built up while
+        building the main circuit, and that must be restored when a cached main circuit is reused.
+        Must be serializable to JSON.
+        """
+        return {}
+
+    def _restore_circuit_state(self, state):
+        """
+        Restore the state that was returned by _circuit_state when a cached main circuit is reused.
+
+        Parameters
+        ----------
+        state: The state returned by _circuit_state.
+        """
 
     @abstractmethod
     def hadamard(self, qubit_index):
@@ -67,7 +176,40 @@ class QuantumComputer(ABC):
         qubit_index_2: The index of the second swapped qubit.
         """
 
+    def apply_gates(self, gate_ops):
+        """
+        Apply a sequence of gates.
+
+        Parameters
+        ----------
+        gate_ops: An iterable of gate operations (see GateOp).
+        """
+        apply_functions = {
+            Gate.HADAMARD: lambda qubit_indexes, _angle: self.hadamard(*qubit_indexes),
+            Gate.CONTROLLED_PHASE: lambda qubit_indexes, angle: self.controlled_phase(
+                angle, *qubit_indexes
+            ),
+            Gate.SWAP: lambda qubit_indexes, _angle: self.swap(*qubit_indexes),
+        }
+        for gate_op in gate_ops:
+            apply_functions[gate_op.gate](gate_op.qubit_indexes, gate_op.angle)
+
     @abstractmethod
+    def input_circuit(self, number):
+        """
+        Create the state preparation circuit for an input number. The returned circuit has the same
+        registers as the main circuit, so that the main circuit can be composed onto it.
+
+        Parameters
+        ----------
+        number: The classical number to be used as input to the quantum circuit.
+
+        Returns
+        -------
+        A circuit that initializes each input qubit to the corresponding classical bit in the binary
+        value of number.
+        """
+
     def set_input_number(self, number):
         """
         Convert number to a binary value, and initialize each input qubit of the circuit to the
@@ -77,23 +219,61 @@ class QuantumComputer(ABC):
         ----------
         number: The classical number to be used as input to the quantum circuit.
         """
+        self.qc_with_input = self.input_circuit(number).compose(self.qc)
+        self.qc_with_input.save_statevector()
 
-    @abstractmethod
     def main_density_matrix(self):
         """
         Returns
         -------
         The reduced density matrix that represents only the main registers and that traces out all
-        of the ancillary registers.
+        of the ancillary registers, or None if run was never invoked.
         """
+        if self.result is None:
+            return None
+        return self._cached_main_state("density_matrix", self._main_density_matrix_of)
 
-    @abstractmethod
     def main_statevector(self):
         """
         Returns
         -------
         The reduced statevector that represents only the main registers and that traces out all of
-        the ancillary registers.
+        the ancillary registers, or None if run was never invoked.
+        """
+        if self.result is None:
+            return None
+        return self._cached_main_state("statevector", self._main_statevector_of)
+
+    def _cached_main_state(self, key, main_state_of):
+        if self._main_state_result is not self.result:
+            self._main_state_result = self.result
+            self._main_state_cache = {}
+        if key not in self._main_state_cache:
+            self._main_state_cache[key] = main_state_of(self.result.get_statevector())
+        return self._main_state_cache[key]
+
+    @abstractmethod
+    def _main_density_matrix_of(self, statevector):
+        """
+        Parameters
+        ----------
+        statevector: The statevector of the whole circuit, including the ancillary registers.
+
+        Returns
+        -------
+        The reduced density matrix that represents only the main registers.
+        """
+
+    @abstractmethod
+    def _main_statevector_of(self, statevector):
+        """
+        Parameters
+        ----------
+        statevector: The statevector of the whole circuit, including the ancillary registers.
+
+        Returns
+        -------
+        The reduced statevector that represents only the main registers.
         """
 
     def circuit_diagram(self, with_input=False):
@@ -170,10 +350,20 @@ class QuantumComputer(ABC):
             return None
         return plot_state_city(self.result.get_statevector())
 
-    def run(self, input_number, shots=1):
+    def run(
+        self,
+        input_number,
+        shots=1,
+        transpile_once=False,
+        optimization_level=None,
+        backend="aer_simulator",
+    ):
         """
         Run the quantum circuit.
 
+        After the run, transpile_time and simulate_time contain the time (in seconds) that was spent
+        on preparing the circuit for the backend and on simulating it.
+
         Parameters
         ----------
         input_value: An integer representing the input value for the quantum circuit. This value is
@@ -181,11 +371,145 @@ class QuantumComputer(ABC):
             initial values for the main register(s) in the cluster.
             TODO Also allow arbitrary complex initial values for each qubit.
         shots: How many times the circuit must be executed to collect statistics.
+        transpile_once: If False, the circuit including the input state preparation is transpiled
+            from scratch. If True, the main circuit (without the input state preparation) is
+            transpiled only once for each backend and optimization level, and each run only
+            prepends the state preparation for input_number to the cached transpiled circuit.
+        optimization_level: The transpiler optimization level (None means the transpiler default).
+        backend: The name of the Aer backend that the circuit is run on, or "numpy" to run the
+            circuit on the NumPy statevector simulator (see numpy_simulator), which does not need
+            transpilation.
         """
-        self.simulator = Aer.get_backend("aer_simulator")
-        self.set_input_number(input_number)
-        self.qc_with_input = transpile(self.qc_with_input, self.simulator)
+        self.simulator = _get_backend(backend)
+        start_time = time.perf_counter()
+        if transpile_once:
+            self.qc_with_input = self._prepared_circuit(input_number, backend, optimization_level)
+        else:
+            self.set_input_number(input_number)
+        if not transpile_once and backend != numpy_simulator.BACKEND_NAME:
+            self.qc_with_input = transpile(
+                self.qc_with_input, self.simulator, optimization_level=optimization_level
+            )
+        self.transpile_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
         self.result = self.simulator.run(self.qc_with_input, shots=shots).result()
+        self.simulate_time = time.perf_counter() - start_time
+
+    def run_batch(
+        self,
+        input_numbers,
+        shots=1,
+        density_matrices=False,
+        optimization_level=None,
+        backend="aer_simulator",
+    ):
+        """
+        Run the quantum circuit for many input numbers in a single simulator job. The main circuit
+        is transpiled only once, and the simulator is free to run the circuits for the different
+        input numbers in parallel.
+
+        This does not change the result of the most recent run invocation. After the batch run,
+        transpile_time and simulate_time contain the time (in seconds) that was spent on preparing
+        all circuits and on simulating all circuits.
+
+        Parameters
+        ----------
+        input_numbers: An iterable of integers representing the input values for the quantum
+            circuit (see run).
+        shots: How many times each circuit must be executed to collect statistics.
+        density_matrices: If False, return the reduced statevectors for the main registers. If True,
+            return the reduced density matrices for the main registers.
+        optimization_level: The transpiler optimization level (None means the transpiler default).
+        backend: The name of the Aer backend that the circuits are run on, or "numpy" (see run).
+
+        Returns
+        -------
+        A dictionary, indexed by input number, containing the reduced statevector or the reduced
+        density matrix for that input number.
+        """
+        input_numbers = list(input_numbers)
+        simulator = _get_backend(backend)
+        start_time = time.perf_counter()
+        circuits = [
+            self._prepared_circuit(input_number, backend, optimization_level)
+            for input_number in input_numbers
+        ]
+        self.transpile_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        result = simulator.run(circuits, shots=shots).result()
+        self.simulate_time = time.perf_counter() - start_time
+        outputs = {}
+        for index, input_number in enumerate(input_numbers):
+            statevector = result.get_statevector(index)
+            if density_matrices:
+                outputs[input_number] = self._main_density_matrix_of(statevector)
+            else:
+                outputs[input_number] = self._main_statevector_of(statevector)
+        return outputs
+
+    def _prepared_circuit(self, input_number, backend, optimization_level):
+        transpiled_qc = self.transpiled_circuit(backend, optimization_level)
+        prepared_qc = self.input_circuit(input_number).compose(transpiled_qc)
+        prepared_qc.save_statevector()
+        return prepared_qc
+
+    def transpiled_circuit(self, backend="aer_simulator", optimization_level=None):
+        """
+        Transpile the main circuit (without the input state preparation) for a backend. The
+        transpiled circuit is cached, so the main circuit is only transpiled once for each backend
+        and optimization level. If the main circuit has a cache key, the transpiled circuit is
+        shared with all other quantum computers with the same cache key (see circuit_cache).
+
+        Parameters
+        ----------
+        backend: The name of the Aer backend to transpile the circuit for. For the NumPy
+            statevector simulator ("numpy") the main circuit is not transpiled.
+        optimization_level: The transpiler optimization level (None means the transpiler default).
+
+        Returns
+        -------
+        The transpiled main circuit.
+        """
+        if backend == numpy_simulator.BACKEND_NAME:
+            return self.qc
+        key = (backend, optimization_level)
+        transpiled_qc = self._transpiled_qc_cache.get(key)
+        if transpiled_qc is not None:
+            return transpiled_qc
+        # Gates that were added to the main circuit after it was built are not reflected in its
+        # cache key, so such a circuit must not be shared
+        circuit_key = None
+        if self._built_circuit_size == len(self.qc.data):
+            circuit_key = self.circuit_cache_key()  # pylint: disable=assignment-from-none
+        if circuit_key is not None:
+            shared_key = circuit_cache.transpiled_circuit_key(
+                circuit_key, backend, optimization_level
+            )
+            entry = circuit_cache.get_circuit(
+                circuit_cache.TRANSPILED_CIRCUITS, shared_key, circuit_cache.BUILT_CIRCUIT_NAME
+            )
+            if entry is not None:
+                transpiled_qc = entry["circuit"]
+        if transpiled_qc is None:
+            transpiled_qc = transpile(
+                self.qc, _get_backend(backend), optimization_level=optimization_level
+            )
+            if circuit_key is not None:
+                circuit_cache.put_circuit(
+                    circuit_cache.TRANSPILED_CIRCUITS,
+                    shared_key,
+                    circuit_cache.BUILT_CIRCUIT_NAME,
+                    transpiled_qc,
+                )
+        self._transpiled_qc_cache[key] = transpiled_qc
+        return transpiled_qc
+
+    def clear_transpile_cache(self):
+        """
+        Forget all cached transpiled circuits. This must be called when gates are added to the main
+        circuit after it was run with transpile_once set to True.
+        """
+        self._transpiled_qc_cache = {}
 
 
 class MonolithicQuantumComputer(QuantumComputer):
@@ -207,24 +531,34 @@ class MonolithicQuantumComputer(QuantumComputer):
     def swap(self, qubit_index_1, qubit_index_2):
         self.qc.swap(qubit_index_1, qubit_index_2)
 
-    def set_input_number(self, number):
-        self.qc_with_input = QuantumCircuit()
+    def apply_gates(self, gate_ops):
+        qubits = list(self.main_reg)
+        hadamard = self.qc.h
+        controlled_phase = self.qc.cp
+        swap = self.qc.swap
+        for gate, qubit_indexes, angle in gate_ops:
+            if gate == Gate.CONTROLLED_PHASE:
+                controlled_phase(angle, qubits[qubit_indexes[0]], qubits[qubit_indexes[1]])
+            elif gate == Gate.HADAMARD:
+                hadamard(qubits[qubit_indexes[0]])
+            elif gate == Gate.SWAP:
+                swap(qubits[qubit_indexes[0]], qubits[qubit_indexes[1]])
+            else:
+                assert False, "Unknown gate"
+
+    def input_circuit(self, number):
+        input_qc = QuantumCircuit()
         input_main_reg = QuantumRegister(self.total_nr_qubits, "main")
-        self.qc_with_input.add_register(input_main_reg)
+        input_qc.add_register(input_main_reg)
         bin_value = bin(number)[2:].zfill(self.total_nr_qubits)
-        self.qc_with_input.initialize(bin_value, self.qc_with_input.qubits)
-        self.qc_with_input = self.qc_with_input.compose(self.qc)
-        self.qc_with_input.save_statevector()
+        input_qc.initialize(bin_value, input_qc.qubits)  # pylint: disable=no-member
+        return input_qc
 
-    def main_density_matrix(self):
-        if self.result is None:
-            return None
-        return DensityMatrix(self.result.get_statevector())
+    def _main_density_matrix_of(self, statevector):
+        return DensityMatrix(statevector)
 
-    def main_statevector(self):
-        if self.result is None:
-            return None
-        return self.result.get_statevector()
+    def _main_statevector_of(self, statevector):
+        return statevector
 
 
 class Method(Enum):
@@ -246,13 +580,37 @@ class Method(Enum):
     """
 
 
+class ResetMethod(Enum):
+    """
+    The method that is used to reset an ancillary qubit to |0> before it is reused.
+    """
+
+    RESET = 1
+    """
+    Use a reset instruction.
+    """
+
+    MEASURE = 2
+    """
+    Measure the qubit, and apply an X gate conditioned on the measurement being one.
+    """
+
+
 class _ProcessorInClusteredQuantumComputer:
     """
     A single quantum processor within a cluster of quantum processors that collectively run a
     distributed quantum computation.
     """
 
-    def __init__(self, cluster, index, nr_qubits, method):
+    def __init__(
+        self,
+        cluster,
+        index,
+        nr_qubits,
+        method,
+        nr_communication_qubits=1,
+        reset_method=ResetMethod.RESET,
+    ):
         """
         Constructor.
 
@@ -262,36 +620,101 @@ class _ProcessorInClusteredQuantumComputer:
         index: The index of the processor within the cluster.
         nr_qubits: The number of qubits in the main register of this processor.
         method: The method that is used to implement distributed controlled-unitary gates.
+        nr_communication_qubits: The number of qubits in the entanglement register and in the
+            teleport register of this processor. With more than one communication qubit, remote
+            operations can use different qubits, so that they do not have to wait for each other.
+        reset_method: The method that is used to reset ancillary qubits.
         """
         self.cluster = cluster
         self.index = index
         self.nr_qubits = nr_qubits
         self.method = method
-        self.qc = cluster.qc
         self.index = index
         self.name = f"proc{str(index)}"
         self.main_reg = QuantumRegister(nr_qubits, f"{self.name}_main")
         self.qc.add_register(self.main_reg)
-        self.entanglement_reg = QuantumRegister(1, f"{self.name}_entanglement")
+        self.nr_communication_qubits = nr_communication_qubits
+        self.entanglement_reg = QuantumRegister(
+            nr_communication_qubits, f"{self.name}_entanglement"
+        )
         self.qc.add_register(self.entanglement_reg)
-        self.teleport_reg = QuantumRegister(1, f"{self.name}_teleport")
+        self.teleport_reg = QuantumRegister(nr_communication_qubits, f"{self.name}_teleport")
         self.qc.add_register(self.teleport_reg)
-        self.measure_reg = ClassicalRegister(2, f"{self.name}_measure")
+        # Two measurement bits for each entanglement qubit
+        self.measure_reg = ClassicalRegister(2 * nr_communication_qubits, f"{self.name}_measure")
         self.qc.add_register(self.measure_reg)
+        self.reset_method = reset_method
+        # The ancillary qubits that may not be in state |0>; all other ancillary qubits are known to
+        # be in state |0>, so they do not need to be reset before they are used
+        self.ancillas = set(self.entanglement_reg) | set(self.teleport_reg)
+        self.dirty_ancillas = set()
+        # The qubits in the main register that are known to be in state |0> because their state was
+        # teleported away (only when the cluster defers measurements)
+        self.clean_main_qubits = set()
+        # The indexes of the free entanglement qubits, least recently used first
+        self._free_entanglement_qubit_indexes = list(range(nr_communication_qubits))
+
+    @property
+    def qc(self):
+        """
+        The circuit of the cluster (which may be replaced by a cached circuit after the processors
+        are constructed).
+        """
+        return self.cluster.qc
+
+    def allocate_entanglement_qubit(self):
+        """
+        Allocate a free qubit in the entanglement register of this processor. The least recently
+        used free qubit is allocated, so that consecutive remote operations use different qubits
+        when possible.
+
+        Returns
+        -------
+        The index of the allocated qubit within the entanglement register.
+        """
+        assert self._free_entanglement_qubit_indexes, "No free entanglement qubit"
+        return self._free_entanglement_qubit_indexes.pop(0)
+
+    def free_entanglement_qubit(self, entanglement_qubit_index):
+        """
+        Free a qubit in the entanglement register of this processor that was allocated by
+        allocate_entanglement_qubit.
+
+        Parameters
+        ----------
+        entanglement_qubit_index: The index of the qubit within the entanglement register.
+        """
+        assert entanglement_qubit_index not in self._free_entanglement_qubit_indexes
+        self._free_entanglement_qubit_indexes.append(entanglement_qubit_index)
 
     def make_entanglement(self, to_processor):
         """
-        Create a psi-plus entanglement between the entanglement register on this processor and the
-        entanglement register on to_processor.
+        Create a psi-plus entanglement between an allocated qubit in the entanglement register on
+        this processor and an allocated qubit in the entanglement register on to_processor. The
+        caller must free both qubits when it is done with them.
 
         Parameters
         ----------
         to_processor: The processor to create an entanglement with.
+
+        Returns
+        -------
+        A tuple with the index of the allocated qubit within the entanglement register on this
+        processor and the index of the allocated qubit within the entanglement register on
+        to_processor.
         """
-        self.qc.reset(self.entanglement_reg)
-        self.qc.reset(to_processor.entanglement_reg)
-        self.qc.h(self.entanglement_reg)
-        self.qc.cnot(self.entanglement_reg, to_processor.entanglement_reg)
+        self.cluster.nr_epr_pairs += 1
+        entanglement_qubit_index = self.allocate_entanglement_qubit()
+        to_entanglement_qubit_index = to_processor.allocate_entanglement_qubit()
+        entanglement_qubit = self.entanglement_reg[entanglement_qubit_index]
+        to_entanglement_qubit = to_processor.entanglement_reg[to_entanglement_qubit_index]
+        self.reset_ancilla(entanglement_qubit)
+        to_processor.reset_ancilla(to_entanglement_qubit)
+        self.mark_dirty(entanglement_qubit)
+        to_processor.mark_dirty(to_entanglement_qubit)
+        self.qc.h(entanglement_qubit)
+        self.qc.cnot(entanglement_qubit, to_entanglement_qubit)
+        return (entanglement_qubit_index, to_entanglement_qubit_index)
 
     def teleport_to(self, to_processor):
         """
@@ -301,14 +724,64 @@ class _ProcessorInClusteredQuantumComputer:
         ----------
         to_processor: The processor to teleport the qubit to.
         """
-        self.make_entanglement(to_processor)
-        self.qc.cnot(self.teleport_reg, self.entanglement_reg)
-        self.qc.h(self.teleport_reg)
-        self.qc.measure(self.teleport_reg, self.measure_reg[0])
-        self.qc.measure(self.entanglement_reg, self.measure_reg[1])
-        self.qc.x(to_processor.entanglement_reg).c_if(self.measure_reg[1], 1)
-        self.qc.z(to_processor.entanglement_reg).c_if(self.measure_reg[0], 1)
-        self.qc.swap(to_processor.entanglement_reg, to_processor.teleport_reg)
+        self.teleport_qubit(self.teleport_reg[0], to_processor, to_processor.teleport_reg[0])
+
+    def teleport_qubit(self, from_qubit, to_processor, to_qubit):
+        """
+        Teleport a qubit on this processor to a qubit on to_processor. After the teleportation
+        from_qubit is in a (measured) computational basis state, or in state |0> if the cluster
+        defers measurements, and the previous state of to_qubit (which must not be entangled with
+        any other qubit) is lost.
+
+        Parameters
+        ----------
+        from_qubit: The qubit on this processor to teleport (any qubit in the main register or in
+            the teleport register).
+        to_processor: The processor to teleport the qubit to.
+        to_qubit: The qubit on to_processor to teleport the qubit to (any qubit in the main
+            register or in the teleport register).
+        """
+        (entanglement_qubit_index, to_entanglement_qubit_index) = self.make_entanglement(
+            to_processor
+        )
+        entanglement_qubit = self.entanglement_reg[entanglement_qubit_index]
+        to_entanglement_qubit = to_processor.entanglement_reg[to_entanglement_qubit_index]
+        from_bit = self.measure_reg[2 * entanglement_qubit_index]
+        entanglement_bit = self.measure_reg[2 * entanglement_qubit_index + 1]
+        to_qubit_clean = (
+            to_qubit in to_processor.ancillas and to_qubit not in to_processor.dirty_ancillas
+        ) or to_qubit in to_processor.clean_main_qubits
+        self.qc.cnot(from_qubit, entanglement_qubit)
+        self.qc.h(from_qubit)
+        if self.cluster.defer_measurements:
+            # The corrections are controlled by the qubits instead of by their measurement outcomes.
+            # Afterwards both qubits are in state |+> (whatever the teleported state was), so a
+            # Hadamard gate returns them to state |0>.
+            self.qc.cx(entanglement_qubit, to_entanglement_qubit)
+            self.qc.cz(from_qubit, to_entanglement_qubit)
+            self.qc.h(from_qubit)
+            self.qc.h(entanglement_qubit)
+        else:
+            self.qc.measure(from_qubit, from_bit)
+            self.qc.measure(entanglement_qubit, entanglement_bit)
+            self.qc.x(to_entanglement_qubit).c_if(entanglement_bit, 1)
+            self.qc.z(to_entanglement_qubit).c_if(from_bit, 1)
+        self.qc.swap(to_entanglement_qubit, to_qubit)
+        # The entanglement qubit on to_processor now contains the previous state of to_qubit
+        if self.cluster.defer_measurements:
+            self.dirty_ancillas.discard(entanglement_qubit)
+            if from_qubit in self.ancillas:
+                self.dirty_ancillas.discard(from_qubit)
+            else:
+                self.clean_main_qubits.add(from_qubit)
+        else:
+            self.mark_dirty(from_qubit)
+        to_processor.mark_dirty(to_qubit)
+        to_processor.clean_main_qubits.discard(to_qubit)
+        if to_qubit_clean:
+            to_processor.dirty_ancillas.discard(to_entanglement_qubit)
+        self.free_entanglement_qubit(entanglement_qubit_index)
+        to_processor.free_entanglement_qubit(to_entanglement_qubit_index)
 
     def distributed_controlled_phase(
         self, angle, control_qubit_index, target_processor, target_qubit_index
@@ -344,37 +817,61 @@ class _ProcessorInClusteredQuantumComputer:
         self, angle, control_qubit_index, target_processor, target_qubit_index
     ):
         # Teleport local control qubit to remote processor
-        self.qc.swap(self.main_reg[control_qubit_index], self.teleport_reg)
+        self.mark_dirty(self.teleport_reg[0])
+        self.qc.swap(self.main_reg[control_qubit_index], self.teleport_reg[0])
         self.teleport_to(target_processor)
         # Perform controlled phase gate on remote processor
         self.qc.cp(
             angle,
-            target_processor.teleport_reg,
+            target_processor.teleport_reg[0],
             target_processor.main_reg[target_qubit_index],
         )
         # Teleport remote control qubit back to local processor
         target_processor.teleport_to(self)
-        self.qc.swap(self.teleport_reg, self.main_reg[control_qubit_index])
+        self.qc.swap(self.teleport_reg[0], self.main_reg[control_qubit_index])
 
     def cat_entangle(self, target_processor, control_qubit_index):
         """
-        Create an entangled cat state between control_qubit_index on this processor and the
-        entanglement register on target_processor.
+        Create an entangled cat state between control_qubit_index on this processor and an
+        allocated qubit in the entanglement register on target_processor.
 
         Parameters
         ----------
         target_processor: The target processor to create a cat state with. The cat state is created
-            with the entanglement register on the target_processor.
+            with an allocated qubit in the entanglement register on the target_processor.
         control_qubit_index: The index of the control qubit within the main register on this
             processor that the cat state is created from.
-        """
-        self.make_entanglement(target_processor)
-        self.qc.cnot(self.main_reg[control_qubit_index], self.entanglement_reg)
-        self.qc.measure(self.entanglement_reg, self.measure_reg[0])
-        self.qc.x(self.entanglement_reg).c_if(self.measure_reg[0], 1)
-        self.qc.x(target_processor.entanglement_reg).c_if(self.measure_reg[0], 1)
 
-    def cat_disentangle(self, target_processor, control_qubit_index):
+        Returns
+        -------
+        The index of the qubit within the entanglement register on target_processor that contains
+        the cat state. It is freed by cat_disentangle.
+        """
+        (entanglement_qubit_index, target_entanglement_qubit_index) = self.make_entanglement(
+            target_processor
+        )
+        entanglement_qubit = self.entanglement_reg[entanglement_qubit_index]
+        measure_bit = self.measure_reg[2 * entanglement_qubit_index]
+        target_entanglement_qubit = target_processor.entanglement_reg[
+            target_entanglement_qubit_index
+        ]
+        self.qc.cnot(self.main_reg[control_qubit_index], entanglement_qubit)
+        if self.cluster.defer_measurements:
+            # Afterwards the entanglement qubit on this processor is in state |+>
+            self.qc.cx(entanglement_qubit, target_entanglement_qubit)
+            self.qc.h(entanglement_qubit)
+        else:
+            self.qc.measure(entanglement_qubit, measure_bit)
+            self.qc.x(entanglement_qubit).c_if(measure_bit, 1)
+            self.qc.x(target_entanglement_qubit).c_if(measure_bit, 1)
+        # The measured and corrected entanglement qubit on this processor is back in state |0>
+        self.dirty_ancillas.discard(entanglement_qubit)
+        self.free_entanglement_qubit(entanglement_qubit_index)
+        return target_entanglement_qubit_index
+
+    def cat_disentangle(
+        self, target_processor, control_qubit_index, target_entanglement_qubit_index
+    ):
         """
         Disentangle the cat state that was previously created by cat_entangle.
 
@@ -384,22 +881,58 @@ class _ProcessorInClusteredQuantumComputer:
             stored in the entanglement register on the target_processor.
         control_qubit_index: The index of the control qubit within the main register on this
             processor that contains the cat state.
+        target_entanglement_qubit_index: The index of the qubit within the entanglement register on
+            target_processor that contains the cat state (as returned by cat_entangle).
         """
-        self.qc.h(target_processor.entanglement_reg)
-        self.qc.measure(target_processor.entanglement_reg, target_processor.measure_reg[0])
-        self.qc.z(self.main_reg[control_qubit_index]).c_if(target_processor.measure_reg[0], 1)
-        self.qc.x(target_processor.entanglement_reg).c_if(target_processor.measure_reg[0], 1)
+        target_entanglement_qubit = target_processor.entanglement_reg[
+            target_entanglement_qubit_index
+        ]
+        measure_bit = target_processor.measure_reg[2 * target_entanglement_qubit_index]
+        self.qc.h(target_entanglement_qubit)
+        if self.cluster.defer_measurements:
+            # Afterwards the entanglement qubit on target_processor is in state |+>
+            self.qc.cz(target_entanglement_qubit, self.main_reg[control_qubit_index])
+            self.qc.h(target_entanglement_qubit)
+        else:
+            self.qc.measure(target_entanglement_qubit, measure_bit)
+            self.qc.z(self.main_reg[control_qubit_index]).c_if(measure_bit, 1)
+            self.qc.x(target_entanglement_qubit).c_if(measure_bit, 1)
+        target_processor.dirty_ancillas.discard(target_entanglement_qubit)
+        target_processor.free_entanglement_qubit(target_entanglement_qubit_index)
 
     def _distributed_controlled_phase_cat_state(
         self, angle, control_qubit_index, target_processor, target_qubit_index
     ):
-        self.cat_entangle(target_processor, control_qubit_index)
-        self.qc.cp(
-            angle,
-            target_processor.entanglement_reg,
-            target_processor.main_reg[target_qubit_index],
+        self.distributed_controlled_phase_fan_out(
+            control_qubit_index, target_processor, [(angle, target_qubit_index)]
         )
-        self.cat_disentangle(target_processor, control_qubit_index)
+
+    def distributed_controlled_phase_fan_out(
+        self, control_qubit_index, target_processor, angles_and_target_qubit_indexes
+    ):
+        """
+        Perform multiple distributed controlled phase gates that share the same control qubit on
+        this processor and whose target qubits are all on the same target processor, using a single
+        cat state (and hence a single EPR pair).
+
+        Parameters
+        ----------
+        control_qubit_index: The index of the qubit within the main register on this processor that
+            is used as the control qubit for all gates.
+        target_processor: The processor that contains the target qubits.
+        angles_and_target_qubit_indexes: A list of (angle, target_qubit_index) tuples, one for each
+            controlled phase gate, where target_qubit_index is the index of the target qubit within
+            the main register on target_processor.
+        """
+        entanglement_qubit_index = self.cat_entangle(target_processor, control_qubit_index)
+        for angle, target_qubit_index in angles_and_target_qubit_indexes:
+            self.qc.cp(
+                angle,
+                target_processor.entanglement_reg[entanglement_qubit_index],
+                target_processor.main_reg[target_qubit_index],
+            )
+        self.cat_disentangle(target_processor, control_qubit_index, entanglement_qubit_index)
+        self.cluster.nr_epr_pairs_saved += len(angles_and_target_qubit_indexes) - 1
 
     def distributed_swap(self, local_qubit_index, remote_processor, remote_qubit_index):
         """
@@ -418,13 +951,16 @@ class _ProcessorInClusteredQuantumComputer:
             contains the other qubit that the local qubit is being swapped with.
         """
         # Teleport local control qubit to remote processor
-        self.qc.swap(self.main_reg[local_qubit_index], self.teleport_reg)
+        self.mark_dirty(self.teleport_reg[0])
+        self.qc.swap(self.main_reg[local_qubit_index], self.teleport_reg[0])
         self.teleport_to(remote_processor)
         # Perform swap gate on remote processor
-        self.qc.swap(remote_processor.teleport_reg, remote_processor.main_reg[remote_qubit_index])
+        self.qc.swap(
+            remote_processor.teleport_reg[0], remote_processor.main_reg[remote_qubit_index]
+        )
         # Teleport remote control qubit back to local processor
         remote_processor.teleport_to(self)
-        self.qc.swap(self.teleport_reg, self.main_reg[local_qubit_index])
+        self.qc.swap(self.teleport_reg[0], self.main_reg[local_qubit_index])
 
     def hadamard(self, qubit_index):
         """
@@ -466,14 +1002,57 @@ class _ProcessorInClusteredQuantumComputer:
         """
         self.qc.swap(self.main_reg[qubit_index_1], self.main_reg[qubit_index_2])
 
+    @property
+    def ancillas_clean(self):
+        """
+        True if all ancillary qubits on this processor are known to be in state |0>.
+        """
+        return not self.dirty_ancillas
+
+    def mark_dirty(self, qubit):
+        """
+        Record that a qubit may no longer be in state |0>. Qubits in the main register are ignored.
+
+        Parameters
+        ----------
+        qubit: The qubit (any qubit on this processor).
+        """
+        if qubit in self.ancillas:
+            self.dirty_ancillas.add(qubit)
+
+    def reset_ancilla(self, qubit):
+        """
+        Reset an ancillary qubit to state |0> using the reset method that was passed to the
+        constructor, unless it is already known to be in state |0>.
+
+        Parameters
+        ----------
+        qubit: The ancillary qubit.
+        """
+        if qubit not in self.dirty_ancillas:
+            self.cluster.nr_resets_elided += 1
+            return
+        if self.reset_method == ResetMethod.RESET:
+            self.qc.reset(qubit)
+        elif self.reset_method == ResetMethod.MEASURE:
+            # Use the measurement bits of the entanglement qubit (first bit) or teleport qubit
+            # (second bit) with the same index
+            if qubit in self.entanglement_reg:
+                measure_bit = self.measure_reg[2 * self.entanglement_reg.index(qubit)]
+            else:
+                measure_bit = self.measure_reg[2 * self.teleport_reg.index(qubit) + 1]
+            self.qc.measure(qubit, measure_bit)
+            self.qc.x(qubit).c_if(measure_bit, 1)
+        else:
+            assert False, "Unknown reset method"
+        self.dirty_ancillas.discard(qubit)
+
     def clear_ancillary(self):
         """
-        Clear (reset to zero) all ancillary qubits on this processor.
+        Clear (reset to zero) all ancillary qubits on this processor that may not be in state |0>.
         """
-        # TODO: Only reset a qubit if it was used (add a used variable to keep track of this)
-        # TODO: Select reset method
-        self.qc.reset(self.teleport_reg)
-        self.qc.reset(self.entanglement_reg)
+        for qubit in list(self.teleport_reg) + list(self.entanglement_reg):
+            self.reset_ancilla(qubit)
 
     def measure_main(self):
         """
@@ -482,25 +1061,243 @@ class _ProcessorInClusteredQuantumComputer:
         # TODO: Also make this a pure virtual function in the base class
         self.qc.measure(self.main_reg, self.measure_reg)
 
-    def set_input_number(self, number):
+    def add_input(self, input_qc, number):
         """
-        Convert number to a binary value, and initialize each input qubit of this processor's main
-        register to the classical bits in this binary value.
+        Add the registers of this processor to a state preparation circuit, and initialize each
+        input qubit of this processor's main register to the classical bits in the binary value of
+        number.
 
         Parameters
         ----------
+        input_qc: The state preparation circuit to add the registers to.
         number: The classical number to be used as input to the quantum circuit.
         """
         input_main_reg = QuantumRegister(self.nr_qubits, f"{self.name}_main")
-        self.cluster.qc_with_input.add_register(input_main_reg)
-        input_entanglement_reg = QuantumRegister(1, f"{self.name}_entanglement")
-        self.cluster.qc_with_input.add_register(input_entanglement_reg)
-        input_teleport_reg = QuantumRegister(1, f"{self.name}_teleport")
-        self.cluster.qc_with_input.add_register(input_teleport_reg)
-        input_measure_reg = ClassicalRegister(2, f"{self.name}_measure")
-        self.cluster.qc_with_input.add_register(input_measure_reg)
+        input_qc.add_register(input_main_reg)
+        input_entanglement_reg = QuantumRegister(
+            self.nr_communication_qubits, f"{self.name}_entanglement"
+        )
+        input_qc.add_register(input_entanglement_reg)
+        input_teleport_reg = QuantumRegister(self.nr_communication_qubits, f"{self.name}_teleport")
+        input_qc.add_register(input_teleport_reg)
+        input_measure_reg = ClassicalRegister(
+            2 * self.nr_communication_qubits, f"{self.name}_measure"
+        )
+        input_qc.add_register(input_measure_reg)
         bin_value = bin(number)[2:].zfill(self.nr_qubits)
-        self.cluster.qc_with_input.initialize(bin_value, input_main_reg)
+        input_qc.initialize(bin_value, input_main_reg)  # pylint: disable=no-member
+
+
+class LazyTeleportScheduler:
+    """
+    Applies a sequence of gates to a cluster using teleportation, without teleporting a qubit back
+    to its own processor after each remote gate.
+
+    A qubit that is teleported to another processor for a remote two-qubit gate stays resident in
+    a qubit of the teleport register (a visitor slot) of that processor, and later gates are applied
+    to it there. It is only teleported again when a two-qubit gate needs it on yet another
+    processor, when another qubit needs the visitor slot that it occupies, or at the end of the
+    sequence of gates, when all qubits are teleported back to their own processor. When two qubits
+    are on different processors, the qubit that will be used most by the following gates on the
+    other processor is the one that is moved.
+
+    A subclass can schedule other sequences of gates in the same way, by applying them with
+    apply_gate and finish, and by overriding nr_gates_served to look ahead at its following gates.
+    """
+
+    def __init__(self, cluster):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        cluster: The clustered quantum computer to apply the gates to.
+        """
+        self.cluster = cluster
+        # The processor that each (global) qubit is currently located on, the index of the visitor
+        # slot that it occupies on that processor (None if it is on its own processor), and the
+        # qubits that currently occupy the visitor slots of each processor
+        self.qubit_locations = list(cluster.qubit_processors)
+        self.qubit_visitor_slots = [None] * cluster.total_nr_qubits
+        self.visitors = [
+            [None] * cluster.nr_communication_qubits for _ in range(cluster.nr_processors)
+        ]
+        self.gate_ops = []
+        self.qubit_gate_positions = []
+        self.position = 0
+        self.nr_teleports = 0
+        self.nr_remote_gates = 0
+
+    def run(self, gate_ops):
+        """
+        Apply a sequence of gates, and teleport all qubits back to their own processor.
+
+        Parameters
+        ----------
+        gate_ops: An iterable of gate operations (see GateOp).
+        """
+        self.gate_ops = list(gate_ops)
+        self.qubit_gate_positions = [[] for _ in range(self.cluster.total_nr_qubits)]
+        for position, gate_op in enumerate(self.gate_ops):
+            for qubit in gate_op.qubit_indexes:
+                self.qubit_gate_positions[qubit].append(position)
+        for self.position, gate_op in enumerate(self.gate_ops):
+            self.apply_gate(gate_op)
+        self.finish()
+
+    def apply_gate(self, gate_op):
+        """
+        Apply a gate, after moving its qubits to the same processor if needed.
+
+        Parameters
+        ----------
+        gate_op: The gate operation (see GateOp).
+        """
+        qc = self.cluster.qc
+        if gate_op.gate == Gate.HADAMARD:
+            qc.h(self.slot(gate_op.qubit_indexes[0]))
+            return
+        (qubit_1, qubit_2) = gate_op.qubit_indexes
+        if self.cluster.qubit_processors[qubit_1] != self.cluster.qubit_processors[qubit_2]:
+            self.nr_remote_gates += 1
+        self._co_locate(qubit_1, qubit_2)
+        if gate_op.gate == Gate.CONTROLLED_PHASE:
+            qc.cp(gate_op.angle, self.slot(qubit_1), self.slot(qubit_2))
+        elif gate_op.gate == Gate.SWAP:
+            # Swapping the contents of the slots of the qubits does not move the qubits
+            qc.swap(self.slot(qubit_1), self.slot(qubit_2))
+        else:
+            assert False, "Unknown gate"
+
+    def finish(self):
+        """
+        Teleport all qubits back to their own processor.
+        """
+        for qubit in range(self.cluster.total_nr_qubits):
+            self._move_home(qubit)
+        # Teleporting each qubit there and back for each remote gate takes two EPR pairs
+        self.cluster.nr_epr_pairs_saved += 2 * self.nr_remote_gates - self.nr_teleports
+
+    def slot(self, qubit):
+        """
+        Determine the circuit qubit that currently contains the state of a qubit.
+
+        Parameters
+        ----------
+        qubit: The (global) index of the qubit.
+
+        Returns
+        -------
+        The qubit in the main register of the processor of the qubit, or in a visitor slot of the
+        processor that the qubit is currently located on.
+        """
+        processor = self.cluster.processors[self.qubit_locations[qubit]]
+        visitor_slot = self.qubit_visitor_slots[qubit]
+        if visitor_slot is None:
+            (_, local_qubit_index) = self.cluster.global_to_local_index(qubit)
+            return processor.main_reg[local_qubit_index]
+        return processor.teleport_reg[visitor_slot]
+
+    def _co_locate(self, qubit_1, qubit_2):
+        # Move one of two qubits to the processor of the other qubit
+        if self.qubit_locations[qubit_1] == self.qubit_locations[qubit_2]:
+            return
+        options = [
+            (qubit, partner)
+            for (qubit, partner) in [(qubit_1, qubit_2), (qubit_2, qubit_1)]
+            if self._is_free(qubit, self.qubit_locations[partner])
+            or self._eviction_candidates(self.qubit_locations[partner], partner)
+        ]
+        if not options:
+            # Both qubits occupy the only visitor slot that the other qubit could use
+            self._move_home(qubit_2)
+            self._co_locate(qubit_1, qubit_2)
+            return
+        # Prefer the move that serves the most following gates (minus the gates that an evicted
+        # visitor would have served), and then moving the second qubit (for controlled gates the
+        # target qubit, which sequences of controlled rotations tend to share)
+        (qubit, partner) = max(
+            options, key=lambda option: (self._move_benefit(*option), option[0] == qubit_2)
+        )
+        self._move(qubit, self.qubit_locations[partner], partner)
+
+    def _move_benefit(self, qubit, partner):
+        processor_index = self.qubit_locations[partner]
+        benefit = self.nr_gates_served(qubit, processor_index)
+        if not self._is_free(qubit, processor_index):
+            evicted_qubit = self._eviction_victim(processor_index, partner)
+            benefit -= 1 + self.nr_gates_served(evicted_qubit, processor_index)
+        return benefit
+
+    def _is_free(self, qubit, processor_index):
+        # Whether qubit can move to processor_index without first evicting a visitor
+        return (
+            self.cluster.qubit_processors[qubit] == processor_index
+            or None in self.visitors[processor_index]
+        )
+
+    def _eviction_candidates(self, processor_index, partner):
+        # A qubit cannot evict its partner from a visitor slot to join it there
+        return [visitor for visitor in self.visitors[processor_index] if visitor != partner]
+
+    def _eviction_victim(self, processor_index, partner):
+        # Evict the visitor that would serve the fewest following gates where it is
+        return min(
+            self._eviction_candidates(processor_index, partner),
+            key=lambda visitor: self.nr_gates_served(visitor, processor_index),
+        )
+
+    def nr_gates_served(self, qubit, processor_index):
+        """
+        Count the consecutive two-qubit gates of a qubit, starting at the current gate, whose other
+        qubit is currently located on a processor.
+
+        Parameters
+        ----------
+        qubit: The (global) index of the qubit.
+        processor_index: The index of the processor.
+
+        Returns
+        -------
+        The number of gates.
+        """
+        qubit_gate_positions = self.qubit_gate_positions[qubit]
+        nr_gates = 0
+        first = bisect_left(qubit_gate_positions, self.position)
+        for gate_position in qubit_gate_positions[first:]:
+            qubit_indexes = self.gate_ops[gate_position].qubit_indexes
+            if len(qubit_indexes) == 1:
+                continue
+            partner = qubit_indexes[1] if qubit_indexes[0] == qubit else qubit_indexes[0]
+            if self.qubit_locations[partner] != processor_index:
+                break
+            nr_gates += 1
+        return nr_gates
+
+    def _move_home(self, qubit):
+        self._move(qubit, self.cluster.qubit_processors[qubit])
+
+    def _move(self, qubit, processor_index, partner=None):
+        # Teleport a qubit to a processor, evicting a visitor (other than partner) from that
+        # processor if necessary
+        if self.qubit_locations[qubit] == processor_index:
+            return
+        if not self._is_free(qubit, processor_index):
+            self._move_home(self._eviction_victim(processor_index, partner))
+        from_slot = self.slot(qubit)
+        from_processor = self.cluster.processors[self.qubit_locations[qubit]]
+        if self.qubit_visitor_slots[qubit] is not None:
+            self.visitors[from_processor.index][self.qubit_visitor_slots[qubit]] = None
+        self.qubit_locations[qubit] = processor_index
+        self.qubit_visitor_slots[qubit] = None
+        if self.cluster.qubit_processors[qubit] != processor_index:
+            visitor_slot = self.visitors[processor_index].index(None)
+            self.visitors[processor_index][visitor_slot] = qubit
+            self.qubit_visitor_slots[qubit] = visitor_slot
+        from_processor.teleport_qubit(
+            from_slot, self.cluster.processors[processor_index], self.slot(qubit)
+        )
+        self.nr_teleports += 1
 
 
 class ClusteredQuantumComputer(QuantumComputer):
@@ -508,7 +1305,17 @@ class ClusteredQuantumComputer(QuantumComputer):
     A cluster of quantum processors that collectively run a distributed quantum computation.
     """
 
-    def __init__(self, nr_processors, total_nr_qubits, method):
+    def __init__(
+        self,
+        nr_processors,
+        total_nr_qubits,
+        method,
+        qubit_processors=None,
+        nr_communication_qubits=1,
+        reset_method=ResetMethod.RESET,
+        defer_measurements=False,
+        estimate_resources=False,
+    ):
         """
         Constructor.
 
@@ -519,19 +1326,128 @@ class ClusteredQuantumComputer(QuantumComputer):
             nr_processors. The qubits in the cluster have a global index ranging from 0 through
             total_nr_qubits-1.
         method: The method that is used to implement distributed controlled-unitary gates.
+        qubit_processors: The placement of the qubits on the processors, as a list that contains
+            the processor index for each global qubit index (see placement). Each processor must
+            get the same number of qubits. The qubits on each processor are stored in its main
+            register in global qubit index order. If None, place consecutive blocks of qubits on
+            each processor.
+        nr_communication_qubits: The number of qubits in the entanglement register and in the
+            teleport register of each processor.
+        reset_method: The method that is used to reset ancillary qubits before they are reused.
+            Ancillary qubits that are known to be in state |0> are not reset.
+        defer_measurements: If False, teleportation and cat states use mid-circuit measurements
+            and classically controlled corrections. If True, they use the deferred measurement
+            principle: the corrections are controlled by the qubits that would have been measured,
+            and those qubits are then returned to state |0> by a Hadamard gate. The main qubits end
+            up in the same state, but the circuit has no measurements, classically controlled
+            gates, or resets, so it can be simulated as a single unitary.
+        estimate_resources: If True, the main circuit is a CountingCircuit, which only counts the
+            instructions and keeps track of the depth instead of building a Qiskit circuit. This is
+            much faster for large numbers of qubits, but the circuit cannot be run.
         """
         QuantumComputer.__init__(self, total_nr_qubits)
+        if estimate_resources:
+            self.qc = CountingCircuit()
         assert (
             total_nr_qubits % nr_processors == 0
         ), "Total nr qubits {total_nr_qubits} must be multiple of nr processors {nr_processors}"
         self.nr_processors = nr_processors
         self.method = method
         self.nr_qubits_per_processor = total_nr_qubits // nr_processors
+        self.nr_epr_pairs = 0
+        self.nr_epr_pairs_saved = 0
+        self.nr_resets_elided = 0
+        self.defer_measurements = defer_measurements
+        self.nr_communication_qubits = nr_communication_qubits
         self.processors = {}
         for processor_index in range(nr_processors):
             self.processors[processor_index] = _ProcessorInClusteredQuantumComputer(
-                self, processor_index, self.nr_qubits_per_processor, method
+                self,
+                processor_index,
+                self.nr_qubits_per_processor,
+                method,
+                nr_communication_qubits,
+                reset_method,
             )
+        if qubit_processors is None:
+            qubit_processors = [
+                global_qubit_index // self.nr_qubits_per_processor
+                for global_qubit_index in range(total_nr_qubits)
+            ]
+        assert len(qubit_processors) == total_nr_qubits, "Placement must place every qubit"
+        self.qubit_processors = list(qubit_processors)
+        self._global_to_local_indexes = []
+        processor_loads = [0] * nr_processors
+        for processor_index in self.qubit_processors:
+            self._global_to_local_indexes.append(
+                (processor_index, processor_loads[processor_index])
+            )
+            processor_loads[processor_index] += 1
+        assert all(
+            load == self.nr_qubits_per_processor for load in processor_loads
+        ), "Placement must place the same number of qubits on each processor"
+        self._init_main_qubit_indexes()
+
+    def _init_main_qubit_indexes(self):
+        # The indexes (within the circuit) of the main qubits, in global qubit index order, and of
+        # the ancillary qubits. These are used to extract the state of the main qubits from the
+        # statevector of the whole circuit.
+        qubit_indexes = {qubit: index for (index, qubit) in enumerate(self.qc.qubits)}
+        self.main_qubit_indexes = [
+            qubit_indexes[self.processors[processor_index].main_reg[local_qubit_index]]
+            for (processor_index, local_qubit_index) in self._global_to_local_indexes
+        ]
+        main_qubit_indexes_set = set(self.main_qubit_indexes)
+        self.ancillary_qubit_indexes = [
+            index for index in range(self.qc.num_qubits) if index not in main_qubit_indexes_set
+        ]
+        # Axes of the statevector tensor, most significant qubit first (the tensor axis for qubit
+        # index i is num_qubits - 1 - i)
+        nr_qubits = self.qc.num_qubits
+        self._main_state_axes = [
+            nr_qubits - 1 - index for index in reversed(self.main_qubit_indexes)
+        ] + [nr_qubits - 1 - index for index in reversed(self.ancillary_qubit_indexes)]
+
+    def _circuit_state(self):
+        return {
+            "dirty_ancillas": [
+                sorted(
+                    self.qc.find_bit(qubit).index for qubit in self.processors[index].dirty_ancillas
+                )
+                for index in range(self.nr_processors)
+            ],
+            "nr_epr_pairs": self.nr_epr_pairs,
+            "nr_epr_pairs_saved": self.nr_epr_pairs_saved,
+            "nr_resets_elided": self.nr_resets_elided,
+            "clean_main_qubits": [
+                sorted(
+                    self.qc.find_bit(qubit).index
+                    for qubit in self.processors[index].clean_main_qubits
+                )
+                for index in range(self.nr_processors)
+            ],
+        }
+
+    def _restore_circuit_state(self, state):
+        for index, dirty_ancillas in enumerate(state["dirty_ancillas"]):
+            self.processors[index].dirty_ancillas = {
+                self.qc.qubits[qubit_index] for qubit_index in dirty_ancillas
+            }
+        self.nr_epr_pairs = state["nr_epr_pairs"]
+        self.nr_epr_pairs_saved = state["nr_epr_pairs_saved"]
+        self.nr_resets_elided = state["nr_resets_elided"]
+        for index, clean_main_qubits in enumerate(state["clean_main_qubits"]):
+            self.processors[index].clean_main_qubits = {
+                self.qc.qubits[qubit_index] for qubit_index in clean_main_qubits
+            }
+
+    @property
+    def ancillas_clean(self):
+        """
+        True if all ancillary qubits on all processors are known to be in state |0> at the end of
+        the circuit (i.e. they were never used, or they were cleared after they were last used).
+        """
+        return all(processor.ancillas_clean for processor in self.processors.values())
 
     def clear_ancillary(self):
         """
@@ -547,20 +1463,29 @@ class ClusteredQuantumComputer(QuantumComputer):
         for processor in self.processors.values():
             processor.measure_main()
 
-    def _global_to_local_index(self, global_qubit_index):
-        processor_index = global_qubit_index // self.nr_qubits_per_processor
-        local_qubit_index = global_qubit_index % self.nr_qubits_per_processor
-        return (processor_index, local_qubit_index)
+    def global_to_local_index(self, global_qubit_index):
+        """
+        Determine where a qubit is placed.
+
+        Parameters
+        ----------
+        global_qubit_index: The (global) index of the qubit.
+
+        Returns
+        -------
+        A (processor index, index of the qubit within the main register of that processor) tuple.
+        """
+        return self._global_to_local_indexes[global_qubit_index]
 
     def hadamard(self, qubit_index):
-        (processor_index, local_qubit_index) = self._global_to_local_index(qubit_index)
+        (processor_index, local_qubit_index) = self.global_to_local_index(qubit_index)
         self.processors[processor_index].hadamard(local_qubit_index)
 
     def controlled_phase(self, angle, control_qubit_index, target_qubit_index):
-        (control_processor_index, local_control_qubit_index) = self._global_to_local_index(
+        (control_processor_index, local_control_qubit_index) = self.global_to_local_index(
             control_qubit_index
         )
-        (target_processor_index, local_target_qubit_index) = self._global_to_local_index(
+        (target_processor_index, local_target_qubit_index) = self.global_to_local_index(
             target_qubit_index
         )
         if control_processor_index == target_processor_index:
@@ -576,8 +1501,8 @@ class ClusteredQuantumComputer(QuantumComputer):
             )
 
     def swap(self, qubit_index_1, qubit_index_2):
-        (processor_index_1, local_qubit_index_1) = self._global_to_local_index(qubit_index_1)
-        (processor_index_2, local_qubit_index_2) = self._global_to_local_index(qubit_index_2)
+        (processor_index_1, local_qubit_index_1) = self.global_to_local_index(qubit_index_1)
+        (processor_index_2, local_qubit_index_2) = self.global_to_local_index(qubit_index_2)
         if processor_index_1 == processor_index_2:
             self.processors[processor_index_1].local_swap(local_qubit_index_1, local_qubit_index_2)
         else:
@@ -587,30 +1512,139 @@ class ClusteredQuantumComputer(QuantumComputer):
                 local_qubit_index_2,
             )
 
-    def set_input_number(self, number):
-        self.qc_with_input = QuantumCircuit()
-        one_processor_mask = 2**self.nr_qubits_per_processor - 1
-        for index in range(self.nr_processors):
-            processor = self.processors[index]
-            number_for_processor = number & one_processor_mask
-            number >>= self.nr_qubits_per_processor
-            processor.set_input_number(number_for_processor)
-        self.qc_with_input = self.qc_with_input.compose(self.qc)
-        self.qc_with_input.save_statevector()
+    def apply_gates(self, gate_ops):
+        if self.method == Method.TELEPORT:
+            LazyTeleportScheduler(self).run(gate_ops)
+            return
+        # Controlled phase gates commute with each other, so each run of consecutive controlled
+        # phase gates can be reordered to share cat states (see _apply_controlled_phases)
+        controlled_phase_ops = []
+        for gate_op in gate_ops:
+            if gate_op.gate == Gate.CONTROLLED_PHASE:
+                controlled_phase_ops.append(gate_op)
+                continue
+            self._apply_controlled_phases(controlled_phase_ops)
+            controlled_phase_ops = []
+            QuantumComputer.apply_gates(self, [gate_op])
+        self._apply_controlled_phases(controlled_phase_ops)
+
+    def _apply_controlled_phases(self, controlled_phase_ops):
+        # Schedule a run of commuting controlled phase gates: local gates are performed directly,
+        # and remote gates are grouped into fan-outs that share one qubit on one processor and have
+        # their other qubits on one remote processor (see choose_fan_out)
+        candidate_counts = self._fan_out_candidate_counts(controlled_phase_ops)
+        fan_outs = {}
+        for gate_op in controlled_phase_ops:
+            (qubit_1, qubit_2) = gate_op.qubit_indexes
+            (processor_index_1, _) = self.global_to_local_index(qubit_1)
+            (processor_index_2, _) = self.global_to_local_index(qubit_2)
+            if processor_index_1 == processor_index_2:
+                self.controlled_phase(gate_op.angle, qubit_1, qubit_2)
+                continue
+            fan_out = self.choose_fan_out(qubit_1, qubit_2, candidate_counts)
+            other_qubit = qubit_1 if fan_out[0] == qubit_2 else qubit_2
+            fan_outs.setdefault(fan_out, []).append(
+                (gate_op.angle, self.global_to_local_index(other_qubit)[1])
+            )
+        self._apply_fan_outs(fan_outs)
 
-    def main_density_matrix(self):
-        if self.result is None:
-            return None
-        total_nr_qubits = self.total_nr_qubits + self.nr_processors * 2
-        traced_qubits = list(range(0, total_nr_qubits))
-        for index in range(self.nr_processors):
-            processor = self.processors[index]
-            for qubit in processor.main_reg[:]:
-                qubit_index = self.qc_with_input.qubits.index(qubit)
-                traced_qubits.remove(qubit_index)
-        return partial_trace(self.result.get_statevector(), traced_qubits)
+    def choose_fan_out(self, qubit_1, qubit_2, candidate_counts):
+        """
+        Choose the fan-out that a remote controlled phase gate joins. Since a controlled phase gate
+        is symmetric, either qubit can be the shared qubit of the fan-out; the gate joins the
+        fan-out with the most candidate gates.
 
-    def main_statevector(self):
-        if self.result is None:
+        Parameters
+        ----------
+        qubit_1: The (global) index of one qubit of the gate.
+        qubit_2: The (global) index of the other qubit of the gate.
+        candidate_counts: A Counter with, for each (shared qubit, processor index of the other
+            qubits), the number of remote controlled phase gates that could be part of that fan-out.
+
+        Returns
+        -------
+        The fan-out, as a (shared qubit, processor index of the other qubits) tuple.
+        """
+        (processor_index_1, _) = self.global_to_local_index(qubit_1)
+        (processor_index_2, _) = self.global_to_local_index(qubit_2)
+        if (
+            candidate_counts[(qubit_2, processor_index_1)]
+            >= candidate_counts[(qubit_1, processor_index_2)]
+        ):
+            return (qubit_2, processor_index_1)
+        return (qubit_1, processor_index_2)
+
+    def _apply_fan_outs(self, fan_outs):
+        # Perform the fan-outs, which are given as a dictionary from (control qubit, target
+        # processor index) to lists of (angle, local target qubit index) tuples (see
+        # distributed_controlled_phase_fan_out)
+        for (control_qubit, target_processor_index), angles_and_targets in fan_outs.items():
+            (control_processor_index, local_control_qubit_index) = self.global_to_local_index(
+                control_qubit
+            )
+            self.processors[control_processor_index].distributed_controlled_phase_fan_out(
+                local_control_qubit_index,
+                self.processors[target_processor_index],
+                angles_and_targets,
+            )
+
+    def _fan_out_candidate_counts(self, controlled_phase_ops):
+        # For each (control qubit, target processor), the number of remote controlled phase gates
+        # that could be part of a fan-out from that control qubit to that processor
+        candidate_counts = Counter()
+        for gate_op in controlled_phase_ops:
+            (qubit_1, qubit_2) = gate_op.qubit_indexes
+            (processor_index_1, _) = self.global_to_local_index(qubit_1)
+            (processor_index_2, _) = self.global_to_local_index(qubit_2)
+            if processor_index_1 != processor_index_2:
+                candidate_counts[(qubit_1, processor_index_2)] += 1
+                candidate_counts[(qubit_2, processor_index_1)] += 1
+        return candidate_counts
+
+    def input_circuit(self, number):
+        input_qc = QuantumCircuit()
+        numbers_for_processors = [0] * self.nr_processors
+        for global_qubit_index, (processor_index, local_qubit_index) in enumerate(
+            self._global_to_local_indexes
+        ):
+            if (number >> global_qubit_index) & 1:
+                numbers_for_processors[processor_index] |= 1 << local_qubit_index
+        for index in range(self.nr_processors):
+            self.processors[index].add_input(input_qc, numbers_for_processors[index])
+        return input_qc
+
+    def _main_state_matrix(self, statevector):
+        # Reshape the statevector into a matrix with one row for each basis state of the main
+        # qubits and one column for each basis state of the ancillary qubits.
+        data = numpy.asarray(statevector)
+        tensor = data.reshape((2,) * self.qc.num_qubits)
+        tensor = numpy.transpose(tensor, self._main_state_axes)
+        return tensor.reshape(2**self.total_nr_qubits, -1)
+
+    def _main_amplitudes_of(self, state_matrix):
+        # If the ancillary qubits are in a computational basis state (not entangled with the main
+        # qubits), return the amplitudes of the main qubits. Otherwise, return None. The basis
+        # state of the ancillary qubits is the column of the state matrix that contains all of the
+        # probability.
+        if self.ancillas_clean:
+            return numpy.ascontiguousarray(state_matrix[:, 0])
+        column_probabilities = numpy.einsum("ij,ij->j", state_matrix, state_matrix.conj()).real
+        ancillary_basis_state = int(numpy.argmax(column_probabilities))
+        probability = column_probabilities[ancillary_basis_state]
+        if abs(probability - 1.0) > ANCILLARY_BASIS_STATE_TOLERANCE:
             return None
-        return self.main_density_matrix().to_statevector()
+        return state_matrix[:, ancillary_basis_state] / numpy.sqrt(probability)
+
+    def _main_density_matrix_of(self, statevector):
+        state_matrix = self._main_state_matrix(statevector)
+        main_amplitudes = self._main_amplitudes_of(state_matrix)
+        if main_amplitudes is not None:
+            return DensityMatrix(numpy.outer(main_amplitudes, main_amplitudes.conj()))
+        # Trace out the ancillary qubits by contracting over the ancillary axes
+        return DensityMatrix(state_matrix @ state_matrix.conj().T)
+
+    def _main_statevector_of(self, statevector):
+        main_amplitudes = self._main_amplitudes_of(self._main_state_matrix(statevector))
+        if main_amplitudes is not None:
+            return Statevector(main_amplitudes)
+        return self._main_density_matrix_of(statevector).to_statevector()
@@ -1,20 +1,5 @@
 #!/bin/bash
 
-./run_experiment.py monolithic 2 0 ../results
-./run_experiment.py monolithic 2 1 ../results
-./run_experiment.py monolithic 2 2 ../results
-./run_experiment.py monolithic 2 3 ../results
-./run_experiment.py monolithic 3 0 ../results
-./run_experiment.py monolithic 3 4 ../results
-./run_experiment.py monolithic 3 7 ../results
-./run_experiment.py monolithic 4 0 ../results
-./run_experiment.py monolithic 4 7 ../results
-./run_experiment.py monolithic 4 15 ../results
-
-./run_experiment.py distributed 2 0 ../results
-./run_experiment.py distributed 2 1 ../results
-./run_experiment.py distributed 2 2 ../results
-./run_experiment.py distributed 2 3 ../results
-./run_experiment.py distributed 4 0 ../results
-./run_experiment.py distributed 4 7 ../results
-./run_experiment.py distributed 4 15 ../results
+./run_experiments.py ../results --flavors monolithic distributed --sizes 2 --values all
+./run_experiments.py ../results --flavors monolithic --sizes 3 --values 0 4 7
+./run_experiments.py ../results --flavors monolithic distributed --sizes 4 --values 0 7 15
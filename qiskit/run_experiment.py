@@ -4,10 +4,21 @@ Run a QFT experiment using Qiskit and write the results to a file for verificati
 """
 
 import argparse
+import circuit_cache
+import placement
 import quantum_computer
 import qft
 import common
 
+DEFAULT_NR_PROCESSORS = 2
+DEFAULT_METHOD = quantum_computer.Method.TELEPORT
+METHOD_NAMES = [method.name.lower() for method in quantum_computer.Method]
+DEFAULT_PLACEMENT = placement.Placement.BLOCK
+DEFAULT_NR_COMMUNICATION_QUBITS = 1
+DEFAULT_RESET_METHOD = quantum_computer.ResetMethod.RESET
+RESET_METHOD_NAMES = [reset_method.name.lower() for reset_method in quantum_computer.ResetMethod]
+PLACEMENT_NAMES = [qubit_placement.name.lower() for qubit_placement in placement.Placement]
+
 
 def parse_command_line_arguments():
     """
@@ -20,31 +31,320 @@ def parse_command_line_arguments():
     parser = argparse.ArgumentParser(description="Run a QFT experiment using Qiskit")
     parser.add_argument("flavor", help="Flavor", choices=["monolithic", "distributed"])
     parser.add_argument("input_size", type=int, help="Number of input qubits")
-    parser.add_argument("input_value", type=int, help="Input value, as a number")
+    parser.add_argument(
+        "input_values",
+        type=int,
+        nargs="+",
+        help="Input value(s), as numbers (multiple values are simulated in a single batch)",
+    )
     parser.add_argument("results_dir", help="Results directory")
+    parser.add_argument(
+        "--nr-processors",
+        type=int,
+        default=DEFAULT_NR_PROCESSORS,
+        help="Number of processors (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=METHOD_NAMES,
+        default=DEFAULT_METHOD.name.lower(),
+        help="Method for distributed controlled gates (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--placement",
+        choices=PLACEMENT_NAMES,
+        default=DEFAULT_PLACEMENT.name.lower(),
+        help="Placement of qubits on processors (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--nr-communication-qubits",
+        type=int,
+        default=DEFAULT_NR_COMMUNICATION_QUBITS,
+        help="Number of communication qubits per processor (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--reset-method",
+        choices=RESET_METHOD_NAMES,
+        default=DEFAULT_RESET_METHOD.name.lower(),
+        help="Method for resetting ancillary qubits (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--defer-measurements",
+        action="store_true",
+        help=(
+            "Use controlled gates instead of mid-circuit measurements and classically controlled "
+            "gates (distributed flavor only)"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(common.RESULT_FILE_EXTENSIONS.keys()),
+        help="Format of the result files",
+    )
+    parser.add_argument(
+        "--min-angle",
+        type=float,
+        default=0.0,
+        help=(
+            "Drop controlled phase rotations with a smaller angle (in radians) for an approximate "
+            "QFT (default: 0, exact QFT)"
+        ),
+    )
+    parser.add_argument(
+        "--circuit-cache-dir",
+        help=(
+            "Directory for caching built and transpiled circuits between runs (default: "
+            f"environment variable {circuit_cache.DISK_CACHE_DIR_ENV_VAR}, if set)"
+        ),
+    )
     args = parser.parse_args()
     return args
 
 
-def run_experiment(flavor, input_size, input_value, results_dir):
+def create_algorithm(
+    flavor,
+    input_size,
+    nr_processors=DEFAULT_NR_PROCESSORS,
+    method=DEFAULT_METHOD,
+    min_angle=0.0,
+    qubit_placement=DEFAULT_PLACEMENT,
+    nr_communication_qubits=DEFAULT_NR_COMMUNICATION_QUBITS,
+    reset_method=DEFAULT_RESET_METHOD,
+    defer_measurements=False,
+):
     """
-    Run an experiment.
+    Create the QFT algorithm for an experiment.
+
+    Parameters
+    ----------
+    flavor: The flavor of quantum fourier transformation (distributed or monolithic)
+    input_size: The number of qubits in the input value for the QFT.
+    nr_processors: The number of processors (distributed flavor only).
+    method: The method for distributed controlled gates (distributed flavor only).
+    min_angle: The smallest angle of the controlled phase rotations (zero for an exact QFT).
+    qubit_placement: The placement of qubits on processors (distributed flavor only).
+    nr_communication_qubits: The number of communication qubits per processor (distributed flavor
+        only).
+    reset_method: The method for resetting ancillary qubits (distributed flavor only).
+    defer_measurements: If True, use controlled gates instead of mid-circuit measurements and
+        classically controlled gates (distributed flavor only).
+
+    Returns
+    -------
+    The QFT algorithm.
     """
     if flavor == "monolithic":
-        algorithm = qft.QFT(input_size)
+        algorithm = qft.QFT(input_size, min_angle)
     elif flavor == "distributed":
-        nr_processors = 2
-        method = quantum_computer.Method.TELEPORT
-        algorithm = qft.DistributedQFT(nr_processors, input_size, method)
+        algorithm = qft.DistributedQFT(
+            nr_processors,
+            input_size,
+            method,
+            min_angle,
+            qubit_placement,
+            nr_communication_qubits,
+            reset_method,
+            defer_measurements,
+        )
+        report = algorithm.placement_report
+        print(
+            f"Placement {qubit_placement.name.lower()}: {report['nr_remote_gates']} remote gates "
+            f"(block placement: {report['nr_block_remote_gates']} remote gates)"
+        )
+        print(
+            f"EPR pairs: {algorithm.nr_epr_pairs} "
+            f"(saved relative to one cat state or two teleportations per remote gate: "
+            f"{algorithm.nr_epr_pairs_saved})"
+        )
+        print(f"Resets of ancillary qubits elided: {algorithm.nr_resets_elided}")
     else:
         assert False, "Unknown flavor"
-    print(f"Running {flavor} QFT, input_size {input_size}, input_value {input_value}")
-    algorithm.run(input_value)
-    density_matrix = algorithm.main_density_matrix().data
+    return algorithm
+
+
+def report_approximation(input_size, input_values, min_angle):
+    """
+    Report the fidelity loss of an approximate QFT relative to the exact QFT.
+
+    Parameters
+    ----------
+    input_size: The number of qubits in the input value for the QFT.
+    input_values: The input values for the QFT.
+    min_angle: The smallest angle of the controlled phase rotations (zero for an exact QFT).
+    """
+    if not min_angle:
+        return
+    worst_case_fidelity = common.approximate_qft_fidelity(input_size, min_angle)
+    print(
+        f"Approximate QFT, min_angle {min_angle}: "
+        f"worst-case fidelity loss {1.0 - worst_case_fidelity:.3e}"
+    )
+    for input_value in input_values:
+        fidelity = common.approximate_qft_fidelity(input_size, min_angle, input_value)
+        print(f"  Fidelity loss for input_value {input_value}: {1.0 - fidelity:.3e}")
+
+
+def write_result(
+    flavor,
+    input_size,
+    input_value,
+    density_matrix,
+    results_dir,
+    variant,
+    file_format,
+    min_angle,
+    nr_communication_qubits=DEFAULT_NR_COMMUNICATION_QUBITS,
+    reset_method=DEFAULT_RESET_METHOD,
+    defer_measurements=False,
+):
+    """
+    Write the density matrix that is the result of an experiment to a file.
+
+    Returns
+    -------
+    The name of the file that the density matrix was written to.
+    """
     file_name = common.write_density_matrix_to_file(
-        "qiskit", flavor, input_size, input_value, density_matrix, results_dir
+        "qiskit",
+        flavor,
+        input_size,
+        input_value,
+        density_matrix,
+        results_dir,
+        variant,
+        file_format,
+        min_angle,
+        nr_communication_qubits,
+        reset_method.name.lower(),
+        defer_measurements,
     )
     print(f"Wrote density_matrix to {file_name}")
+    return file_name
+
+
+def run_experiment(
+    flavor,
+    input_size,
+    input_value,
+    results_dir,
+    nr_processors=DEFAULT_NR_PROCESSORS,
+    method=DEFAULT_METHOD,
+    file_format=None,
+    min_angle=0.0,
+    qubit_placement=DEFAULT_PLACEMENT,
+    nr_communication_qubits=DEFAULT_NR_COMMUNICATION_QUBITS,
+    reset_method=DEFAULT_RESET_METHOD,
+    defer_measurements=False,
+):
+    """
+    Run an experiment.
+
+    Returns
+    -------
+    The name of the file that the results were written to.
+    """
+    algorithm = create_algorithm(
+        flavor,
+        input_size,
+        nr_processors,
+        method,
+        min_angle,
+        qubit_placement,
+        nr_communication_qubits,
+        reset_method,
+        defer_measurements,
+    )
+    print(f"Running {flavor} QFT, input_size {input_size}, input_value {input_value}")
+    report_approximation(input_size, [input_value], min_angle)
+    algorithm.run(input_value, transpile_once=True)
+    density_matrix = algorithm.main_density_matrix().data
+    variant = common.experiment_variant(
+        flavor,
+        nr_processors,
+        method.name.lower(),
+        min_angle,
+        qubit_placement.name.lower(),
+        nr_communication_qubits,
+        reset_method.name.lower(),
+        defer_measurements,
+    )
+    return write_result(
+        flavor,
+        input_size,
+        input_value,
+        density_matrix,
+        results_dir,
+        variant,
+        file_format,
+        min_angle,
+        nr_communication_qubits,
+        reset_method,
+        defer_measurements,
+    )
+
+
+def run_experiment_batch(
+    flavor,
+    input_size,
+    input_values,
+    results_dir,
+    nr_processors=DEFAULT_NR_PROCESSORS,
+    method=DEFAULT_METHOD,
+    file_format=None,
+    min_angle=0.0,
+    qubit_placement=DEFAULT_PLACEMENT,
+    nr_communication_qubits=DEFAULT_NR_COMMUNICATION_QUBITS,
+    reset_method=DEFAULT_RESET_METHOD,
+    defer_measurements=False,
+):
+    """
+    Run an experiment for multiple input values, using a single simulator job.
+
+    Returns
+    -------
+    The names of the files that the results were written to.
+    """
+    algorithm = create_algorithm(
+        flavor,
+        input_size,
+        nr_processors,
+        method,
+        min_angle,
+        qubit_placement,
+        nr_communication_qubits,
+        reset_method,
+        defer_measurements,
+    )
+    print(f"Running {flavor} QFT, input_size {input_size}, input_values {input_values}")
+    report_approximation(input_size, input_values, min_angle)
+    variant = common.experiment_variant(
+        flavor,
+        nr_processors,
+        method.name.lower(),
+        min_angle,
+        qubit_placement.name.lower(),
+        nr_communication_qubits,
+        reset_method.name.lower(),
+        defer_measurements,
+    )
+    return [
+        write_result(
+            flavor,
+            input_size,
+            input_value,
+            density_matrix.data,
+            results_dir,
+            variant,
+            file_format,
+            min_angle,
+            nr_communication_qubits,
+            reset_method,
+            defer_measurements,
+        )
+        for input_value, density_matrix in algorithm.run_batch(
+            input_values, density_matrices=True
+        ).items()
+    ]
 
 
 def main():
@@ -52,7 +352,41 @@ def main():
     The main function.
     """
     args = parse_command_line_arguments()
-    run_experiment(args.flavor, args.input_size, args.input_value, args.results_dir)
+    if args.circuit_cache_dir is not None:
+        circuit_cache.set_disk_cache_dir(args.circuit_cache_dir)
+    method = quantum_computer.Method[args.method.upper()]
+    qubit_placement = placement.Placement[args.placement.upper()]
+    reset_method = quantum_computer.ResetMethod[args.reset_method.upper()]
+    if len(args.input_values) == 1:
+        run_experiment(
+            args.flavor,
+            args.input_size,
+            args.input_values[0],
+            args.results_dir,
+            args.nr_processors,
+            method,
+            args.format,
+            args.min_angle,
+            qubit_placement,
+            args.nr_communication_qubits,
+            reset_method,
+            args.defer_measurements,
+        )
+    else:
+        run_experiment_batch(
+            args.flavor,
+            args.input_size,
+            args.input_values,
+            args.results_dir,
+            args.nr_processors,
+            method,
+            args.format,
+            args.min_angle,
+            qubit_placement,
+            args.nr_communication_qubits,
+            reset_method,
+            args.defer_measurements,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Run a grid of QFT experiments using Qiskit in a pool of worker processes, and write the results to
+files for verification.
+
+The grid is the cartesian product of the flavors, input sizes, input values, methods, and numbers
+of processors given on the command line. Each worker process imports Qiskit only once, and then
+runs many grid points. Grid points whose result files already exist are skipped (unless --force is
+given), so an interrupted run can be resumed by running the same command again.
+
+The placement, number of communication qubits, reset method, and measurement deferral of the
+distributed flavor are not swept; the values given on the command line are used for all grid points
+(see run_experiment.py).
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import os
+import sys
+from collections import namedtuple
+import common
+
+FLAVORS = ["monolithic", "distributed"]
+METHOD_NAMES = ["teleport", "cat_state"]
+PLACEMENT_NAMES = ["block", "greedy", "kernighan_lin"]
+RESET_METHOD_NAMES = ["reset", "measure"]
+
+# The options that are the same for all grid points: the format of the result files, the smallest
+# angle of the controlled phase rotations (zero for an exact QFT), and the names of the placement of
+# qubits on processors, the number of communication qubits per processor, the name of the method for
+# resetting ancillary qubits, and whether to defer the measurements (distributed flavor only)
+ExperimentOptions = namedtuple(
+    "ExperimentOptions",
+    [
+        "file_format",
+        "min_angle",
+        "placement_name",
+        "nr_communication_qubits",
+        "reset_method_name",
+        "defer_measurements",
+    ],
+    defaults=[None, 0.0, "block", 1, "reset", False],
+)
+
+
+def parse_command_line_arguments():
+    """
+    Parse the command line arguments.
+
+    Returns
+    -------
+    The parsed arguments in the form of a dictionary.
+    """
+    parser = argparse.ArgumentParser(description="Run a grid of QFT experiments using Qiskit")
+    parser.add_argument("results_dir", help="Results directory")
+    parser.add_argument("--flavors", nargs="+", choices=FLAVORS, default=FLAVORS, help="Flavors")
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, required=True, help="Numbers of input qubits"
+    )
+    parser.add_argument(
+        "--values",
+        nargs="+",
+        default=["all"],
+        help="Input values, as numbers, or 'all' for all values that fit in the input size",
+    )
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=METHOD_NAMES,
+        default=["teleport"],
+        help="Methods for distributed controlled gates (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--nr-processors",
+        nargs="+",
+        type=int,
+        default=[2],
+        help="Numbers of processors (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--placement",
+        choices=PLACEMENT_NAMES,
+        default="block",
+        help="Placement of qubits on processors (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--nr-communication-qubits",
+        type=int,
+        default=1,
+        help="Number of communication qubits per processor (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--reset-method",
+        choices=RESET_METHOD_NAMES,
+        default="reset",
+        help="Method for resetting ancillary qubits (distributed flavor only)",
+    )
+    parser.add_argument(
+        "--defer-measurements",
+        action="store_true",
+        help=(
+            "Use controlled gates instead of mid-circuit measurements and classically controlled "
+            "gates (distributed flavor only)"
+        ),
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Also run grid points for which a result file already exists",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(common.RESULT_FILE_EXTENSIONS.keys()),
+        help="Format of the result files",
+    )
+    parser.add_argument(
+        "--min-angle",
+        type=float,
+        default=0.0,
+        help=(
+            "Drop controlled phase rotations with a smaller angle (in radians) for an approximate "
+            "QFT (default: 0, exact QFT)"
+        ),
+    )
+    args = parser.parse_args()
+    return args
+
+
+def grid_points(flavors, sizes, values, method_names, nr_processors_list):
+    """
+    Generate all points in the experiment grid.
+
+    Parameters
+    ----------
+    flavors: The flavors of quantum fourier transformation (distributed or monolithic).
+    sizes: The numbers of qubits in the input value for the QFT.
+    values: The input values for the QFT (numbers or the string "all"). Values that do not fit in
+        the input size are skipped.
+    method_names: The names of the methods for distributed controlled gates.
+    nr_processors_list: The numbers of processors. Sizes that are not a multiple of the number of
+        processors are skipped.
+
+    Returns
+    -------
+    A generator of (flavor, input_size, input_value, nr_processors, method_name) tuples. The
+    number of processors and the method name are None for the monolithic flavor.
+    """
+    for flavor, size in itertools.product(flavors, sizes):
+        if "all" in values:
+            size_values = range(2**size)
+        else:
+            size_values = [int(value) for value in values if int(value) < 2**size]
+        if flavor == "monolithic":
+            variants = [(None, None)]
+        else:
+            variants = [
+                (nr_processors, method_name)
+                for nr_processors, method_name in itertools.product(
+                    nr_processors_list, method_names
+                )
+                if size % nr_processors == 0
+            ]
+        for value, (nr_processors, method_name) in itertools.product(size_values, variants):
+            yield (flavor, size, value, nr_processors, method_name)
+
+
+def grid_point_file_name(grid_point, results_dir, options=ExperimentOptions()):
+    """
+    Determine the name of the result file for a grid point.
+
+    Parameters
+    ----------
+    grid_point: The grid point (see grid_points).
+    results_dir: The results directory.
+    options: The options of the experiment (see ExperimentOptions).
+
+    Returns
+    -------
+    The name of the result file.
+    """
+    (flavor, size, value, nr_processors, method_name) = grid_point
+    variant = common.experiment_variant(
+        flavor,
+        nr_processors,
+        method_name,
+        options.min_angle,
+        options.placement_name,
+        options.nr_communication_qubits,
+        options.reset_method_name,
+        options.defer_measurements,
+    )
+    return common.result_file_name(
+        "qiskit", flavor, size, value, results_dir, variant, options.file_format
+    )
+
+
+def initialize_worker():
+    """
+    Initialize a worker process by importing Qiskit (indirectly through run_experiment) once.
+    """
+    # pylint: disable=import-outside-toplevel,unused-import
+    import run_experiment
+
+
+def run_grid_point(grid_point, results_dir, options=ExperimentOptions()):
+    """
+    Run the experiment for one grid point in a worker process.
+
+    Parameters
+    ----------
+    grid_point: The grid point (see grid_points).
+    results_dir: The results directory.
+    options: The options of the experiment (see ExperimentOptions).
+
+    Returns
+    -------
+    The name of the file that the results were written to.
+    """
+    # pylint: disable=import-outside-toplevel
+    import placement
+    import quantum_computer
+    import run_experiment
+
+    (flavor, size, value, nr_processors, method_name) = grid_point
+    if flavor != "distributed":
+        return run_experiment.run_experiment(
+            flavor,
+            size,
+            value,
+            results_dir,
+            file_format=options.file_format,
+            min_angle=options.min_angle,
+        )
+    return run_experiment.run_experiment(
+        flavor,
+        size,
+        value,
+        results_dir,
+        nr_processors,
+        quantum_computer.Method[method_name.upper()],
+        options.file_format,
+        options.min_angle,
+        placement.Placement[options.placement_name.upper()],
+        options.nr_communication_qubits,
+        quantum_computer.ResetMethod[options.reset_method_name.upper()],
+        options.defer_measurements,
+    )
+
+
+def run_grid(grid, results_dir, jobs, force=False, options=ExperimentOptions()):
+    """
+    Run the experiments for all points in a grid in a pool of worker processes. Report each result
+    as soon as it is finished.
+
+    Parameters
+    ----------
+    grid: The grid points (see grid_points).
+    results_dir: The results directory.
+    jobs: The number of worker processes.
+    force: If False, skip grid points for which a result file already exists.
+    options: The options of the experiments (see ExperimentOptions).
+
+    Returns
+    -------
+    True if all experiments succeeded, False if at least one experiment failed.
+    """
+    all_succeeded = True
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=initialize_worker
+    ) as executor:
+        futures = {}
+        for grid_point in grid:
+            file_name = grid_point_file_name(grid_point, results_dir, options)
+            if not force and os.path.exists(file_name):
+                print(f"Skip {file_name} (already exists)")
+                continue
+            future = executor.submit(run_grid_point, grid_point, results_dir, options)
+            futures[future] = grid_point
+        for future in concurrent.futures.as_completed(futures):
+            grid_point = futures[future]
+            try:
+                file_name = future.result()
+            # An experiment that fails with common.fatal_error raises SystemExit in the worker,
+            # which must not stop the other experiments either
+            except (Exception, SystemExit) as exception:  # pylint: disable=broad-except
+                print(f"Experiment {grid_point} failed: {exception!r}", file=sys.stderr)
+                all_succeeded = False
+            else:
+                print(f"Finished {file_name}")
+    return all_succeeded
+
+
+def main():
+    """
+    The main function.
+    """
+    args = parse_command_line_arguments()
+    grid = grid_points(args.flavors, args.sizes, args.values, args.methods, args.nr_processors)
+    all_succeeded = run_grid(
+        grid,
+        args.results_dir,
+        args.jobs,
+        args.force,
+        ExperimentOptions(
+            args.format,
+            args.min_angle,
+            args.placement,
+            args.nr_communication_qubits,
+            args.reset_method,
+            args.defer_measurements,
+        ),
+    )
+    if not all_succeeded:
+        common.fatal_error("At least one experiment failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for the caches of built and transpiled circuits.
+"""
+import circuit_cache
+from circuit_cache import CircuitCache
+from qft import DistributedQFT, QFT
+from quantum_computer import Method
+from utils import state_vectors_are_same
+
+
+def test_circuit_cache_eviction():
+    """
+    Test that the least recently used entry is evicted from a full cache.
+    """
+    cache = CircuitCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.invalidate(lambda key: key == "a")
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_cached_circuit_same_as_built_circuit(tmp_path):
+    """
+    Test that a quantum computer that reuses a cached circuit (from memory or from disk) produces
+    the same results as a quantum computer that built the circuit.
+    """
+    circuit_cache.set_disk_cache_dir(str(tmp_path))
+    try:
+        circuit_cache.clear_circuit_caches()
+        for create_algorithm in [
+            lambda: QFT(3),
+            lambda: DistributedQFT(2, 4, Method.TELEPORT),
+            lambda: DistributedQFT(2, 4, Method.CAT_STATE),
+        ]:
+            built_algorithm = create_algorithm()
+            built_algorithm.run(5, transpile_once=True)
+            memory_cached_algorithm = create_algorithm()
+            assert memory_cached_algorithm.qc == built_algorithm.qc
+            circuit_cache.clear_circuit_caches()
+            disk_cached_algorithm = create_algorithm()
+            assert disk_cached_algorithm.qc == built_algorithm.qc
+            for algorithm in [memory_cached_algorithm, disk_cached_algorithm]:
+                algorithm.run(5, transpile_once=True)
+                assert state_vectors_are_same(
+                    algorithm.main_statevector(), built_algorithm.main_statevector()
+                )
+    finally:
+        circuit_cache.set_disk_cache_dir(None)
+        circuit_cache.clear_circuit_caches()
@@ -0,0 +1,34 @@
+"""
+Unit tests for the common functions shared by all platforms.
+"""
+import numpy
+import common
+from qiskit.quantum_info import random_density_matrix, random_statevector
+
+
+def test_density_matrix_file_representations(tmp_path):
+    """
+    Test that density matrices are written in the most compact representation, and are read back
+    the same in both file formats.
+    """
+    product_statevector = common.expected_qft_statevector(4, 5)
+    entangled_statevector = random_statevector(16, seed=1).data
+    density_matrices = {
+        common.PRODUCT_REPRESENTATION: numpy.outer(product_statevector, product_statevector.conj()),
+        common.STATEVECTOR_REPRESENTATION: numpy.outer(
+            entangled_statevector, entangled_statevector.conj()
+        ),
+        common.DENSE_REPRESENTATION: random_density_matrix(16, seed=2).data,
+    }
+    for file_format, extension in common.RESULT_FILE_EXTENSIONS.items():
+        for representation, density_matrix in density_matrices.items():
+            file_name = str(tmp_path / f"{representation}{extension}")
+            common.write_density_matrix_file(file_name, {"input_size": 4}, density_matrix)
+            metadata = common.read_result_metadata(file_name)
+            assert metadata == {"input_size": 4, "representation": representation}
+            data = common.read_density_matrix_from_file(file_name, mmap_mode="r")
+            if representation != common.DENSE_REPRESENTATION:
+                assert isinstance(data["density_matrix"], common.PureDensityMatrix)
+            report = common.compare_density_matrices(data["density_matrix"], density_matrix)
+            assert report["consistent"], file_format
+            assert numpy.allclose(numpy.asarray(data["density_matrix"]), density_matrix)
@@ -0,0 +1,123 @@
+"""
+Unit tests for estimating the resources of a distributed QFT without building its circuit.
+"""
+import itertools
+from numpy import pi
+from estimate_resources import (
+    ControlledPhaseRun,
+    QFTGateRuns,
+    count_qft_circuit,
+    estimate_dqft_resources,
+    qft_block_placement_report,
+)
+from placement import Placement, place_qubits
+from qft import DistributedQFT, create_qft_circuit, qft_gate_ops, qft_nr_gates
+from quantum_computer import ClusteredQuantumComputer, Gate, Method
+
+
+def test_counting_circuit_same_as_circuit():
+    """
+    Test that counting the instructions gives the same resources as building the circuit.
+    """
+    for method in Method:
+        for defer_measurements in [False, True]:
+            algorithm = DistributedQFT(4, 8, method, defer_measurements=defer_measurements)
+            estimate = DistributedQFT(
+                4, 8, method, defer_measurements=defer_measurements, estimate_resources=True
+            )
+            assert estimate.qc.count_ops() == dict(algorithm.qc.count_ops())
+            assert estimate.qc.depth() == algorithm.qc.depth()
+            assert estimate.qc.num_clbits == algorithm.qc.num_clbits
+            assert estimate.nr_epr_pairs == algorithm.nr_epr_pairs
+
+
+def test_count_qft_circuit_same_as_gate_by_gate():
+    """
+    Test that counting the QFT one run of gates at a time gives the same resources as counting it
+    one gate at a time.
+    """
+    min_angles = [0.0, pi / 16, pi, 2 * pi, 20.0]
+    configurations = itertools.product(Method, [1, 2], [False, True], min_angles, Placement)
+    for method, nr_communication_qubits, defer_measurements, min_angle, placement in configurations:
+        report = place_qubits(qft_gate_ops(12, min_angle), 12, 3, placement)
+        (estimate, reference) = [
+            ClusteredQuantumComputer(
+                3,
+                12,
+                method,
+                report["qubit_processors"],
+                nr_communication_qubits,
+                defer_measurements=defer_measurements,
+                estimate_resources=True,
+            )
+            for _ in range(2)
+        ]
+        count_qft_circuit(estimate, min_angle)
+        create_qft_circuit(reference, min_angle)
+        assert estimate.qc.count_ops() == reference.qc.count_ops()
+        assert estimate.qc.depth() == reference.qc.depth()
+        assert estimate.qc.num_clbits == reference.qc.num_clbits
+        assert estimate.nr_epr_pairs == reference.nr_epr_pairs
+        if placement == Placement.BLOCK:
+            block_report = qft_block_placement_report(12, 3, min_angle)
+            assert block_report["nr_remote_gates"] == report["nr_remote_gates"]
+        assert qft_nr_gates(12, min_angle) == len(list(qft_gate_ops(12, min_angle)))
+
+
+def test_qft_gate_runs_following_partners():
+    """
+    Test that the gate runs of the QFT contain the same gates as qft_gate_ops, and that the
+    following gates of each qubit that are determined from the structure of the QFT are the same
+    as the ones that are found by searching the gates.
+    """
+    for min_angle in [0.0, pi / 8]:
+        gate_runs = QFTGateRuns(10, min_angle)
+        # Each gate, with the position and offset in the gate runs where it starts
+        gates = []
+        for position, item in enumerate(gate_runs):
+            if isinstance(item, ControlledPhaseRun):
+                gates.extend(
+                    (position, offset, Gate.CONTROLLED_PHASE, (partner, item.qubit))
+                    for offset, partner in enumerate(item.partners)
+                )
+            else:
+                gates.append((position, 0, item.gate, item.qubit_indexes))
+        assert [(gate, qubits) for (_, _, gate, qubits) in gates] == [
+            (gate_op.gate, gate_op.qubit_indexes) for gate_op in qft_gate_ops(10, min_angle)
+        ]
+        for index, (position, offset, _, _) in enumerate(gates):
+            for qubit in range(10):
+                partners = gate_runs.following_partners(qubit, position, offset)
+                expected_partners = [
+                    qubits[1] if qubits[0] == qubit else qubits[0]
+                    for (_, _, _, qubits) in gates[index:]
+                    if len(qubits) == 2 and qubit in qubits
+                ]
+                assert [partner for qubits in partners for partner in qubits] == expected_partners
+
+
+def test_estimate_dqft_resources():
+    """
+    Test estimating the resources of a distributed QFT, including a large QFT.
+    """
+    estimate = estimate_dqft_resources(4, 2, Method.CAT_STATE)
+    assert estimate["nr_local_gates"] == 6
+    assert estimate["nr_remote_gates"] == 6
+    assert estimate["nr_epr_pairs"] == 6
+    assert estimate["nr_classical_bits"] == 4
+    estimate = estimate_dqft_resources(1024, 8, Method.TELEPORT, min_angle=pi / 2**8)
+    assert estimate["nr_remote_gates"] == 764
+    assert estimate["nr_epr_pairs"] == 1136
+    for method in Method:
+        estimate = estimate_dqft_resources(1024, 8, method)
+        # All pairs of qubits on different processors, plus the swaps between the two halves
+        assert estimate["nr_remote_gates"] == 7 * 1024 * 1024 // 16 + 512
+        assert estimate["nr_local_gates"] == qft_nr_gates(1024) - estimate["nr_remote_gates"]
+        assert estimate["nr_physical_qubits"] == 1024 + 8 * 2
+        assert estimate["nr_classical_bits"] == 8 * 2
+    # With the block placement, each qubit needs one cat state for each processor before its own
+    # processor, and each swap between the two halves teleports a qubit there and back
+    estimate = estimate_dqft_resources(1024, 8, Method.CAT_STATE)
+    assert estimate["nr_epr_pairs"] == 128 * (0 + 1 + 2 + 3 + 4 + 5 + 6 + 7) + 2 * 512
+    estimate = estimate_dqft_resources(1024, 8, Method.TELEPORT)
+    assert estimate["nr_epr_pairs"] == 5499
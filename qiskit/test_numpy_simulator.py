@@ -0,0 +1,76 @@
+"""
+Unit tests for the NumPy statevector simulator.
+"""
+import numpy
+from numpy_simulator import NumpySimulator
+from qft import DistributedQFT, QFT
+from quantum_computer import Method
+from utils import state_vectors_are_same
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+from qiskit.circuit.library import CRXGate, RYGate
+from qiskit.quantum_info import Statevector
+
+
+def test_unitary_gates():
+    """
+    Test that the statevector of a circuit with unitary gates is the same as the one computed by
+    Qiskit.
+    """
+    rng = numpy.random.default_rng(1)
+    unitary_qc = QuantumCircuit(4)
+    for _ in range(50):
+        (qubit_1, qubit_2) = (int(qubit) for qubit in rng.choice(4, 2, replace=False))
+        angle = rng.random()
+        unitary_qc.h(qubit_1)
+        unitary_qc.cx(qubit_1, qubit_2)
+        unitary_qc.cp(angle, qubit_2, qubit_1)
+        unitary_qc.cz(qubit_1, qubit_2)
+        unitary_qc.swap(qubit_1, qubit_2)
+        unitary_qc.x(qubit_2)
+        unitary_qc.z(qubit_1)
+        unitary_qc.append(RYGate(angle), [qubit_2])
+        unitary_qc.append(CRXGate(angle), [qubit_1, qubit_2])
+    qc = QuantumCircuit(4)
+    qc.initialize([0.6, 0.8j], [2])  # pylint: disable=no-member
+    qc.compose(unitary_qc, inplace=True)
+    statevector = NumpySimulator(seed=1).run(qc).result().get_statevector()
+    initial_statevector = Statevector([1, 0]).tensor(Statevector([0.6, 0.8j]))
+    expected = initial_statevector.tensor(Statevector([1, 0, 0, 0])).evolve(unitary_qc)
+    assert numpy.allclose(statevector.data, expected.data)
+
+
+def test_teleportation():
+    """
+    Test mid-circuit measurements and classically conditioned gates by teleporting a qubit.
+    """
+    qubits = QuantumRegister(3)
+    bits = ClassicalRegister(2)
+    qc = QuantumCircuit(qubits, bits)
+    qc.initialize([0.6, 0.8j], [0])  # pylint: disable=no-member
+    qc.h(1)
+    qc.cx(1, 2)
+    qc.cx(0, 1)
+    qc.h(0)
+    qc.measure(0, bits[0])
+    qc.measure(1, bits[1])
+    qc.x(2).c_if(bits[1], 1)
+    qc.z(2).c_if(bits[0], 1)
+    qc.reset([0, 1])
+    result = NumpySimulator(seed=1).run(qc, shots=20).result()
+    expected = Statevector([0.6, 0.8j]).tensor(Statevector([1, 0, 0, 0]))
+    assert state_vectors_are_same(result.get_statevector(), expected)
+    assert sum(result.get_counts().values()) == 20
+
+
+def test_dqft_on_numpy_simulator():
+    """
+    Test that distributed QFTs run on the NumPy simulator compute the same statevectors as a
+    monolithic QFT run on the Aer simulator.
+    """
+    for method in Method:
+        algorithm = DistributedQFT(2, 4, method)
+        statevectors = algorithm.run_batch(range(16), backend="numpy")
+        for input_number, statevector in statevectors.items():
+            qft = QFT(4)
+            qft.run(input_number)
+            assert state_vectors_are_same(statevector, qft.main_statevector())
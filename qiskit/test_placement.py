@@ -0,0 +1,51 @@
+"""
+Unit tests for the placement of qubits on processors.
+"""
+from placement import Placement, block_placement, interaction_graph, place_qubits
+from qft import qft_gate_ops
+from quantum_computer import Gate, GateOp
+
+
+def test_block_placement():
+    """
+    Test the block placement and counting its remote gates.
+    """
+    assert block_placement(6, 3) == [0, 0, 1, 1, 2, 2]
+    weights = interaction_graph(qft_gate_ops(4), 4)
+    assert weights[0, 3] == 2  # One controlled phase gate and one swap gate
+    report = place_qubits(qft_gate_ops(4), 4, 2, Placement.BLOCK)
+    assert report["nr_remote_gates"] == report["nr_block_remote_gates"] == 6
+
+
+def test_placements_reduce_remote_gates():
+    """
+    Test that the Kernighan-Lin placement never has more remote gates than the block placement,
+    and that each placement places the same number of qubits on each processor.
+    """
+    for total_nr_qubits, nr_processors in [(4, 2), (8, 2), (8, 4), (12, 3), (32, 4)]:
+        for placement in Placement:
+            report = place_qubits(
+                qft_gate_ops(total_nr_qubits), total_nr_qubits, nr_processors, placement
+            )
+            qubit_processors = report["qubit_processors"]
+            for processor_index in range(nr_processors):
+                assert qubit_processors.count(processor_index) == total_nr_qubits // nr_processors
+            if placement == Placement.KERNIGHAN_LIN:
+                assert report["nr_remote_gates"] <= report["nr_block_remote_gates"]
+
+
+def test_kernighan_lin_placement_improves_block_placement():
+    """
+    Test that the Kernighan-Lin placement has fewer remote gates than the block placement when
+    the qubits that interact are not in the same block.
+    """
+    # Qubits 0 and 2 interact, and so do qubits 1 and 3, but the block placement places qubits 0
+    # and 1 on one processor and qubits 2 and 3 on the other processor
+    gate_ops = [
+        GateOp(Gate.CONTROLLED_PHASE, (0, 2), 0.5),
+        GateOp(Gate.CONTROLLED_PHASE, (1, 3), 0.5),
+        GateOp(Gate.SWAP, (0, 2), None),
+    ]
+    report = place_qubits(gate_ops, 4, 2, Placement.KERNIGHAN_LIN)
+    assert report["nr_block_remote_gates"] == 3
+    assert report["nr_remote_gates"] == 0
@@ -2,10 +2,13 @@
 Unit tests for quantum Fourier transformation (monolithic and distributed) implemented in Qiskit.
 """
 from math import sqrt
-from qft import DistributedQFT, QFT
-from quantum_computer import Method
+from numpy import allclose, pi
+from placement import Placement
+from qft import DistributedQFT, QFT, qft_gate_ops
+from quantum_computer import Gate, Method, ResetMethod
 from utils import state_vectors_are_same
-from qiskit.quantum_info import Statevector
+import common
+from qiskit.quantum_info import Statevector, state_fidelity
 
 
 ONE_OVER_SQRT2 = 1.0 / sqrt(2.0)
@@ -49,28 +52,230 @@ def test_monolithic_qft_four_qubits():
     assert state_vectors_are_same(statevector, PLUS_PLUS_PLUS_PLUS_STATE)
 
 
+def test_qft_gate_ops():
+    """
+    Test generating the gates for exact and approximate QFTs, including QFTs with more qubits than
+    the recursion limit.
+    """
+    gate_ops = list(qft_gate_ops(3))
+    assert [gate_op.gate for gate_op in gate_ops] == [
+        Gate.HADAMARD,
+        Gate.CONTROLLED_PHASE,
+        Gate.CONTROLLED_PHASE,
+        Gate.HADAMARD,
+        Gate.CONTROLLED_PHASE,
+        Gate.HADAMARD,
+        Gate.SWAP,
+    ]
+    assert gate_ops[1].qubit_indexes == (0, 2)
+    assert gate_ops[1].angle == pi / 4
+    nr_qubits = 2000
+    nr_controlled_phases = sum(
+        1 for gate_op in qft_gate_ops(nr_qubits) if gate_op.gate == Gate.CONTROLLED_PHASE
+    )
+    assert nr_controlled_phases == nr_qubits * (nr_qubits - 1) // 2
+    approximate_gate_ops = list(qft_gate_ops(nr_qubits, min_angle=pi / 8))
+    assert all(gate_op.angle >= pi / 8 for gate_op in approximate_gate_ops if gate_op.angle)
+    assert len(approximate_gate_ops) == nr_qubits + (3 * nr_qubits - 6) + nr_qubits // 2
+
+
 def test_dqft_same_as_qft():
     """
     Test whether statevector computed by a distributed QFT is the same as the one computed by a
     monolothic QFT.
     """
-    nr_processors = 2
     test_cases = [
-        (Method.TELEPORT, 2, 2, 0),
-        (Method.TELEPORT, 2, 2, 1),
-        (Method.TELEPORT, 2, 4, 0),
-        (Method.TELEPORT, 2, 4, 3),
-        (Method.TELEPORT, 2, 4, 12),
-        (Method.TELEPORT, 2, 4, 15),
-        (Method.TELEPORT, 2, 6, 3),
-        (Method.TELEPORT, 3, 6, 11),
-        (Method.CAT_STATE, 2, 4, 9),
+        (Method.TELEPORT, 2, 2, [0, 1]),
+        (Method.TELEPORT, 2, 4, [0, 3, 12, 15]),
+        (Method.TELEPORT, 2, 6, [3]),
+        (Method.TELEPORT, 3, 6, [11]),
+        (Method.CAT_STATE, 2, 4, [9]),
     ]
-    for method, nr_processors, total_nr_qubits, input_number in test_cases:
-        qft = QFT(total_nr_qubits)
-        qft.run(input_number)
-        qft_statevector = qft.main_statevector()
+    for method, nr_processors, total_nr_qubits, input_numbers in test_cases:
+        qft_statevectors = QFT(total_nr_qubits).run_batch(input_numbers)
         dqft = DistributedQFT(nr_processors, total_nr_qubits, method)
-        dqft.run(input_number)
-        dqft_statevector = qft.main_statevector()
-        assert state_vectors_are_same(qft_statevector, dqft_statevector)
+        dqft_statevectors = dqft.run_batch(input_numbers)
+        assert state_vectors_are_same(
+            [qft_statevectors[input_number] for input_number in input_numbers],
+            [dqft_statevectors[input_number] for input_number in input_numbers],
+        )
+
+
+def test_transpile_once_same_as_full_transpile():
+    """
+    Test whether running a circuit that was transpiled once without the input produces the same
+    statevector as transpiling the whole circuit including the input for every run.
+    """
+    test_cases = [
+        (QFT(3), range(8)),
+        (DistributedQFT(2, 4, Method.TELEPORT), [0, 5, 9, 15]),
+    ]
+    for algorithm, input_numbers in test_cases:
+        for input_number in input_numbers:
+            algorithm.run(input_number)
+            statevector = algorithm.main_statevector()
+            algorithm.run(input_number, transpile_once=True)
+            transpile_once_statevector = algorithm.main_statevector()
+            assert state_fidelity(statevector, transpile_once_statevector) > 0.999
+            assert algorithm.transpile_time >= 0.0
+            assert algorithm.simulate_time >= 0.0
+
+
+def test_run_batch_same_as_run():
+    """
+    Test whether running a batch of input numbers in a single job produces the same statevectors
+    and density matrices as running each input number separately.
+    """
+    test_cases = [
+        (QFT(3), range(8)),
+        (DistributedQFT(2, 4, Method.CAT_STATE), range(16)),
+    ]
+    for algorithm, input_numbers in test_cases:
+        statevectors = algorithm.run_batch(input_numbers)
+        density_matrices = algorithm.run_batch(input_numbers, density_matrices=True)
+        assert sorted(statevectors.keys()) == list(input_numbers)
+        for input_number in input_numbers:
+            algorithm.run(input_number)
+            statevector = algorithm.main_statevector()
+            assert state_fidelity(statevector, statevectors[input_number]) > 0.999
+            assert state_fidelity(statevector, density_matrices[input_number]) > 0.999
+
+
+def test_approximate_qft_fidelity():
+    """
+    Test whether the fidelity of an approximate QFT relative to the exact QFT is as predicted.
+    """
+    min_angle = pi / 8
+    for input_number in [0, 5, 31]:
+        qft = QFT(total_nr_qubits=5)
+        qft.run(input_number)
+        approximate_qft = DistributedQFT(1, 5, Method.TELEPORT, min_angle)
+        approximate_qft.run(input_number)
+        fidelity = state_fidelity(qft.main_statevector(), approximate_qft.main_statevector())
+        expected_fidelity = common.approximate_qft_fidelity(5, min_angle, input_number)
+        assert abs(fidelity - expected_fidelity) < 0.001
+    assert common.approximate_qft_fidelity(5, min_angle) == common.approximate_qft_fidelity(
+        5, min_angle, 31
+    )
+
+
+def test_dqft_with_placement_same_as_qft():
+    """
+    Test whether the statevector computed by a distributed QFT with a non-block placement of qubits
+    on processors (computed or explicit) is the same as the one computed by a monolithic QFT.
+    """
+    for placement in [Placement.KERNIGHAN_LIN, [1, 0, 2, 0, 2, 1]]:
+        algorithm = DistributedQFT(3, 6, Method.CAT_STATE, placement=placement)
+        statevectors = algorithm.run_batch([0, 1, 22, 63])
+        for input_number, statevector in statevectors.items():
+            qft = QFT(6)
+            qft.run(input_number)
+            assert state_vectors_are_same(statevector, qft.main_statevector())
+
+
+def test_dqft_cat_state_fan_out():
+    """
+    Test that the distributed QFT using cat states shares one cat state between consecutive remote
+    controlled phase gates with the same control qubit and target processor, and that this does not
+    change the statevector.
+    """
+    algorithm = DistributedQFT(2, 4, Method.CAT_STATE)
+    assert algorithm.nr_epr_pairs == 6
+    assert algorithm.nr_epr_pairs_saved == 2
+    statevectors = algorithm.run_batch([0, 5, 15])
+    for input_number, statevector in statevectors.items():
+        qft = QFT(4)
+        qft.run(input_number)
+        assert state_vectors_are_same(statevector, qft.main_statevector())
+
+
+def test_dqft_lazy_teleport():
+    """
+    Test that the distributed QFT using teleportation keeps qubits on a remote processor while they
+    are used there, and that this does not change the statevector.
+    """
+    for placement in [Placement.BLOCK, Placement.KERNIGHAN_LIN]:
+        algorithm = DistributedQFT(3, 6, Method.TELEPORT, placement=placement)
+        assert algorithm.nr_epr_pairs_saved > 0
+        statevectors = algorithm.run_batch([0, 1, 22, 63])
+        for input_number, statevector in statevectors.items():
+            qft = QFT(6)
+            qft.run(input_number)
+            assert state_vectors_are_same(statevector, qft.main_statevector())
+
+
+def test_dqft_multiple_communication_qubits():
+    """
+    Test that a distributed QFT with multiple communication qubits per processor has a smaller
+    circuit depth, and computes the same statevector as a monolithic QFT.
+    """
+    for method in Method:
+        algorithm = DistributedQFT(2, 4, method, nr_communication_qubits=2)
+        assert algorithm.qc.depth() < DistributedQFT(2, 4, method).qc.depth()
+        statevectors = algorithm.run_batch([0, 5, 15])
+        for input_number, statevector in statevectors.items():
+            qft = QFT(4)
+            qft.run(input_number)
+            assert state_vectors_are_same(statevector, qft.main_statevector())
+
+
+def test_dqft_reset_methods():
+    """
+    Test that a distributed QFT only resets ancillary qubits that may be dirty, and that both reset
+    methods compute the same statevector as a monolithic QFT.
+    """
+    for reset_method in ResetMethod:
+        algorithm = DistributedQFT(2, 4, Method.CAT_STATE, reset_method=reset_method)
+        assert algorithm.nr_resets_elided > 0
+        if reset_method == ResetMethod.MEASURE:
+            assert "reset" not in algorithm.qc.count_ops()
+        statevectors = algorithm.run_batch([0, 5, 15])
+        for input_number, statevector in statevectors.items():
+            qft = QFT(4)
+            qft.run(input_number)
+            assert state_vectors_are_same(statevector, qft.main_statevector())
+
+
+def test_dqft_defer_measurements():
+    """
+    Test that a distributed QFT with deferred measurements has no measurements, classically
+    controlled gates, or resets, and computes the same main density matrix as with measurements.
+    """
+    for method in Method:
+        algorithm = DistributedQFT(2, 4, method)
+        deferred_algorithm = DistributedQFT(2, 4, method, defer_measurements=True)
+        ops = deferred_algorithm.qc.count_ops()
+        assert "measure" not in ops and "reset" not in ops
+        assert all(
+            instruction.operation.condition is None for instruction in deferred_algorithm.qc.data
+        )
+        for input_number in [0, 5, 15]:
+            algorithm.run(input_number)
+            deferred_algorithm.run(input_number)
+            assert allclose(
+                algorithm.main_density_matrix().data,
+                deferred_algorithm.main_density_matrix().data,
+            )
+
+
+def test_expected_qft_statevector():
+    """
+    Test that the analytically computed QFT output is the same as the simulated QFT output, for
+    exact and approximate QFTs, and for single inputs and batches of inputs.
+    """
+    qft = QFT(total_nr_qubits=3)
+    statevectors = qft.run_batch(range(8))
+    expected_statevectors = common.expected_qft_statevectors(3)
+    for input_number, statevector in statevectors.items():
+        expected_statevector = common.expected_qft_statevector(3, input_number)
+        assert allclose(statevector.data, expected_statevector)
+        assert allclose(expected_statevectors[input_number], expected_statevector)
+    assert allclose(common.expected_qft_statevectors(3, [6, 2]), expected_statevectors[[6, 2]])
+    min_angle = pi / 4
+    approximate_qft = DistributedQFT(1, 4, Method.TELEPORT, min_angle)
+    for input_number in [3, 15]:
+        approximate_qft.run(input_number)
+        assert allclose(
+            approximate_qft.main_density_matrix().data,
+            common.expected_qft_density_matrix(4, input_number, min_angle),
+        )
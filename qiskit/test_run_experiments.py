@@ -0,0 +1,81 @@
+"""
+Unit tests for running a grid of experiments.
+"""
+import os
+import run_experiments
+
+
+def test_run_grid_with_failed_grid_points(tmp_path, capsys):
+    """
+    Test that grid points that fail, also with common.fatal_error in the worker, are reported as
+    failed without stopping the other grid points.
+    """
+    results_dir = str(tmp_path)
+    valid_grid_point = ("monolithic", 2, 1, None, None)
+    # The size is not a multiple of the number of processors
+    invalid_grid_point = ("distributed", 3, 1, 2, "teleport")
+    # The result file cannot be written, which is a fatal error
+    unwritable_grid_point = ("monolithic", 2, 2, None, None)
+    options = run_experiments.ExperimentOptions("json")
+    os.mkdir(run_experiments.grid_point_file_name(unwritable_grid_point, results_dir, options))
+    grid = [invalid_grid_point, unwritable_grid_point, valid_grid_point]
+    assert not run_experiments.run_grid(grid, results_dir, 1, force=True, options=options)
+    assert os.path.isfile(
+        run_experiments.grid_point_file_name(valid_grid_point, results_dir, options)
+    )
+    errors = capsys.readouterr().err
+    assert f"Experiment {invalid_grid_point} failed" in errors
+    assert f"Experiment {unwritable_grid_point} failed: SystemExit(1)" in errors
+
+
+def test_grid_point_file_name_distinguishes_options():
+    """
+    Test that the options for the distributed flavor are part of the result file names of the
+    distributed grid points, so that grid points with other options are not skipped.
+    """
+    grid_point = ("distributed", 4, 3, 2, "cat_state")
+    options = run_experiments.ExperimentOptions("json")
+    file_names = {
+        run_experiments.grid_point_file_name(grid_point, "results", options),
+        run_experiments.grid_point_file_name(
+            grid_point, "results", options._replace(placement_name="greedy")
+        ),
+        run_experiments.grid_point_file_name(
+            grid_point, "results", options._replace(nr_communication_qubits=2)
+        ),
+        run_experiments.grid_point_file_name(
+            grid_point, "results", options._replace(reset_method_name="measure")
+        ),
+        run_experiments.grid_point_file_name(
+            grid_point, "results", options._replace(defer_measurements=True)
+        ),
+    }
+    assert len(file_names) == 5
+    monolithic_grid_point = ("monolithic", 4, 3, None, None)
+    assert run_experiments.grid_point_file_name(
+        monolithic_grid_point, "results", options
+    ) == run_experiments.grid_point_file_name(
+        monolithic_grid_point,
+        "results",
+        run_experiments.ExperimentOptions("json", 0.0, "greedy", 2, "measure", True),
+    )
+
+
+def test_option_names_same_as_enums():
+    """
+    Test that the names of the options, which are listed without importing Qiskit, are the same as
+    the names of the enums that they are converted to in the worker processes.
+    """
+    # pylint: disable=import-outside-toplevel
+    import placement
+    import quantum_computer
+
+    assert run_experiments.METHOD_NAMES == [
+        method.name.lower() for method in quantum_computer.Method
+    ]
+    assert run_experiments.PLACEMENT_NAMES == [
+        qubit_placement.name.lower() for qubit_placement in placement.Placement
+    ]
+    assert run_experiments.RESET_METHOD_NAMES == [
+        reset_method.name.lower() for reset_method in quantum_computer.ResetMethod
+    ]
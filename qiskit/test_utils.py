@@ -0,0 +1,64 @@
+"""
+Unit tests for the general utilities for QFTs in Qiskit.
+"""
+import numpy
+from utils import (
+    StateComparison,
+    bit_reversal_permutation,
+    density_matrix_reverse_bit_order,
+    reverse_bit_order,
+    state_vectors_are_same,
+    state_vectors_match,
+)
+from qiskit.quantum_info import DensityMatrix, random_density_matrix
+
+
+def test_reverse_bit_order():
+    """
+    Test reversing the bits in a single value and in an array of values.
+    """
+    assert reverse_bit_order(4, 0b0001) == 0b1000
+    assert reverse_bit_order(4, 0b0110) == 0b0110
+    assert reverse_bit_order(5, 0b00011) == 0b11000
+    values = numpy.array([0b001, 0b011, 0b100])
+    assert list(reverse_bit_order(3, values)) == [0b100, 0b110, 0b001]
+    assert list(values) == [0b001, 0b011, 0b100]
+    assert list(bit_reversal_permutation(2)) == [0, 2, 1, 3]
+
+
+def test_density_matrix_reverse_bit_order():
+    """
+    Test reversing the bit order of a density matrix, both into a new matrix and in place.
+    """
+    for nr_qubits in range(1, 6):
+        density_matrix = random_density_matrix(2**nr_qubits, seed=nr_qubits)
+        expected_data = density_matrix.reverse_qargs().data
+        reversed_density_matrix = density_matrix_reverse_bit_order(density_matrix)
+        assert numpy.allclose(reversed_density_matrix.data, expected_data)
+        data = density_matrix.data.copy()
+        density_matrix_reverse_bit_order(DensityMatrix(data), out=data)
+        assert numpy.allclose(data, expected_data)
+        out = numpy.empty_like(data)
+        density_matrix_reverse_bit_order(density_matrix, out=out)
+        assert numpy.allclose(out, expected_data)
+
+
+def test_state_vectors_are_same():
+    """
+    Test comparing state vectors and stacks of state vectors, ignoring global phase.
+    """
+    state_vector = numpy.array([0.5, 0.5j, -0.5, 0.5])
+    phase = numpy.exp(1.234j)
+    for comparison in StateComparison:
+        assert state_vectors_are_same(state_vector, phase * state_vector, comparison=comparison)
+        assert not state_vectors_are_same(
+            state_vector, numpy.array([0.5, 0.5, 0.5, 0.5]), comparison=comparison
+        )
+    stack_1 = numpy.array([state_vector, [1.0, 0.0, 0.0, 0.0]])
+    stack_2 = numpy.array([-state_vector, [0.0, 1.0, 0.0, 0.0]])
+    assert list(state_vectors_match(stack_1, stack_2)) == [True, False]
+    assert not state_vectors_are_same(stack_1, stack_2)
+    assert state_vectors_are_same(
+        state_vector, 1.01 * state_vector, max_delta=0.0, relative_delta=0.02
+    )
+    assert not state_vectors_are_same(state_vector, 1.01 * state_vector, relative_delta=0.0)
@@ -3,40 +3,137 @@ General utilities for QFTs in Qiskit.
 """
 
 from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+import numpy
 from qiskit.quantum_info import DensityMatrix
 
+REVERSE_BIT_ORDER_BLOCK_SIZE = 256
 
-def state_vectors_are_same(state_vector_1, state_vector_2, max_delta=0.001):
+
+class StateComparison(Enum):
+    """
+    The method that is used to compare two state vectors.
+    """
+
+    AMPLITUDES = 1
+    """
+    Remove the difference in global phase, and then compare the state vectors amplitude by
+    amplitude, allowing for an absolute and a relative rounding error.
+    """
+
+    FIDELITY = 2
+    """
+    Compare the fidelity of the two state vectors to one, allowing for an absolute rounding error.
+    """
+
+
+def _state_vectors_data(state_vectors):
+    if isinstance(state_vectors, (list, tuple)):
+        return numpy.stack([_state_vectors_data(state_vector) for state_vector in state_vectors])
+    if hasattr(state_vectors, "data") and not isinstance(state_vectors, numpy.ndarray):
+        return numpy.asarray(state_vectors.data)
+    return numpy.asarray(state_vectors)
+
+
+def state_vectors_match(
+    state_vectors_1,
+    state_vectors_2,
+    max_delta=0.001,
+    relative_delta=0.0,
+    comparison=StateComparison.AMPLITUDES,
+):
+    """
+    Compare state vectors, or stacks of state vectors, ignoring any difference in global phase and
+    allowing for rounding errors.
+
+    Parameters
+    ----------
+    state_vectors_1: The first state vector, or stack of state vectors, to be compared. A stack of
+        state vectors can be a list of state vectors, or a numpy array where the last axis contains
+        the amplitudes.
+    state_vectors_2: The second state vector, or stack of state vectors, to be compared. Must have
+        the same shape as state_vectors_1.
+    max_delta: For comparison AMPLITUDES, the maximum absolute difference in any component in both
+        state vectors. For comparison FIDELITY, the maximum difference of the fidelity from one.
+    relative_delta: For comparison AMPLITUDES, the maximum difference in any component in both
+        state vectors, relative to the absolute value of the component in state_vectors_1. This is
+        allowed in addition to max_delta. Not used for comparison FIDELITY.
+    comparison: The method that is used to compare the state vectors.
+
+    Returns
+    -------
+    A numpy array of booleans with the shape of the stack (a single boolean for two single state
+    vectors) which is True where the state vectors are the same, and False where they are
+    different.
+    """
+    data_1 = _state_vectors_data(state_vectors_1)
+    data_2 = _state_vectors_data(state_vectors_2)
+    assert data_1.shape == data_2.shape, "State vectors must have same dimension"
+    if comparison == StateComparison.AMPLITUDES:
+        return _amplitudes_match(data_1, data_2, max_delta, relative_delta)
+    if comparison == StateComparison.FIDELITY:
+        return _fidelities_match(data_1, data_2, max_delta)
+    assert False, "Unknown comparison"
+
+
+def _amplitudes_match(data_1, data_2, max_delta, relative_delta):
+    # Use the largest component of state vector 1 as reference to determine the difference in
+    # global phase, and rotate state vector 2 such that its reference component has the same phase.
+    max_indexes = numpy.argmax(numpy.abs(data_1), axis=-1)[..., numpy.newaxis]
+    reference_1 = numpy.take_along_axis(data_1, max_indexes, axis=-1)
+    reference_2 = numpy.take_along_axis(data_2, max_indexes, axis=-1)
+    phase_differences = reference_1 * numpy.conj(reference_2)
+    magnitudes = numpy.abs(phase_differences)
+    phase_differences = numpy.divide(
+        phase_differences,
+        magnitudes,
+        out=numpy.ones_like(phase_differences),
+        where=magnitudes > 0.0,
+    )
+    adjusted_data_2 = phase_differences * data_2
+    close = numpy.abs(data_1 - adjusted_data_2) <= max_delta + relative_delta * numpy.abs(data_1)
+    return numpy.all(close, axis=-1)
+
+
+def _fidelities_match(data_1, data_2, max_delta):
+    overlaps = numpy.sum(numpy.conj(data_1) * data_2, axis=-1)
+    norms_1 = numpy.sum(numpy.abs(data_1) ** 2, axis=-1)
+    norms_2 = numpy.sum(numpy.abs(data_2) ** 2, axis=-1)
+    fidelities = numpy.abs(overlaps) ** 2 / (norms_1 * norms_2)
+    return fidelities >= 1.0 - max_delta
+
+
+def state_vectors_are_same(
+    state_vector_1,
+    state_vector_2,
+    max_delta=0.001,
+    relative_delta=0.0,
+    comparison=StateComparison.AMPLITUDES,
+):
     """
     Are two state vectors the same, ignoring any difference in global phase and allowing for
     rounding errors.
 
     Parameters
     ----------
-    state_vector_1: The first state vector to be compared.
-    state_vector_2: The second state vector to be compared.
-    max_delta: The maximum difference in the norm of any component in both state vectors.
+    state_vector_1: The first state vector, or stack of state vectors, to be compared.
+    state_vector_2: The second state vector, or stack of state vectors, to be compared.
+    max_delta: The maximum difference in any component in both state vectors (see
+        state_vectors_match).
+    relative_delta: The maximum relative difference in any component in both state vectors (see
+        state_vectors_match).
+    comparison: The method that is used to compare the state vectors.
 
     Returns
     -------
-    True if the two state vectors are the same, ignoring global phase and rounding errors. False
-    if they are different.
-    """
-    assert state_vector_1.dim == state_vector_2.dim, "State vectors must have same dimension"
-    max_index = 0
-    max_value = state_vector_1[0]
-    for index in range(1, state_vector_1.dim):
-        if state_vector_1[index] > max_value:
-            max_value = state_vector_1[index]
-            max_index = index
-    global_phase_difference = state_vector_2[max_index] / state_vector_1[max_index]
-    for index in range(state_vector_1.dim):
-        value_1 = state_vector_1[index]
-        value_2 = state_vector_2[index]
-        adjusted_value_2 = global_phase_difference * value_2
-        if abs(value_1 - adjusted_value_2) > max_delta:
-            return False
-    return True
+    True if the two state vectors are the same (or for stacks: if all state vectors in the stacks
+    are the same), ignoring global phase and rounding errors. False if they are different.
+    """
+    match = state_vectors_match(
+        state_vector_1, state_vector_2, max_delta, relative_delta, comparison
+    )
+    return bool(numpy.all(match))
 
 
 def reverse_bit_order(nr_bits, value):
@@ -47,22 +144,41 @@ def reverse_bit_order(nr_bits, value):
     ----------
     nr_bits: The number of bits for the value (we need to specify this because the value might have
         leading zeroes).
-    value: The value to be reversed.
+    value: The value to be reversed. This can also be a numpy array of integer values, in which case
+        the bits in each element are reversed.
 
     Returns
     -------
     The value of the reversed bit order.
     """
-    reversed_value = 0
+    reversed_value = value & 0
     for _ in range(nr_bits):
         bit = value & 1
-        value >>= 1
-        reversed_value <<= 1
-        reversed_value |= bit
+        value = value >> 1
+        reversed_value = (reversed_value << 1) | bit
     return reversed_value
 
 
-def density_matrix_reverse_bit_order(density_matrix):
+@lru_cache(maxsize=None)
+def bit_reversal_permutation(nr_bits):
+    """
+    Compute the bit reversal permutation for all values with a given number of bits. The result is
+    cached, so the permutation is only computed once for each number of bits.
+
+    Parameters
+    ----------
+    nr_bits: The number of bits.
+
+    Returns
+    -------
+    A read-only numpy array where the element at index i is i with its bits reversed.
+    """
+    permutation = reverse_bit_order(nr_bits, numpy.arange(2**nr_bits))
+    permutation.setflags(write=False)
+    return permutation
+
+
+def density_matrix_reverse_bit_order(density_matrix, out=None):
     """
     Convert a density matrix into the corresponding density bit matrix where the bit order of the
     states is reversed. This is needed to convert density matrices as computed by Qiskit into
@@ -71,23 +187,34 @@ def density_matrix_reverse_bit_order(density_matrix):
     Parameters
     ----------
     density_matrix: A density matrix.
+    out: An optional numpy array (with the same shape as the density matrix) that the reversed
+        density matrix is stored in. This may be the data of density_matrix itself, to reverse the
+        bit order in place: rows and columns are then swapped pairwise (the bit reversal
+        permutation only consists of swaps), using temporary storage for only
+        REVERSE_BIT_ORDER_BLOCK_SIZE rows or columns at a time.
 
     Returns
     -------
     The corresponding density matrix with the bit order of the states reversed.
     """
     nr_qubits = len(density_matrix.dims())
-    dm_size = nr_qubits**2
-    reversed_dm = []
-    for row_index in range(dm_size):
-        row = []
-        for column_index in range(dm_size):
-            reversed_row_index = reverse_bit_order(nr_qubits, row_index)
-            reversed_column_index = reverse_bit_order(nr_qubits, column_index)
-            value = density_matrix.data[reversed_row_index][reversed_column_index]
-            row.append(value)
-        reversed_dm.append(row)
-    return DensityMatrix(reversed_dm)
+    permutation = bit_reversal_permutation(nr_qubits)
+    if out is None:
+        return DensityMatrix(density_matrix.data[numpy.ix_(permutation, permutation)])
+    if out is not density_matrix.data:
+        out[...] = density_matrix.data
+    indexes = numpy.arange(len(permutation))
+    swapped_indexes = indexes[indexes < permutation]
+    for start in range(0, len(swapped_indexes), REVERSE_BIT_ORDER_BLOCK_SIZE):
+        indexes_1 = swapped_indexes[start : start + REVERSE_BIT_ORDER_BLOCK_SIZE]
+        indexes_2 = permutation[indexes_1]
+        rows_1 = out[indexes_1]
+        out[indexes_1] = out[indexes_2]
+        out[indexes_2] = rows_1
+        columns_1 = out[:, indexes_1]
+        out[:, indexes_1] = out[:, indexes_2]
+        out[:, indexes_2] = columns_1
+    return DensityMatrix(out)
 
 
 def density_matrix_pretty_print(density_matrix):
@@ -4,6 +4,8 @@ density matrix describing the final state).
 """
 
 import sys
+import numpy
+import common
 
 
 def read_density_matrix(file_name):
@@ -50,7 +52,7 @@ def read_density_matrix(file_name):
 
 def compare_density_matrices(density_matrix_1, density_matrix_2):
     """
-    Compute the difference between two density matrices.
+    Compute the difference between two density matrices, and print statistics about the difference.
 
     Parameters
     ----------
@@ -61,16 +63,18 @@ def compare_density_matrices(density_matrix_1, density_matrix_2):
     -------
     The difference matrix, which is density_matrix_1 - density_matrix_2
     """
-    size = len(density_matrix_1)
-    assert size == len(density_matrix_2), "The density matrices must be the same size"
-    difference_matrix = []
-    for row_nr in range(size):
-        row = []
-        for col_nr in range(size):
-            difference_value = density_matrix_1[row_nr][col_nr] - density_matrix_2[row_nr][col_nr]
-            row.append(difference_value)
-        difference_matrix.append(row)
-    return difference_matrix
+    density_matrix_1 = numpy.asarray(density_matrix_1)
+    density_matrix_2 = numpy.asarray(density_matrix_2)
+    assert (
+        density_matrix_1.shape == density_matrix_2.shape
+    ), "The density matrices must be the same size"
+    report = common.compare_density_matrices(density_matrix_1, density_matrix_2)
+    print(f"  Consistent: {report['consistent']}")
+    print(f"  Max abs error: {report['max_abs_error']:.6f} at {report['worst_indexes']}")
+    print(f"  Frobenius distance: {report['frobenius_distance']:.6f}")
+    print(f"  Trace distance: {report['trace_distance']:.6f}")
+    print(f"  Fidelity: {report['fidelity']:.6f}")
+    return density_matrix_1 - density_matrix_2
 
 
 def transpose_density_matrix(density_matrix):
@@ -81,14 +85,7 @@ def transpose_density_matrix(density_matrix):
     ----------
     density_matrix: The density matrix to be transposed.
     """
-    size = len(density_matrix)
-    transposed_density_matrix = []
-    for row_nr in range(size):
-        row = []
-        for col_nr in range(size):
-            row.append(density_matrix[col_nr][row_nr])
-        transposed_density_matrix.append(row)
-    return transposed_density_matrix
+    return numpy.transpose(density_matrix)
 
 
 def pretty_print_density_matrix(name, density_matrix):
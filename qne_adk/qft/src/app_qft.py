@@ -2,13 +2,19 @@
 Monolithic (non-distributed) implementation of the quantum Fourier transformation in QNE-ADK.
 """
 
+import math
 from netqasm.logging.output import get_new_app_logger
 from netqasm.sdk.external import get_qubit_state, NetQASMConnection
 from netqasm.sdk import Qubit
-from common import write_density_matrix_to_log, write_density_matrix_to_file
+from common import (
+    approximate_qft_fidelity,
+    experiment_variant,
+    write_density_matrix_to_log,
+    write_density_matrix_to_file,
+)
 
 
-def apply_qft(app_logger, connection, qubits, input_size, input_value):
+def apply_qft(app_logger, connection, qubits, input_size, input_value, min_angle=0.0):
     """
     Apply a quantum Fourier transformation.
 
@@ -21,11 +27,13 @@ def apply_qft(app_logger, connection, qubits, input_size, input_value):
     input_size: The number of qubits in the input value for the QFT.
     input_value: Assume that all input values for qubits are |0> or |1>, treat these qubits
         as the binary encoding of the input value as a number.
+    min_angle: The smallest angle (in radians) of the controlled Z-rotations. Smaller rotations
+        are dropped, which results in an approximate quantum Fourier transformation.
     """
     app_logger.log("apply qft")
     assert len(qubits) == input_size
     apply_qft_value(app_logger, qubits, input_size, input_value)
-    apply_qft_rotations(app_logger, connection, qubits, input_size)
+    apply_qft_rotations(app_logger, connection, qubits, input_size, min_angle)
     apply_qft_swaps(app_logger, qubits, input_size)
 
 
@@ -53,7 +61,7 @@ def apply_qft_value(app_logger, qubits, input_size, input_value):
             qubits[bit_index].X()
 
 
-def apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits):
+def apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits, min_angle=0.0):
     """
     Apply the controlled Z-rotations gates as part of the quantum Fourier transformation.
 
@@ -64,6 +72,8 @@ def apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits):
     qubits: A map of Qubit objects, indexed by qubit index number. After this function returns,
         these qubits contain the quantum state that is the result of the QFT.
     remaining_nr_qubits: The remaining number of qubits for which to do the controlled Z-rotation.
+    min_angle: The smallest angle (in radians) of the controlled Z-rotations. Smaller rotations
+        are dropped, which results in an approximate quantum Fourier transformation.
     """
     if remaining_nr_qubits == 0:
         return
@@ -72,6 +82,12 @@ def apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits):
     app_logger.log(f"hadamard qubit {remaining_nr_qubits}")
     qubits[remaining_nr_qubits].H()
     for qubit_index in range(remaining_nr_qubits):
+        if math.ldexp(math.pi, qubit_index - remaining_nr_qubits) < min_angle:
+            app_logger.log(
+                f"drop controlled phase control qubit {qubit_index} and target qubit "
+                f"{remaining_nr_qubits} by angle pi/{2 ** (remaining_nr_qubits - qubit_index)}"
+            )
+            continue
         app_logger.log(
             f"controlled phase control qubit {qubit_index} and target qubit {remaining_nr_qubits} "
             f"by angle pi/{2 ** (remaining_nr_qubits - qubit_index)}"
@@ -79,7 +95,7 @@ def apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits):
         qubits[qubit_index].crot_Z(
             qubits[remaining_nr_qubits], n=1, d=remaining_nr_qubits - qubit_index
         )
-    apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits)
+    apply_qft_rotations(app_logger, connection, qubits, remaining_nr_qubits, min_angle)
 
 
 def apply_qft_swaps(app_logger, qubits, nr_qubits):
@@ -107,7 +123,7 @@ def apply_qft_swaps(app_logger, qubits, nr_qubits):
         qubits[qubit_index_1].cnot(qubits[qubit_index_2])
 
 
-def main(input_size, input_value, app_config=None):
+def main(input_size, input_value, app_config=None, min_angle=0.0):
     """
     The application main function.
 
@@ -118,11 +134,18 @@ def main(input_size, input_value, app_config=None):
         input is |1> |0> |1> (three qubits), then input_value is 5 (which the decimal representation
         of 101 binary).
     app_config: The application configuration (a QNE-ADK thing; not sure what this is for)
+    min_angle: The smallest angle (in radians) of the controlled Z-rotations. Smaller rotations
+        are dropped, which results in an approximate quantum Fourier transformation. Zero means an
+        exact quantum Fourier transformation.
     """
     app_logger = get_new_app_logger(app_name=app_config.app_name, log_config=app_config.log_config)
     app_logger.log("qft starts")
     app_logger.log(f"{input_size=}")
     app_logger.log(f"{input_value=}")
+    app_logger.log(f"{min_angle=}")
+    if min_angle:
+        fidelity = approximate_qft_fidelity(input_size, min_angle, input_value)
+        app_logger.log(f"approximate qft fidelity loss {1.0 - fidelity}")
     connection = NetQASMConnection(
         "qft", log_config=app_config.log_config, epr_sockets=[], max_qubits=input_size
     )
@@ -131,14 +154,20 @@ def main(input_size, input_value, app_config=None):
         qubits = {}
         for qubit_index in range(input_size):
             qubits[qubit_index] = Qubit(connection)
-        apply_qft(app_logger, connection, qubits, input_size, input_value)
+        apply_qft(app_logger, connection, qubits, input_size, input_value, min_angle)
         connection.flush()
         density_matrix = get_qubit_state(qubits[0], reduced_dm=False)
         app_logger.log("qft output density matrix")
         write_density_matrix_to_log(app_logger, density_matrix)
         file_name = write_density_matrix_to_file(
-            "qne", "monolithic", input_size, input_value, density_matrix
+            "qne",
+            "monolithic",
+            input_size,
+            input_value,
+            density_matrix,
+            variant=experiment_variant("monolithic", None, None, min_angle),
+            min_angle=min_angle,
         )
         app_logger.log(f"wrote density matrix to {file_name}")
     app_logger.log("qft ends")
-    return {"input_size": input_size, "input_value": input_value}
+    return {"input_size": input_size, "input_value": input_value, "min_angle": min_angle}
@@ -0,0 +1,86 @@
+"""
+Unit tests for validating the results.
+"""
+import time
+import weakref
+import validate_results
+import common
+
+
+def test_find_permutation_no_match():
+    """
+    Test that the search for a permutation gives up quickly when there is none, also for a
+    density matrix with many qubits.
+    """
+    density_matrix_1 = common.expected_qft_density_matrix(10, 0)
+    density_matrix_2 = common.expected_qft_density_matrix(10, 1)
+    start_time = time.perf_counter()
+    assert validate_results.find_permutation(density_matrix_1, density_matrix_2) is None
+    assert time.perf_counter() - start_time < 10.0
+
+
+def test_find_permutation_match():
+    """
+    Test that the permutation that was applied to the bit order of a density matrix is found.
+    """
+    density_matrix_1 = common.expected_qft_density_matrix(6, 37)
+    density_matrix_2 = validate_results.density_matrix_permuted_bit_order(
+        density_matrix_1, (2, 0, 5, 1, 3, 4)
+    )
+    permutation = validate_results.find_permutation(density_matrix_1, density_matrix_2)
+    assert permutation is not None
+    assert validate_results.compare_density_matrices(
+        density_matrix_1,
+        validate_results.density_matrix_permuted_bit_order(density_matrix_2, permutation),
+    )
+
+
+def test_find_permutation_match_near_tolerance():
+    """
+    Test that the permutation is found when the elements of the density matrices differ by just
+    less than MAX_DELTA, which makes the reduced density matrices differ by much more.
+    """
+    density_matrix_1 = common.expected_qft_density_matrix(10, 37)
+    density_matrix_2 = validate_results.density_matrix_permuted_bit_order(
+        density_matrix_1 + 0.9 * validate_results.MAX_DELTA * (1.0 + 1.0j),
+        (2, 0, 9, 5, 1, 7, 3, 8, 4, 6),
+    )
+    permutation = validate_results.find_permutation(density_matrix_1, density_matrix_2)
+    assert permutation is not None
+    assert validate_results.compare_density_matrices(
+        density_matrix_1,
+        validate_results.density_matrix_permuted_bit_order(density_matrix_2, permutation),
+    )
+
+
+def test_validate_loads_at_most_two_matrices(tmp_path, monkeypatch):
+    """
+    Test that validating a group of experiment results loads the density matrices pair by pair, so
+    that no more than two of them are loaded at once.
+    """
+    density_matrix = common.expected_qft_density_matrix(3, 5)
+    for index in range(4):
+        extension = common.NPY_EXTENSION if index % 2 else common.JSON_EXTENSION
+        file_name = str(tmp_path / f"result_{index}{extension}")
+        metadata = {"platform": "qiskit", "input_size": 3, "input_value": 5}
+        common.write_density_matrix_file(
+            file_name, metadata, density_matrix, common.DENSE_REPRESENTATION
+        )
+    all_experiment_results = validate_results.read_all_experiment_results(str(tmp_path))
+    load_density_matrix = validate_results.load_density_matrix
+    nr_loaded = [0, 0]  # The number of density matrices that are loaded now, and at most
+
+    def unloaded():
+        nr_loaded[0] -= 1
+
+    def counting_load_density_matrix(experiment_results):
+        loaded_density_matrix = load_density_matrix(experiment_results)
+        weakref.finalize(loaded_density_matrix, unloaded)
+        nr_loaded[0] += 1
+        nr_loaded[1] = max(nr_loaded[1], nr_loaded[0])
+        return loaded_density_matrix
+
+    monkeypatch.setattr(validate_results, "load_density_matrix", counting_load_density_matrix)
+    for reference in [False, True]:
+        assert validate_results.validate_all_experiment_results(all_experiment_results, reference)
+        assert nr_loaded == [0, 2]
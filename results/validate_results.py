@@ -9,14 +9,37 @@ logic in the difference in bit ordering. So, whenever I compare a QNE-ADK densit
 density matrix, I try all possible permutations of qubit indexing. If I find a match for any
 permutation, I declare the density matrixes to be the same (and show the permutation that led to a
 match - perhaps I can discover some pattern after all.)
+
+Trying all n! permutations is not feasible beyond a handful of qubits. Instead, the permutation is
+found by assigning one qubit at a time (backtracking when needed). Candidate assignments are pruned
+by comparing the blocks of the density matrices in which all unassigned qubits are zero (or one),
+which do not depend on how the unassigned qubits are permuted, and are tried in the order of how
+well the reduced density matrices of the qubits match.
+
+With --reference, each result is compared with the analytically computed output of the QFT (see
+common.expected_qft_density_matrix) instead of with every other result in its group.
 """
 
 import argparse
-import itertools
 import math
 import os
+import string
+import numpy
 import common
 
+MAX_DELTA = common.DEFAULT_MAX_DELTA
+
+REFERENCE_PLATFORM = "qiskit"
+"""
+The platform whose bit order the analytic reference density matrices use.
+"""
+
+PERMUTATION_CACHE = {}
+"""
+The permutation that made the most recent inconsistent-platform comparison consistent, indexed by
+(platform_1, platform_2, nr_bits). This permutation is tried first for the next comparison.
+"""
+
 
 def parse_command_line_arguments():
     """
@@ -28,92 +51,243 @@ def parse_command_line_arguments():
     """
     parser = argparse.ArgumentParser(description="Validate the results")
     parser.add_argument("results_dir", help="Results directory")
+    parser.add_argument(
+        "--reference",
+        action="store_true",
+        help=(
+            "Compare each result with the analytically computed QFT output instead of with all "
+            "other results"
+        ),
+    )
     args = parser.parse_args()
     return args
 
 
 def read_all_experiment_results(results_dir):
     """
-    Read the results for all experiments.
+    Read the metadata of the results for all experiments. The density matrices are not read yet;
+    they are only read (see load_density_matrix) when they are needed for a comparison.
 
     Parameters
     ----------
     results_dir: The directory that contains the result files.
     """
     all_experiment_results = []
-    for file_name in os.listdir(results_dir):
-        if file_name.endswith(".json"):
-            data = common.read_json_file(file_name, "experiment results")
-            experiment_results = {"file_name": file_name, "data": data}
+    for file_name in sorted(os.listdir(results_dir)):
+        if common.is_result_file_name(file_name):
+            path = os.path.join(results_dir, file_name)
+            metadata = common.read_result_metadata(path)
+            experiment_results = {"file_name": file_name, "path": path, "metadata": metadata}
             all_experiment_results.append(experiment_results)
     return all_experiment_results
 
 
-def validate_all_experiment_results(all_experiment_results):
+def load_density_matrix(experiment_results):
+    """
+    Load the density matrix of an experiment from its results file. Binary result files are memory
+    mapped instead of being read into memory.
+
+    Parameters
+    ----------
+    experiment_results: The experiment results whose density matrix is to be loaded.
+
+    Returns
+    -------
+    The density matrix as a numpy array of complex numbers.
+    """
+    if "density_matrix" in experiment_results:
+        return experiment_results["density_matrix"]
+    data = common.read_density_matrix_from_file(experiment_results["path"], mmap_mode="r")
+    return data["density_matrix"]
+
+
+def group_experiment_results(all_experiment_results):
+    """
+    Group the experiment results by input size, input value, and minimum rotation angle (for
+    approximate quantum Fourier transformations). Only experiment results in the same group can be
+    compared with each other.
+
+    Parameters
+    ----------
+    all_experiment_results: The results of all experiments.
+
+    Returns
+    -------
+    A dictionary, indexed by (input_size, input_value, min_angle), of lists of experiment results.
+    """
+    groups = {}
+    for experiment_results in all_experiment_results:
+        metadata = experiment_results["metadata"]
+        key = (metadata["input_size"], metadata["input_value"], metadata.get("min_angle", 0.0))
+        groups.setdefault(key, []).append(experiment_results)
+    return groups
+
+
+def reference_experiment_results(input_size, input_value, min_angle):
+    """
+    Create experiment results that contain the analytically computed output of the QFT.
+
+    Parameters
+    ----------
+    input_size: The number of qubits in the input value for the QFT.
+    input_value: The input value for the QFT.
+    min_angle: The minimum rotation angle (zero for an exact quantum Fourier transformation).
+
+    Returns
+    -------
+    The reference experiment results, with the density matrix included.
+    """
+    return {
+        "file_name": "analytic reference",
+        "metadata": {
+            "platform": REFERENCE_PLATFORM,
+            "input_size": input_size,
+            "input_value": input_value,
+            "min_angle": min_angle,
+        },
+        "density_matrix": common.PureDensityMatrix(
+            common.expected_qft_statevector(input_size, input_value, min_angle)
+        ),
+    }
+
+
+def validate_all_experiment_results(all_experiment_results, reference=False):
     """
     Validate all experiment results.
 
     Parameters
     ----------
     all_experiment_results: The results of all experiments.
+    reference: If True, compare each experiment result with the analytically computed output of
+        the QFT instead of with the other experiment results in its group.
 
     Returns
     -------
     True if all experiment results are consistent with each other, False if not.
     """
+    groups = group_experiment_results(all_experiment_results)
     all_consistent = True
-    for experiment_results in all_experiment_results:
-        consistent = validate_one_experiment_results(experiment_results, all_experiment_results)
+    for (input_size, input_value, min_angle), group in sorted(groups.items()):
+        consistent = validate_experiment_results_group(
+            input_size, input_value, min_angle, group, reference
+        )
         all_consistent = all_consistent and consistent
     return all_consistent
 
 
-def validate_one_experiment_results(experiment_results, all_experiment_results):
+def validate_experiment_results_group(input_size, input_value, min_angle, group, reference=False):
     """
-    Validate one experiment results against the other experiment results for consistency.
+    Validate a group of experiment results with the same input size and input value against each
+    other for consistency. Each pair of experiment results in the group is compared once, or each
+    experiment result is compared with the analytically computed output of the QFT.
 
     Parameters
     ----------
-    experiment_results: The results of the experiment that is to be compared against all other
-        experiment results.
-    all_experiment_results: The results of all experiments to compare against.
+    input_size: The input size of all experiments in the group.
+    input_value: The input value of all experiments in the group.
+    min_angle: The minimum rotation angle of all experiments in the group (zero for exact quantum
+        Fourier transformations).
+    group: The results of the experiments in the group.
+    reference: If True, compare each experiment result with the analytically computed output of
+        the QFT instead of with the other experiment results in the group.
 
     Returns
     -------
-    True if all experiment results are consistent with each other, False if not.
+    True if all experiment results in the group are consistent with each other, False if not.
     """
-    file_name = experiment_results["file_name"]
-    data = experiment_results["data"]
-    print(f"Validate {file_name}")
-    at_least_one_comparison = False
-    all_consistent = True
-    for other_experiment_results in all_experiment_results:
-        other_file_name = other_experiment_results["file_name"]
-        other_data = other_experiment_results["data"]
-        if file_name == other_file_name:
-            continue
-        if data["input_size"] != other_data["input_size"]:
-            continue
-        if data["input_value"] != other_data["input_value"]:
-            continue
-        result = check_consistency(experiment_results, other_experiment_results)
+    if min_angle:
+        print(f"Validate input size {input_size} input value {input_value} min angle {min_angle}")
+    else:
+        print(f"Validate input size {input_size} input value {input_value}")
+    if not reference and len(group) < 2:
+        print(f"  Nothing to compare {group[0]['file_name']} with")
+        return True
+    pairs = comparison_pairs(input_size, input_value, min_angle, group, reference)
+    nr_comparisons = 0
+    nr_consistent = 0
+    for (experiment_results_1, density_matrix_1), (experiment_results_2, density_matrix_2) in pairs:
+        file_name_1 = experiment_results_1["file_name"]
+        file_name_2 = experiment_results_2["file_name"]
+        result = check_consistency(
+            experiment_results_1, experiment_results_2, density_matrix_1, density_matrix_2
+        )
         if result is True:
-            print(f"  Compare with {other_file_name}: consistent")
-            consistent = True
+            print(f"  Compare {file_name_1} with {file_name_2}: consistent")
+            nr_consistent += 1
         elif result is False:
-            print(f"  Compare with {other_file_name}: NOT consistent")
-            consistent = False
+            print(f"  Compare {file_name_1} with {file_name_2}: NOT consistent")
+            print_differences(density_matrix_1, density_matrix_2)
         else:
-            print(f"  Compare with {other_file_name}: consistent, using permutation {result}")
-            consistent = True
-        at_least_one_comparison = True
-        all_consistent = all_consistent and consistent
-    if not at_least_one_comparison:
-        print("  Nothing to compare with")
-    return all_consistent
+            print(
+                f"  Compare {file_name_1} with {file_name_2}: consistent, "
+                f"using permutation {result}"
+            )
+            nr_consistent += 1
+        nr_comparisons += 1
+        # Release the density matrices before the next pair is loaded
+        del density_matrix_1, density_matrix_2
+    print(f"  {nr_consistent} of {nr_comparisons} comparisons consistent")
+    return nr_consistent == nr_comparisons
+
+
+def comparison_pairs(input_size, input_value, min_angle, group, reference=False):
+    """
+    Generate the pairs of experiment results in a group that are to be compared, with their density
+    matrices. The density matrices are loaded pair by pair: the first density matrix of a pair is
+    kept while it is compared with each of the others, which are loaded one at a time, so at most
+    two density matrices are loaded at once.
 
+    Parameters
+    ----------
+    input_size: The input size of all experiments in the group.
+    input_value: The input value of all experiments in the group.
+    min_angle: The minimum rotation angle of all experiments in the group.
+    group: The results of the experiments in the group.
+    reference: If True, pair each experiment result with the analytically computed output of the
+        QFT instead of with the other experiment results in the group.
 
-def check_consistency(experiment_results_1, experiment_results_2):
+    Returns
+    -------
+    A generator of the pairs to be compared, each in the form of ((experiment_results_1,
+    density_matrix_1), (experiment_results_2, density_matrix_2)).
+    """
+    if reference:
+        reference_results = reference_experiment_results(input_size, input_value, min_angle)
+        firsts_and_others = [(reference_results, group)]
+    else:
+        firsts_and_others = [(group[index], group[index + 1 :]) for index in range(len(group) - 1)]
+    for experiment_results_1, others in firsts_and_others:
+        density_matrix_1 = load_density_matrix(experiment_results_1)
+        for experiment_results_2 in others:
+            yield (
+                (experiment_results_1, density_matrix_1),
+                (experiment_results_2, load_density_matrix(experiment_results_2)),
+            )
+        del density_matrix_1
+
+
+def print_differences(density_matrix_1, density_matrix_2):
+    """
+    Print statistics about the differences between the density matrices of two experiment results
+    that are not consistent with each other.
+
+    Parameters
+    ----------
+    density_matrix_1: The density matrix of the first experiment results.
+    density_matrix_2: The density matrix of the second experiment results.
+    """
+    report = common.compare_density_matrices(density_matrix_1, density_matrix_2)
+    print(
+        f"    Max abs error {report['max_abs_error']:.6f} at {report['worst_indexes'][0]}, "
+        f"Frobenius distance {report['frobenius_distance']:.6f}, "
+        f"trace distance {report['trace_distance']:.6f}, "
+        f"fidelity {report['fidelity']:.6f}"
+    )
+
+
+def check_consistency(
+    experiment_results_1, experiment_results_2, density_matrix_1=None, density_matrix_2=None
+):
     """
     Check whether two experiment results are consistent with each other, i.e. whether they
     produced the same output density matrix.
@@ -122,6 +296,10 @@ def check_consistency(experiment_results_1, experiment_results_2):
     ----------
     experiment_results_1: The first experiment results to be compared.
     experiment_results_2: The second experiment results to be compared.
+    density_matrix_1: The already loaded density matrix of experiment_results_1, or None to load
+        it (see load_density_matrix).
+    density_matrix_2: The already loaded density matrix of experiment_results_2, or None to load
+        it.
 
     Returns
     -------
@@ -130,20 +308,131 @@ def check_consistency(experiment_results_1, experiment_results_2):
     The permutation for the density matrix in experiment_results_2 which makes the results
         consistent.
     """
-    data_1 = experiment_results_1["data"]
-    data_2 = experiment_results_2["data"]
-    density_matrix_1 = data_1["density_matrix"]
-    density_matrix_2 = data_2["density_matrix"]
-    if data_1["platform"] == data_2["platform"]:
+    metadata_1 = experiment_results_1["metadata"]
+    metadata_2 = experiment_results_2["metadata"]
+    if density_matrix_1 is None:
+        density_matrix_1 = load_density_matrix(experiment_results_1)
+    if density_matrix_2 is None:
+        density_matrix_2 = load_density_matrix(experiment_results_2)
+    if metadata_1["platform"] == metadata_2["platform"]:
         return compare_density_matrices(density_matrix_1, density_matrix_2)
-    size = len(density_matrix_1)
-    nr_bits = number_of_bits(size)
-    bit_indexes = range(nr_bits)
-    for permutation in itertools.permutations(bit_indexes):
+    nr_bits = number_of_bits(len(density_matrix_1))
+    cache_key = (metadata_1["platform"], metadata_2["platform"], nr_bits)
+    permutation = PERMUTATION_CACHE.get(cache_key)
+    if permutation is not None:
         permuted_density_matrix_2 = density_matrix_permuted_bit_order(density_matrix_2, permutation)
-        consistent = compare_density_matrices(density_matrix_1, permuted_density_matrix_2)
-        if consistent:
+        if compare_density_matrices(density_matrix_1, permuted_density_matrix_2):
             return permutation
+    permutation = find_permutation(density_matrix_1, density_matrix_2)
+    if permutation is None:
+        return False
+    PERMUTATION_CACHE[cache_key] = permutation
+    return permutation
+
+
+def find_permutation(density_matrix_1, density_matrix_2):
+    """
+    Find a permutation of the bit order of density_matrix_2 that makes it the same as
+    density_matrix_1.
+
+    Parameters
+    ----------
+    density_matrix_1: The first density matrix to be compared.
+    density_matrix_2: The second density matrix to be compared.
+
+    Returns
+    -------
+    The permutation (see density_matrix_permuted_bit_order), or None if there is no such
+    permutation.
+    """
+    assert len(density_matrix_1) == len(density_matrix_2)
+    nr_bits = number_of_bits(len(density_matrix_1))
+    tensor_1 = density_matrix_tensor(density_matrix_1)
+    tensor_2 = density_matrix_tensor(density_matrix_2)
+    candidates = candidate_bits(tensor_1, tensor_2)
+    if not _has_complete_matching(candidates):
+        return None
+    # Assign the most constrained bits first
+    order = sorted(range(nr_bits), key=lambda bit: len(candidates[bit]))
+    permutation = [None] * nr_bits
+    if not _assign_bits(tensor_1, tensor_2, candidates, order, permutation):
+        return None
+    return tuple(permutation)
+
+
+def candidate_bits(tensor_1, tensor_2):
+    """
+    Determine, for each bit of the first density matrix, which bits of the second density matrix it
+    could correspond to.
+
+    A bit is ruled out only if the blocks of the density matrices in which all other bits are zero
+    (or all other bits are one) differ by more than MAX_DELTA. These blocks consist of elements of
+    the density matrices themselves, so no bit is ruled out that some permutation within the
+    tolerance needs. The remaining candidates are ordered by how well the reduced density matrices
+    of the bits match, so that the most likely candidate is tried first. The reduced density
+    matrices are sums of many elements, so they are not used to rule out bits.
+
+    Parameters
+    ----------
+    tensor_1: The first density matrix as a tensor (see density_matrix_tensor).
+    tensor_2: The second density matrix as a tensor (see density_matrix_tensor).
+
+    Returns
+    -------
+    A list containing the candidate bits of the second density matrix for bit i of the first
+    density matrix at index i, most likely candidate first.
+    """
+    nr_bits = tensor_1.ndim // 2
+    reduced_2 = [reduced_density_matrix_tensor(tensor_2, [bit_2]) for bit_2 in range(nr_bits)]
+    candidates = []
+    for bit_1 in range(nr_bits):
+        reduced_1 = reduced_density_matrix_tensor(tensor_1, [bit_1])
+        bit_candidates = [
+            bit_2
+            for bit_2 in range(nr_bits)
+            if blocks_match(tensor_1, tensor_2, [bit_1], [bit_2], MAX_DELTA)
+        ]
+        distances = {
+            bit_2: numpy.max(numpy.abs(reduced_1 - reduced_2[bit_2])) for bit_2 in bit_candidates
+        }
+        bit_candidates.sort(key=distances.get)
+        candidates.append(bit_candidates)
+    return candidates
+
+
+def _has_complete_matching(candidates):
+    # Find a maximum bipartite matching between the bits using augmenting paths
+    matched_bits_1 = {}
+
+    def augment(bit_1, visited_bits_2):
+        for bit_2 in candidates[bit_1]:
+            if bit_2 in visited_bits_2:
+                continue
+            visited_bits_2.add(bit_2)
+            if bit_2 not in matched_bits_1 or augment(matched_bits_1[bit_2], visited_bits_2):
+                matched_bits_1[bit_2] = bit_1
+                return True
+        return False
+
+    return all(augment(bit_1, set()) for bit_1 in range(len(candidates)))
+
+
+def _assign_bits(tensor_1, tensor_2, candidates, order, permutation):
+    nr_bits = len(permutation)
+    nr_assigned = sum(1 for bit_2 in permutation if bit_2 is not None)
+    if nr_assigned == nr_bits:
+        return True
+    bit_1 = order[nr_assigned]
+    assigned_bits_1 = order[: nr_assigned + 1]
+    for bit_2 in candidates[bit_1]:
+        if bit_2 in permutation:
+            continue
+        permutation[bit_1] = bit_2
+        assigned_bits_2 = [permutation[bit] for bit in assigned_bits_1]
+        if blocks_match(tensor_1, tensor_2, assigned_bits_1, assigned_bits_2, MAX_DELTA):
+            if _assign_bits(tensor_1, tensor_2, candidates, order, permutation):
+                return True
+        permutation[bit_1] = None
     return False
 
 
@@ -160,16 +449,10 @@ def compare_density_matrices(density_matrix_1, density_matrix_2):
     -------
     True if the density matrices are the same. False if they are different.
     """
-    max_delta = 0.001
-    assert len(density_matrix_1) == len(density_matrix_2)
-    for row_1, row_2 in zip(density_matrix_1, density_matrix_2):
-        assert len(row_1) == len(row_2)
-        for value_1, value_2 in zip(row_1, row_2):
-            if abs(value_1["real"] - value_2["real"]) > max_delta:
-                return False
-            if abs(value_1["imag"] - value_2["imag"]) > max_delta:
-                return False
-    return True
+    report = common.compare_density_matrices(
+        density_matrix_1, density_matrix_2, MAX_DELTA, early_exit=True
+    )
+    return report["consistent"]
 
 
 def number_of_bits(number):
@@ -189,6 +472,23 @@ def number_of_bits(number):
     return nr_bits
 
 
+def density_matrix_tensor(density_matrix):
+    """
+    Reshape a density matrix into a tensor with one axis for each bit of the row index followed by
+    one axis for each bit of the column index. The most significant bit comes first.
+
+    Parameters
+    ----------
+    density_matrix: The density matrix.
+
+    Returns
+    -------
+    The density matrix tensor.
+    """
+    nr_bits = number_of_bits(len(density_matrix))
+    return numpy.asarray(density_matrix).reshape((2,) * (2 * nr_bits))
+
+
 def density_matrix_permuted_bit_order(density_matrix, permutation):
     """
     Produce a new density matrix by permuting the bit order of the indexes.
@@ -196,48 +496,124 @@ def density_matrix_permuted_bit_order(density_matrix, permutation):
     Parameters
     ----------
     density_matrix: The original density matrix.
-    permutation: The permutation.
+    permutation: The permutation. Bit i of the indexes of the new density matrix is bit
+        permutation[i] of the indexes of the original density matrix.
 
     Returns
     -------
     The new density matrix, with the bit order of the indexes permuted.
     """
     size = len(density_matrix)
-    new_density_matrix = []
-    for row_index in range(size):
-        new_row = []
-        for col_index in range(size):
-            reversed_row_index = permute_bit_order(row_index, permutation)
-            reversed_col_index = permute_bit_order(col_index, permutation)
-            value = density_matrix[reversed_row_index][reversed_col_index]
-            new_row.append(value)
-        new_density_matrix.append(new_row)
-    return new_density_matrix
+    nr_bits = len(permutation)
+    tensor = density_matrix_tensor(density_matrix)
+    row_axes = [nr_bits - 1 - permutation[nr_bits - 1 - axis] for axis in range(nr_bits)]
+    column_axes = [nr_bits + axis for axis in row_axes]
+    return numpy.transpose(tensor, row_axes + column_axes).reshape(size, size)
 
 
-def permute_bit_order(number, permutation):
+def reduced_density_matrix_tensor(tensor, bits):
     """
-    Permute the bit order in a given number.
+    Compute the reduced density matrix for a subset of the bits by tracing out all other bits.
 
     Parameters
     ----------
-    number: The number whose bits need to be permuted.
-    permutation: The permutation.
+    tensor: The density matrix tensor (see density_matrix_tensor).
+    bits: The bits to keep, in the order in which they appear in the reduced density matrix.
 
     Returns
     -------
-    The number with the bit order permuted.
+    The reduced density matrix as a tensor with one axis for each kept bit for the row index
+    followed by one axis for each kept bit for the column index.
     """
-    new_number = 0
-    nr_bits = len(permutation)
-    for old_bit_index in range(nr_bits):
-        bit_value = number & 1
-        number >>= 1
-        if bit_value:
-            new_bit_index = permutation[old_bit_index]
-            bit_mask = 1 << new_bit_index
-            new_number |= bit_mask
-    return new_number
+    nr_bits = tensor.ndim // 2
+    row_letters = list(string.ascii_letters[:nr_bits])
+    column_letters = list(row_letters)
+    for bit in bits:
+        axis = nr_bits - 1 - bit
+        column_letters[axis] = string.ascii_letters[nr_bits + axis]
+    output_letters = [row_letters[nr_bits - 1 - bit] for bit in bits]
+    output_letters += [column_letters[nr_bits - 1 - bit] for bit in bits]
+    subscripts = "".join(row_letters + column_letters) + "->" + "".join(output_letters)
+    return numpy.einsum(subscripts, tensor)
+
+
+def density_matrix_block_tensor(tensor, bits, other_bits_value):
+    """
+    Extract the block of a density matrix in which all bits except the given bits have a fixed
+    value, in both the row index and the column index.
+
+    Parameters
+    ----------
+    tensor: The density matrix tensor (see density_matrix_tensor).
+    bits: The bits to keep, in the order in which they appear in the block.
+    other_bits_value: The value (0 or 1) of all other bits.
+
+    Returns
+    -------
+    The block as a tensor with one axis for each kept bit for the row index followed by one axis for
+    each kept bit for the column index.
+    """
+    nr_bits = tensor.ndim // 2
+    index = [other_bits_value] * (2 * nr_bits)
+    for bit in bits:
+        axis = nr_bits - 1 - bit
+        index[axis] = slice(None)
+        index[nr_bits + axis] = slice(None)
+    block = tensor[tuple(index)]
+    # The kept axes remain in their original order, which is the order of decreasing bit
+    kept_bits = sorted(bits, reverse=True)
+    row_axes = [kept_bits.index(bit) for bit in bits]
+    column_axes = [len(bits) + axis for axis in row_axes]
+    return numpy.transpose(block, row_axes + column_axes)
+
+
+def blocks_match(tensor_1, tensor_2, bits_1, bits_2, max_delta):
+    """
+    Determine whether two density matrices can be the same under a permutation of the bit order
+    that maps bits_1 of the first density matrix to the corresponding bits_2 of the second density
+    matrix. The blocks in which all other bits are zero and the blocks in which all other bits are
+    one are compared; these blocks do not depend on how the other bits are permuted.
+
+    Parameters
+    ----------
+    tensor_1: The first density matrix as a tensor (see density_matrix_tensor).
+    tensor_2: The second density matrix as a tensor (see density_matrix_tensor).
+    bits_1: The bits of the first density matrix.
+    bits_2: The bits of the second density matrix that bits_1 are mapped to.
+    max_delta: The maximum difference in the real part and in the imaginary part of each element.
+
+    Returns
+    -------
+    False if no such permutation can make the density matrices the same, True otherwise. If all
+    bits are given, True if the permutation makes the density matrices the same.
+    """
+    for other_bits_value in (0, 1):
+        block_1 = density_matrix_block_tensor(tensor_1, bits_1, other_bits_value)
+        block_2 = density_matrix_block_tensor(tensor_2, bits_2, other_bits_value)
+        if not tensors_match(block_1, block_2, max_delta):
+            return False
+    return True
+
+
+def tensors_match(tensor_1, tensor_2, max_delta):
+    """
+    Determine whether the real and imaginary parts of all elements in two tensors are the same,
+    allowing for rounding errors.
+
+    Parameters
+    ----------
+    tensor_1: The first tensor to be compared.
+    tensor_2: The second tensor to be compared.
+    max_delta: The maximum difference in the real part and in the imaginary part of each element.
+
+    Returns
+    -------
+    True if the tensors are the same, False if they are different.
+    """
+    difference = tensor_1 - tensor_2
+    if numpy.any(numpy.abs(difference.real) > max_delta):
+        return False
+    return not numpy.any(numpy.abs(difference.imag) > max_delta)
 
 
 def pretty_print_density_matrix(density_matrix):
@@ -251,8 +627,8 @@ def pretty_print_density_matrix(density_matrix):
     for row in density_matrix:
         line = ""
         for value in row:
-            real_value = value["real"]
-            imaginary_value = value["imag"]
+            real_value = value.real
+            imaginary_value = value.imag
             if real_value < 0.0:
                 imaginary_sign = "-"
                 real_value = -real_value
@@ -273,7 +649,7 @@ def main():
     """
     args = parse_command_line_arguments()
     all_experiment_results = read_all_experiment_results(args.results_dir)
-    all_consistent = validate_all_experiment_results(all_experiment_results)
+    all_consistent = validate_all_experiment_results(all_experiment_results, args.reference)
     if all_consistent:
         print("All experimental results are consistent with each other")
     else: